@@ -0,0 +1,312 @@
+"""框架热点路径基准测试：用固定的合成数据测量各环节吞吐（次/秒，越大越好），与基线对比发现性能回退
+覆盖：YAML用例加载（10/1k/100k条，冷启动和命中缓存）、get_var/set_var、${变量}替换、
+JSONPath断言（小/大响应体）、基于本地mock服务的端到端用例吞吐（单线程/并发）
+用法：
+    python benchmarks/run_benchmarks.py                   # 执行并与baseline.json对比，回退超过阈值时退出码为1
+    python benchmarks/run_benchmarks.py --save-baseline   # 执行并把结果保存为新的基线
+    python benchmarks/run_benchmarks.py --only yaml --sizes 10,1000
+基线与机器相关：更换执行机器后应先在新机器上重新保存基线
+"""
+import argparse
+import gc
+import json
+import logging
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+# 以项目根目录为导入路径（与run.py一致，直接使用src.utils下的模块）
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from src.utils import read_data  # noqa: E402
+from src.utils.api_runner import ApiRunner  # noqa: E402
+from src.utils.assert_utils import AssertUtils  # noqa: E402
+from src.utils.mock_server import MockServer  # noqa: E402
+from src.utils.read_data import DataReader  # noqa: E402
+from src.utils.scheduler import CaseScheduler  # noqa: E402
+from src.utils.template import compile_case  # noqa: E402
+from src.utils.test_base import TestBase  # noqa: E402
+from src.utils.var_handler import VarStore, flush_vars, use_var_file  # noqa: E402
+
+BASELINE_FILE = os.path.join(ROOT_DIR, "benchmarks", "baseline.json")
+DEFAULT_SIZES = (10, 1000, 100000)
+DEFAULT_THRESHOLD = 0.2  # 吞吐低于基线的比例超过该值视为回退
+
+# 合成用例模板（结构与data目录下的用例一致）
+CASE_TEMPLATE = """- case_id: bench_{i:06d}
+  title: 基准测试用例{i}
+  api:
+    method: post
+    path: "/api/bench/{route}"
+    json:
+      latitude: "39.023603"
+      longitude: "117.708571"
+      index: {i}
+  extract:
+    licenseNumber: "$.data[0].licenseNumber"
+  expected:
+    code: 200
+    json:
+      msg: "操作成功"
+      code: "0000"
+"""
+
+
+class FakeResponse:
+    """只有状态码和JSON的响应对象（JSONPath断言基准不经过网络）"""
+
+    def __init__(self, body, status_code=200):
+        self.body = body
+        self.status_code = status_code
+
+    def json(self):
+        return self.body
+
+
+def write_cases(dir_path: str, count: int) -> str:
+    """生成count条合成用例的YAML文件"""
+    file_path = os.path.join(dir_path, f"cases_{count}.yaml")
+    with open(file_path, "w", encoding="utf-8") as f:
+        for i in range(count):
+            f.write(CASE_TEMPLATE.format(i=i, route=i % 20))
+    return file_path
+
+
+def measure(func, min_time: float = 0.5, repeat: int = 3) -> float:
+    """重复执行func（返回本次完成的操作数），取repeat轮中最高的吞吐（次/秒）"""
+    best = 0.0
+    for _ in range(repeat):
+        ops, start = 0, time.perf_counter()
+        while True:
+            ops += func()
+            elapsed = time.perf_counter() - start
+            if elapsed >= min_time:
+                break
+        best = max(best, ops / elapsed)
+    return best
+
+
+def bench_yaml(work_dir: str, sizes) -> dict:
+    """YAML用例加载：冷启动（解析并建立缓存）和命中缓存两种情况"""
+    results = {}
+    cache_dir = os.path.join(work_dir, "case_cache")
+    original_cache_dir = read_data.CACHE_DIR
+    read_data.CACHE_DIR = cache_dir
+    try:
+        for size in sizes:
+            file_path = write_cases(work_dir, size)
+
+            def cold():
+                shutil.rmtree(cache_dir, ignore_errors=True)
+                return len(DataReader.read_cases(file_path))
+
+            def warm():
+                return len(DataReader.read_cases(file_path))
+
+            # 大文件单轮耗时已足够长，减少重复次数
+            repeat = 1 if size >= 100000 else 3
+            results[f"yaml_load_cold_{size}"] = measure(cold, min_time=0.0 if repeat == 1 else 0.5, repeat=repeat)
+            results[f"yaml_load_warm_{size}"] = measure(warm, min_time=0.0 if repeat == 1 else 0.5, repeat=repeat)
+    finally:
+        # 恢复缓存目录，后续分组（如e2e）读取用例时不受影响
+        read_data.CACHE_DIR = original_cache_dir
+    return results
+
+
+def bench_vars(work_dir: str) -> dict:
+    """变量读写：读取多级路径、写入（只改内存，不触发定时落盘）"""
+    file_path = os.path.join(work_dir, "user_vars.yaml")
+    with open(file_path, "w", encoding="utf-8") as f:
+        f.write("user:\n  username: '13800000000'\n  smsCode: '123456'\nglobal:\n  token: abc\n")
+    store = VarStore(file_path, flush_interval=0)
+
+    def get():
+        for _ in range(1000):
+            store.get("global.token")
+        return 1000
+
+    def set_():
+        for i in range(1000):
+            store.set("global.orderId", i)
+        return 1000
+
+    return {"var_get": measure(get), "var_set": measure(set_)}
+
+
+def bench_template() -> dict:
+    """${变量}替换：预编译用例后渲染请求配置和预期结果"""
+    values = {"token": "t" * 32, "orderId": 12345, "licenseNumber": "津EM2456", "userId": 1}
+    case = compile_case({
+        "case_id": "bench_template",
+        "api": {"method": "post", "path": "/api/order/${orderId}",
+                "json": {"licenseNumber": "${licenseNumber}", "userId": "${userId}",
+                         "remark": "order-${orderId}-${userId}", "items": [{"id": "${orderId}"}] * 5}},
+        "expected": {"code": 200, "json": {"data.orderId": "${orderId}", "msg": "操作成功"}},
+    })
+
+    def render():
+        for _ in range(100):
+            case.render_api(values.get)
+            case.render_expected(values.get)
+        return 100
+
+    return {"template_render": measure(render)}
+
+
+def bench_jsonpath() -> dict:
+    """JSONPath断言：小响应体（几个字段）和大响应体（1万条记录的列表）"""
+    small = FakeResponse({"code": "0000", "msg": "操作成功", "data": {"orderId": 1, "status": "paid"}})
+    large = FakeResponse({"code": "0000", "msg": "操作成功",
+                          "data": [{"id": i, "licenseNumber": f"津A{i:05d}", "tags": ["a", "b"]}
+                                   for i in range(10000)]})
+
+    def assert_small():
+        for _ in range(100):
+            AssertUtils.assert_json(small, "$.code", "0000")
+            AssertUtils.assert_json(small, "$.data.status", "paid")
+        return 100
+
+    def assert_large():
+        for _ in range(100):
+            AssertUtils.assert_json(large, "$.data[9999].licenseNumber", "津A09999")
+        return 100
+
+    def filter_large():
+        # 过滤表达式回退到jsonpath库，需要遍历整个列表
+        AssertUtils.assert_json(large, "$.data[?(@.id==9999)].licenseNumber", "津A09999")
+        return 1
+
+    # 大响应体上的30项断言：逐项assert_json与一次遍历的assert_all对比
+    checks = {f"data[{i * 300}].licenseNumber": f"津A{i * 300:05d}" for i in range(30)}
+    expected = {"code": 200, "json": checks}
+
+    def assert_each():
+        for json_path, value in checks.items():
+            AssertUtils.assert_json(large, f"$.{json_path}", value)
+        return 1
+
+    def assert_all():
+        AssertUtils.assert_all(large, expected)
+        return 1
+
+    return {"jsonpath_small": measure(assert_small), "jsonpath_large": measure(assert_large),
+            "jsonpath_large_filter": measure(filter_large),
+            "assert_each_30": measure(assert_each), "assert_all_30": measure(assert_all)}
+
+
+def bench_end_to_end(work_dir: str) -> dict:
+    """端到端：对本地mock服务执行用例（渲染 → 请求 → 提取 → 断言）的吞吐"""
+    use_var_file(os.path.join(work_dir, "e2e_vars.yaml"))
+    cases = [compile_case(case) for case in DataReader.read_cases(write_cases(work_dir, 50))]
+    results = {}
+    with MockServer(cases) as server:
+        runner = ApiRunner(server.base_url)
+
+        def sequential():
+            for case in cases:
+                TestBase.run_case(runner, case)
+            return len(cases)
+
+        def parallel():
+            # 合成用例之间没有变量依赖，全部并发执行
+            CaseScheduler(cases, lambda: ApiRunner(server.base_url), workers=8).run()
+            return len(cases)
+
+        results["e2e_sequential"] = measure(sequential, min_time=1.0)
+        results["e2e_parallel_8"] = measure(parallel, min_time=1.0)
+        runner.session.close()
+    return results
+
+
+GROUPS = {
+    "yaml": lambda work_dir, args: bench_yaml(work_dir, args.sizes),
+    "vars": lambda work_dir, args: bench_vars(work_dir),
+    "template": lambda work_dir, args: bench_template(),
+    "jsonpath": lambda work_dir, args: bench_jsonpath(),
+    "e2e": lambda work_dir, args: bench_end_to_end(work_dir),
+}
+
+
+def compare(results: dict, baseline: dict, threshold: float):
+    """与基线对比，返回(表格行, 回退的指标列表)"""
+    rows, regressions = [], []
+    for name, value in results.items():
+        base = baseline.get(name)
+        if base:
+            change = value / base - 1
+            status = "回退" if change < -threshold else "正常"
+            if change < -threshold:
+                regressions.append(name)
+            rows.append(f"{name:<28}{value:>14.1f}{base:>14.1f}{change * 100:>9.1f}%  {status}")
+        else:
+            rows.append(f"{name:<28}{value:>14.1f}{'-':>14}{'-':>10}  无基线")
+    return rows, regressions
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="框架热点路径基准测试")
+    parser.add_argument("--only", default="", help=f"只执行指定分组（逗号分隔）：{','.join(GROUPS)}")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="YAML加载测试的用例条数（逗号分隔）")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="基线文件路径")
+    parser.add_argument("--save-baseline", action="store_true", help="把本次结果保存为基线")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="允许的吞吐下降比例，超过即视为回退（默认0.2）")
+    parser.add_argument("--output", default="report/benchmarks.json", help="本次结果JSON文件路径")
+    args = parser.parse_args()
+    args.sizes = [int(s) for s in args.sizes.split(",") if s]
+    return args
+
+
+def main() -> int:
+    args = parse_args()
+    groups = [g for g in args.only.split(",") if g] or list(GROUPS)
+    # 只测量框架本身的开销：关闭INFO日志（否则结果主要取决于日志IO）
+    logging.disable(logging.INFO)
+    work_dir = tempfile.mkdtemp(prefix="auto_test_bench_")
+    results = {}
+    try:
+        for group in groups:
+            gc.collect()  # 避免上一组遗留的大量对象影响本组的垃圾回收开销
+            start = time.perf_counter()
+            results.update(GROUPS[group](work_dir, args))
+            print(f"[{group}] 完成，耗时{time.perf_counter() - start:.1f}s")
+    finally:
+        flush_vars()  # 端到端测试提取的变量写入临时目录，删除目录前先写完
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    data = {
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+        "machine": f"{platform.node()} {platform.machine()} Python {platform.python_version()}",
+        "results": results,
+    }
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f).get("results", {})
+    rows, regressions = compare(results, baseline, args.threshold)
+    print(f"{'benchmark':<28}{'ops/s':>14}{'baseline':>14}{'change':>10}")
+    print("\n".join(rows))
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({**data, "results": {**baseline, **results}}, f, ensure_ascii=False, indent=2)
+        print(f"基线已保存：{args.baseline}")
+        return 0
+    if regressions:
+        print(f"性能回退（吞吐下降超过{args.threshold * 100:.0f}%）：{', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
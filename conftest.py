@@ -2,10 +2,40 @@
 fixture是pytest的核心功能，用于提供测试依赖（如接口执行器）
 """
 import pytest
-import yaml
 import time
 from src.utils.api_runner import ApiRunner
-from src.utils.logger import logger
+from src.utils.auth import get_auth_manager
+from src.utils.cassette import MODES as CASSETTE_MODES, load_cassette
+from src.utils.config import current_env, get_env_config, load_config, set_current_env
+from src.utils.html_report import DEFAULT_HTML_DIR, DEFAULT_PAGE_SIZE, render_report
+from src.utils.logger import logger, setup_logging, shutdown_logging
+from src.utils.metrics import default_metrics, start_metrics
+from src.utils.mock_server import MOCK_TOKEN, start_mock_server
+from src.utils.resilience import load_resilience
+from src.utils.result_cache import CaseCached, load_result_cache
+from src.utils.results_sink import DEFAULT_RESULTS_FILE, ResultsSink
+from src.utils.scheduler import load_all_cases
+from src.utils.timing import case_context, default_recorder
+from src.utils.var_handler import flush_vars
+
+
+def pytest_addoption(parser):
+    """注册命令行参数"""
+    parser.addoption("--env", default="test",
+                     help="执行环境（config.yaml中env下的键，默认test；多环境并发对比请使用run.py --env a,b）")
+    parser.addoption("--cassette", choices=CASSETTE_MODES, default=None,
+                     help="请求录制回放模式（默认使用config.yaml中cassette.mode）")
+    parser.addoption("--mock", action="store_true", default=False,
+                     help="启动根据data目录用例生成的本地mock服务，替代config.yaml中的base_url")
+    parser.addoption("--changed-only", action="store_true", default=False,
+                     help="只执行请求/预期或上游提取的变量自上次通过以来有变化的YAML用例")
+    parser.addoption("--metrics", action="store_true", default=False,
+                     help="开启实时指标（Prometheus端点和定时汇总，见config.yaml中metrics），长时间执行时观察吞吐和耗时")
+
+
+def pytest_configure(config):
+    """钩子函数：收集用例前执行，切换执行环境"""
+    set_current_env(config.getoption("--env"))
 
 
 def pytest_collection_modifyitems(items):
@@ -31,8 +61,13 @@ def pytest_collection_modifyitems(items):
 
 
 # 读取环境配置（从config/config.yaml）
-with open("config/config.yaml", "r", encoding="utf-8") as f:
-    config = yaml.safe_load(f)
+config = load_config()
+# 用例结果流式落盘（会话开始时创建）
+results_sink = None
+# 实时指标输出（--metrics或config.yaml中metrics.enabled开启时创建）
+metrics_exporter = None
+# 已出执行结果、等待清理阶段结束后写出的用例：nodeid -> [case_id, status, duration, message]
+pending_results = {}
 
 # @pytest.fixture(scope="session", autouse=True)
 # def add_timestamp_metadata(metadata):
@@ -45,29 +80,192 @@ with open("config/config.yaml", "r", encoding="utf-8") as f:
 #     # 夹具结束时无需操作
 
 @pytest.fixture(scope="session")
-def api_runner():
+def cassette(request):
+    """请求录制回放（模式为off时为None）"""
+    cassette = load_cassette(config.get("cassette"), request.config.getoption("--cassette"))
+    if cassette is not None and cassette.replaying:
+        # 离线回放：不访问登录接口，使用录制的响应中的token
+        get_auth_manager().offline = True
+    yield cassette
+    if cassette is not None:
+        cassette.close()
+        report_path = cassette.save_report()
+        if report_path:
+            logger.warning(f"cassette校验发现{len(cassette.mismatches)}处响应差异，详见：{report_path}")
+
+
+@pytest.fixture(scope="session")
+def mock_server(request):
+    """本地mock服务（未指定--mock时为None）"""
+    if not request.config.getoption("--mock"):
+        yield None
+        return
+    server = start_mock_server(load_all_cases(), config.get("mock"),
+                               login_path=(config.get("auth") or {}).get("login_path"))
+    # mock环境使用固定token，不访问真实的登录接口
+    auth = get_auth_manager()
+    auth.offline = True
+    auth.set_token(MOCK_TOKEN)
+    yield server
+    server.stop()
+
+
+@pytest.fixture(scope="session")
+def result_cache(request, mock_server):
+    """结果缓存：(相同请求的响应复用缓存, 上次通过的用例指纹)，会话结束时写回指纹文件"""
+    response_cache, last_green = load_result_cache(
+        config.get("result_cache"), request.config.getoption("--changed-only"),
+        scope="mock" if mock_server else current_env())
+    yield response_cache, last_green
+    last_green.save()
+    if response_cache is not None and response_cache.hits:
+        logger.info(f"相同请求复用响应{response_cache.hits}次")
+
+
+@pytest.fixture(scope="session")
+def api_runner(cassette, mock_server, result_cache):
     """全局接口执行器（会话级别：整个测试过程只初始化一次）
     所有用例共享此执行器，保持会话状态
     """
-    # 获取测试环境配置（可切换为prod）
-    env_config = config["env"]["test"]
+    # 获取当前执行环境的配置（pytest --env 指定，默认test）
+    env_config = get_env_config()
+    base_url = mock_server.base_url if mock_server else env_config["base_url"]
+    # 失败重试和按主机熔断（config.yaml的resilience节点）
+    retry, breaker = load_resilience(config.get("resilience"), base_url)
     # 初始化ApiRunner
     runner = ApiRunner(
-        base_url=env_config["base_url"],
-        timeout=env_config.get("timeout", 10)
+        base_url=base_url,
+        timeout=env_config.get("timeout", 10),
+        auth=get_auth_manager(),  # token由登录态管理器提供，过期或401时自动刷新
+        cassette=cassette,
+        response_cache=result_cache[0],  # 同一会话中相同的请求只发送一次
+        connect_timeout=env_config.get("connect_timeout"),
+        retry=retry,
+        breaker=breaker
     )
-    logger.info(f"接口执行器初始化完成，基础URL：{env_config['base_url']}")
+    # 记录每个请求的分段耗时，会话结束时汇总
+    runner.add_hook(default_recorder.record)
+    if results_sink is not None:
+        runner.add_hook(results_sink.record_sample)  # 请求信息随用例结果一起写入结果文件
+    if metrics_exporter is not None:
+        default_metrics.attach(runner)  # 实时指标：请求数、失败、重试、进行中和耗时分位数
+    logger.info(f"接口执行器初始化完成，环境：{current_env()}，基础URL：{base_url}")
     yield runner  # 提供执行器给用例使用
     # 测试结束后清理（如关闭会话）
     runner.session.close()
     logger.info("接口执行器已关闭会话")
 
 
+def get_case_id(item) -> str:
+    """获取pytest用例对应的case_id（参数化的YAML用例取case_id，否则取用例名）"""
+    case = getattr(item, "callspec", None) and item.callspec.params.get("case")
+    return getattr(case, "case_id", None) or item.name
+
+
+@pytest.fixture(autouse=True)
+def last_green_check(request, result_cache):
+    """YAML用例执行前按当前变量计算指纹：--changed-only时跳过未变化且上次通过的用例；执行后记录结果"""
+    case = getattr(request.node, "callspec", None) and request.node.callspec.params.get("case")
+    if not getattr(case, "case_id", None):
+        yield
+        return
+    request.getfixturevalue("api_runner")  # 先完成mock服务等依赖的初始化，再按当前变量渲染
+    last_green = result_cache[1]
+    try:
+        fingerprint = last_green.check(case)
+    except CaseCached as e:
+        pytest.skip(str(e))
+    yield
+    report = getattr(request.node, "rep_call", None)
+    last_green.record(case.case_id, fingerprint, bool(report and report.passed))
+
+
+@pytest.fixture(autouse=True)
+def circuit_breaker_check(request):
+    """主机已熔断时跳过后续接口用例（不再逐个等待超时）"""
+    if "api_runner" in request.fixturenames:
+        breaker = request.getfixturevalue("api_runner").breaker
+        if breaker is not None and breaker.is_open:
+            pytest.skip(f"主机已熔断，跳过用例：{breaker.name}")
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_makereport(item, call):
+    """钩子函数：保存用例执行阶段的结果，供fixture在清理阶段判断用例是否通过；结果上附带case_id"""
+    outcome = yield
+    report = outcome.get_result()
+    report.case_id = get_case_id(item)
+    if report.when == "call":
+        item.rep_call = report
+
+
+def pytest_runtest_logreport(report):
+    """钩子函数：每个用例的清理阶段结束后立即把结果追加到结果文件（每个用例一条）
+    以执行阶段的结果为准（准备阶段跳过或出错时以准备阶段为准），清理阶段出错时升级为error
+    """
+    if results_sink is None:
+        return
+    if report.when == "call" or (report.when == "setup" and not report.passed):
+        if report.passed:
+            status, message = "passed", None
+        elif report.skipped:
+            longrepr = report.longrepr
+            status, message = "skipped", longrepr[2] if isinstance(longrepr, tuple) else str(longrepr)
+        else:
+            status, message = "failed" if report.when == "call" else "error", _failure_message(report)
+        pending_results[report.nodeid] = [getattr(report, "case_id", report.nodeid), status, report.duration, message]
+    elif report.when == "teardown":
+        result = pending_results.pop(report.nodeid, None)
+        if result is None:
+            result = [getattr(report, "case_id", report.nodeid), "passed", 0.0, None]
+        if report.failed:
+            result[1], result[3] = "error", _failure_message(report)
+        case_id, status, duration, message = result
+        results_sink.add_result(case_id, status, duration, nodeid=report.nodeid, message=message)
+
+
+def _failure_message(report) -> str:
+    crash = getattr(report.longrepr, "reprcrash", None)
+    return crash.message if crash is not None else str(report.longrepr)
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_call(item):
+    """钩子函数：用例执行期间标记当前case_id，请求耗时样本按用例归类并统计框架开销"""
+    with case_context(get_case_id(item)):
+        yield
+
+
 def pytest_sessionstart(session):
-    """测试会话开始时执行：打印开始日志"""
+    """测试会话开始时执行：按配置初始化日志和结果文件，并打印开始日志"""
+    global results_sink, metrics_exporter
+    setup_logging(**(config.get("log") or {}))
+    # 只收集用例（--collect-only）时不覆盖结果文件，也不生成报告
+    if not session.config.option.collectonly:
+        results_sink = ResultsSink((config.get("report") or {}).get("results_file") or DEFAULT_RESULTS_FILE)
+        metrics_exporter = start_metrics(config.get("metrics"), enabled=session.config.getoption("--metrics"))
     logger.info("\n=============== 自动化测试会话开始 ===============")
 
 
 def pytest_sessionfinish(session, exitstatus):
-    """测试会话结束时执行：打印结束日志"""
-    logger.info("\n=============== 自动化测试会话结束 ===============\n")
\ No newline at end of file
+    """测试会话结束时执行：写回变量并打印结束日志"""
+    # 将用例执行期间提取的变量批量写回user_vars.yaml
+    flush_vars()
+    # 输出请求耗时汇总表，并导出JSON供不同版本间对比
+    if default_recorder.samples:
+        logger.info("\n" + default_recorder.format_table())
+        report_path = default_recorder.export_json("report/latency.json")
+        logger.info(f"请求耗时数据已导出：{report_path}")
+    if metrics_exporter is not None:
+        metrics_exporter.stop()
+    if results_sink is not None:
+        results_sink.close()
+        logger.info(f"用例结果已写入：{results_sink.file_path}（{results_sink.counts}）")
+        report_config = config.get("report") or {}
+        if report_config.get("render_on_finish", True):
+            index_path = render_report(results_sink.file_path, report_config.get("html_dir") or DEFAULT_HTML_DIR,
+                                       report_config.get("page_size") or DEFAULT_PAGE_SIZE)
+            logger.info(f"测试报告已生成：{index_path}")
+    logger.info("\n=============== 自动化测试会话结束 ===============\n")
+    # 写完后台队列中剩余的日志
+    shutdown_logging()
\ No newline at end of file
@@ -1,11 +1,325 @@
 """测试执行入口：可直接运行此文件执行所有用例
 也可通过命令行参数指定执行特定模块
 """
-import pytest
+import argparse
+import sys
 import os
 #import subprocess
 
+
+def parse_args():
+    """解析命令行参数（不带参数时与原来一样直接执行pytest）"""
+    parser = argparse.ArgumentParser(description="接口自动化测试执行入口")
+    parser.add_argument("--parallel", type=int, default=0, metavar="N",
+                        help="按变量依赖并发执行data目录下的用例，N为并发线程数")
+    parser.add_argument("--env", default="test",
+                        help="执行环境（config.yaml中env下的键）；逗号分隔多个环境时并发执行并输出对比（如test,staging）")
+    # 压测模式：复用YAML用例发压
+    parser.add_argument("--load", action="store_true", help="压测模式（需配合--rps或--vus）")
+    parser.add_argument("--rps", type=float, default=0, help="压测目标每秒请求数")
+    parser.add_argument("--vus", type=int, default=0, help="压测虚拟用户数")
+    parser.add_argument("--duration", type=float, default=60, help="压测持续时间（秒）")
+    parser.add_argument("--cases", default="", help="只压测指定的case_id（逗号分隔），默认全部")
+    parser.add_argument("--load-report", default="report/load_report.json", help="压测结果JSON文件路径")
+    # 多进程/多机执行：有变量依赖的用例分到同一分片，结束后合并结果
+    parser.add_argument("--workers", type=int, default=0, metavar="N",
+                        help="在本机启动N个工作进程分片执行（每个进程的线程数由--parallel指定，默认4）")
+    parser.add_argument("--shard", default="", metavar="i/N",
+                        help="多机执行：只执行第i个分片（共N个），结果写入--output-dir")
+    parser.add_argument("--merge", default="", metavar="DIR",
+                        help="合并目录中各分片的结果（worker-*.json），生成汇总报告")
+    parser.add_argument("--output-dir", default="report/workers", help="分片结果输出目录")
+    parser.add_argument("--mock", action="store_true",
+                        help="启动根据data目录用例生成的本地mock服务，替代config.yaml中的base_url（并发/压测模式）")
+    parser.add_argument("--cassette", choices=["off", "record", "replay", "verify"], default=None,
+                        help="请求录制回放模式（默认使用config.yaml中cassette.mode）")
+    parser.add_argument("--changed-only", action="store_true",
+                        help="只执行请求/预期或上游提取的变量自上次通过以来有变化的用例")
+    # 常驻进程：保持用例、连接池和token常驻内存，客户端通过本地socket提交执行
+    parser.add_argument("--daemon", choices=["serve", "status", "reload", "stop"], default=None,
+                        help="serve：启动常驻执行进程（前台运行，--env/--parallel/--mock指定环境、并发数和mock）；"
+                             "status/reload/stop：查看状态、重新加载用例、停止")
+    parser.add_argument("--client", action="store_true",
+                        help="通过常驻进程执行用例（可配合--cases、--changed-only、--parallel），逐条输出结果")
+    parser.add_argument("--metrics", action="store_true",
+                        help="并发/压测模式下开启实时指标（Prometheus端点和定时汇总，见config.yaml中metrics）")
+    parser.add_argument("--render-report", action="store_true",
+                        help="从结果文件（config.yaml中report.results_file）增量生成分页HTML报告后退出")
+    return parser.parse_args()
+
+
+def open_cassette(mode, env: str):
+    """按命令行/配置创建cassette（用于并发和压测模式），回放时登录态管理器不再登录"""
+    from src.utils.auth import get_auth_manager
+    from src.utils.cassette import load_cassette
+    from src.utils.config import load_config
+    cassette = load_cassette(load_config().get("cassette"), mode)
+    if cassette is not None and cassette.replaying:
+        get_auth_manager(env).offline = True
+    return cassette
+
+
+def close_cassette(cassette):
+    """关闭cassette并输出verify模式的差异报告"""
+    if cassette is None:
+        return
+    cassette.close()
+    report_path = cassette.save_report()
+    if report_path:
+        print(f"cassette校验发现{len(cassette.mismatches)}处响应差异，详见：{report_path}")
+
+
+def start_mock(env: str):
+    """启动本地mock服务（--mock），登录态管理器改用mock token，返回mock服务"""
+    from src.utils.auth import get_auth_manager
+    from src.utils.config import load_config
+    from src.utils.mock_server import MOCK_TOKEN, start_mock_server
+    from src.utils.scheduler import load_all_cases
+    config = load_config()
+    server = start_mock_server(load_all_cases(), config.get("mock"),
+                               login_path=(config.get("auth") or {}).get("login_path"))
+    auth = get_auth_manager(env)
+    auth.offline = True
+    auth.set_token(MOCK_TOKEN)
+    return server
+
+
+def run_parallel(workers: int, env: str, cassette_mode: str = None, mock: bool = False,
+                 changed_only: bool = False, metrics: bool = False) -> int:
+    """依赖感知的并发执行模式，返回进程退出码"""
+    from src.utils.api_runner import ApiRunner
+    from src.utils.auth import get_auth_manager
+    from src.utils.config import get_env_config, load_config
+    from src.utils.metrics import default_metrics, start_metrics
+    from src.utils.resilience import load_resilience
+    from src.utils.result_cache import load_result_cache
+    from src.utils.scheduler import CaseScheduler, load_all_cases
+    from src.utils.test_base import TestBase
+    from src.utils.var_handler import flush_vars
+
+    from src.utils.timing import default_recorder
+
+    env_config = get_env_config(env)
+    cassette = open_cassette(cassette_mode, env)
+    mock_server = start_mock(env) if mock else None
+    base_url = mock_server.base_url if mock_server else env_config["base_url"]
+    # 相同请求在各工作线程间只发送一次；记录通过的用例指纹，changed-only时跳过未变化的用例
+    response_cache, last_green = load_result_cache(load_config().get("result_cache"), changed_only,
+                                                 scope="mock" if mock else env)
+    # 失败重试和按主机熔断：后端故障时快速失败，不再逐个用例等待超时
+    retry, breaker = load_resilience(load_config().get("resilience"), base_url)
+    exporter = start_metrics(load_config().get("metrics"), enabled=metrics)
+
+    def runner_factory():
+        runner = ApiRunner(base_url=base_url, timeout=env_config.get("timeout", 10),
+                           auth=get_auth_manager(env), cassette=cassette, response_cache=response_cache,
+                           connect_timeout=env_config.get("connect_timeout"), retry=retry, breaker=breaker)
+        runner.add_hook(default_recorder.record)
+        if exporter is not None:
+            default_metrics.attach(runner)
+        return runner
+
+    results = CaseScheduler(load_all_cases(), runner_factory, workers=workers,
+                            executor=last_green.wrap(TestBase.run_case)).run()
+    if exporter is not None:
+        exporter.stop()
+    flush_vars()
+    last_green.save()
+    if response_cache is not None and response_cache.hits:
+        print(f"相同请求复用响应{response_cache.hits}次")
+    close_cassette(cassette)
+    if mock_server:
+        mock_server.stop()
+    if default_recorder.samples:
+        print(default_recorder.format_table())
+        default_recorder.export_json("report/latency.json")
+    return print_results(results)
+
+
+def format_result(result) -> str:
+    """格式化单个用例的执行结果"""
+    return (f"{result['status']:<8} {result['case_id']:<30} {result['duration'] * 1000:8.1f}ms"
+            + (f"  重试{result['retries']}次" if result.get("retries") else "")
+            + (f"  {result['error']}" if result["error"] else ""))
+
+
+def print_results(results) -> int:
+    """打印用例执行结果，返回进程退出码"""
+    for result in results:
+        print(format_result(result))
+    return 0 if all(r["status"] in ("passed", "cached") for r in results) else 1
+
+
+def run_daemon(args) -> int:
+    """启动常驻执行进程（阻塞直到收到stop命令）或发送控制命令，返回进程退出码"""
+    from src.utils.daemon import DaemonNotRunning, RunDaemon, request_daemon
+
+    if args.daemon == "serve":
+        setup_run_logging()
+        daemon = RunDaemon(args.env, workers=args.parallel or 4, mock=args.mock)
+        print(f"常驻进程已启动：{daemon.socket_path}（环境{daemon.env}，{daemon.base_url}），"
+              f"执行 python run.py --daemon stop 停止")
+        daemon.serve_forever()
+        return 0
+    try:
+        for message in request_daemon({"cmd": args.daemon}):
+            if message["type"] == "stopping":
+                print("常驻进程正在停止")
+            else:
+                print(" ".join(f"{key}={value}" for key, value in message.items() if key != "type"))
+    except DaemonNotRunning as e:
+        print(e)
+        return 1
+    return 0
+
+
+def run_client(args) -> int:
+    """通过常驻进程执行用例（不加载框架和用例，只转发请求并输出结果），返回进程退出码"""
+    from src.utils.daemon import DaemonNotRunning, request_daemon
+
+    request = {"cmd": "run", "cases": [c for c in args.cases.split(",") if c],
+               "changed_only": args.changed_only, "workers": args.parallel or None}
+    passed = True
+    try:
+        for message in request_daemon(request):
+            if message["type"] == "start" and message.get("dependencies"):
+                print(f"自动执行依赖的上游用例：{', '.join(message['dependencies'])}")
+            elif message["type"] == "result":
+                print(format_result(message), flush=True)
+                passed = passed and message["status"] in ("passed", "cached")
+            elif message["type"] == "done":
+                print(f"执行完成：{message['counts']}，耗时{message['duration']:.2f}s")
+            elif message["type"] == "error":
+                print(f"执行失败：{message['error']}")
+                return 1
+    except DaemonNotRunning as e:
+        print(e)
+        return 1
+    return 0 if passed else 1
+
+
+def run_distributed(args) -> int:
+    """多进程/多机执行模式，返回进程退出码"""
+    from src.utils.distributed import merge_results, parse_shard, run_shard, run_workers
+
+    threads = args.parallel or 4
+    if args.shard:
+        # 多机执行中的一台：只执行自己的分片，由--merge统一汇总
+        shard_index, shard_count = parse_shard(args.shard)
+        file_path = run_shard(shard_index, shard_count, args.env, threads, args.output_dir, mock=args.mock)
+        print(f"分片结果已写入：{file_path}")
+        return 0
+    if args.workers:
+        run_workers(args.workers, args.env, threads, args.output_dir, mock=args.mock)
+    report = merge_results(args.merge or args.output_dir)
+    if report["recorder"].samples:
+        print(report["recorder"].format_table())
+        report["recorder"].export_json("report/latency.json")
+    for worker in report["workers"]:
+        print(f"{worker['worker']} {worker['host']} 分片{worker['shard'][0]}/{worker['shard'][1]} "
+              f"耗时{worker['duration']:.2f}s {worker['counts']}")
+    if report.get("log_file"):
+        print(f"合并日志：{report['log_file']}")
+    return print_results(report["results"])
+
+
+def run_multi_env(args) -> int:
+    """多环境并发执行模式：每个环境一个工作进程，结束后输出结果和耗时对比，返回进程退出码"""
+    from src.utils.multi_env import compare_envs, format_comparison, parse_envs, run_envs
+
+    envs = parse_envs(args.env)
+    output_dir = args.output_dir if args.output_dir != "report/workers" else "report/envs"
+    report = compare_envs(run_envs(envs, args.parallel or 4, output_dir, mock=args.mock))
+    print(format_comparison(report))
+    print(f"对比报告：{report['report_file']}")
+    passed = all(item["status"] in ("passed", "cached") for row in report["cases"] for item in row["envs"].values())
+    return 0 if passed else 1
+
+
+def run_load(args) -> int:
+    """压测模式，返回进程退出码"""
+    from src.utils.api_runner import ApiRunner
+    from src.utils.auth import get_auth_manager
+    from src.utils.config import get_env_config, load_config
+    from src.utils.load_runner import LoadRunner, save_report
+    from src.utils.metrics import default_metrics, start_metrics
+    from src.utils.scheduler import load_all_cases
+    from src.utils.stats import format_summary_table
+
+    env_config = get_env_config(args.env)
+    cases = load_all_cases()
+    if args.cases:
+        selected = set(args.cases.split(","))
+        cases = [case for case in cases if case.get("case_id") in selected]
+
+    cassette = open_cassette(args.cassette, args.env)
+    mock_server = start_mock(args.env) if args.mock else None
+    base_url = mock_server.base_url if mock_server else env_config["base_url"]
+
+    # 长时间压测期间可通过实时指标端点观察吞吐和耗时
+    exporter = start_metrics(load_config().get("metrics"), enabled=args.metrics)
+
+    def runner_factory():
+        runner = ApiRunner(base_url=base_url, timeout=env_config.get("timeout", 10),
+                           auth=get_auth_manager(args.env), cassette=cassette)
+        if exporter is not None:
+            default_metrics.attach(runner)
+        return runner
+
+    schema_sample_rate = (load_config().get("schema") or {}).get("load_sample_rate", 0.0)
+    rows = LoadRunner(cases, runner_factory, duration=args.duration, rps=args.rps, vus=args.vus,
+                      schema_sample_rate=schema_sample_rate).run()
+    if exporter is not None:
+        exporter.stop()
+    close_cassette(cassette)
+    if mock_server:
+        mock_server.stop()
+    save_report(rows, args.load_report)
+    print(format_summary_table(rows))
+    return 0
+
+
+def render_results_report() -> int:
+    """从结果文件增量生成分页HTML报告，返回进程退出码"""
+    from src.utils.config import load_config
+    from src.utils.html_report import DEFAULT_HTML_DIR, DEFAULT_PAGE_SIZE, render_report
+    from src.utils.results_sink import DEFAULT_RESULTS_FILE
+
+    report_config = load_config().get("report") or {}
+    index_path = render_report(report_config.get("results_file") or DEFAULT_RESULTS_FILE,
+                               report_config.get("html_dir") or DEFAULT_HTML_DIR,
+                               report_config.get("page_size") or DEFAULT_PAGE_SIZE)
+    print(f"测试报告已生成：{index_path}")
+    return 0
+
+
+def setup_run_logging():
+    """非pytest模式下按config.yaml初始化日志"""
+    from src.utils.config import load_config
+    from src.utils.logger import setup_logging
+    setup_logging(**(load_config().get("log") or {}))
+
+
 if __name__ == "__main__":
+    args = parse_args()
+    if args.client:
+        sys.exit(run_client(args))
+    if args.daemon:
+        sys.exit(run_daemon(args))
+    if args.render_report:
+        sys.exit(render_results_report())
+    if "," in args.env:
+        sys.exit(run_multi_env(args))
+    if args.workers or args.shard or args.merge:
+        sys.exit(run_distributed(args))
+    if args.load or args.parallel:
+        setup_run_logging()
+    if args.load:
+        sys.exit(run_load(args))
+    if args.parallel:
+        sys.exit(run_parallel(args.parallel, args.env, args.cassette, args.mock, args.changed_only,
+                              args.metrics))
+
     # 执行所有用例并生成报告（默认）
     # pytest.main(["--html=report/all_report.html"])
 
@@ -14,6 +328,8 @@ if __name__ == "__main__":
      #pytest.main(["tests/test_order.py", "--html=report/order_report.html"])
 
 # 执行所有用例（使用pytest.ini中的配置）
+    # pytest只在此模式下导入（常驻进程客户端等模式不需要加载pytest及其插件）
+    import pytest
     pytest.main()
 
 # ################################html的报告##################
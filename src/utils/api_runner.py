@@ -1,39 +1,172 @@
 """接口请求执行器：封装requests，自动处理会话和token
 提供统一的接口请求方法，简化用例中的请求发送逻辑
+每个请求记录分段耗时（连接/TLS/首字节/下载/总耗时），并交给注册的钩子处理
 """
+import threading
+import time
+from typing import Callable, Dict
 import requests
-from src.utils.logger import logger
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from src.utils.json_path import response_json
+from src.utils.json_stream import stream_json
+from src.utils.logger import logger, lazy_repr
+from src.utils.resilience import RetryPolicy
+from src.utils.timing import add_request_time, add_retry, current_case_id
 from src.utils.var_handler import get_var  # 用于获取全局token
 
+# 当前线程正在发送的请求的建连耗时（连接在发请求的线程中建立）
+_conn_timing = threading.local()
+
+
+class _TimedConnectionMixin:
+    """记录建连耗时：_new_conn为DNS解析+TCP连接，connect额外包含TLS握手"""
+
+    def _new_conn(self):
+        start = time.perf_counter()
+        try:
+            return super()._new_conn()
+        finally:
+            _conn_timing.tcp = getattr(_conn_timing, "tcp", 0.0) + time.perf_counter() - start
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            _conn_timing.connect = getattr(_conn_timing, "connect", 0.0) + time.perf_counter() - start
+
+
+class _TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class _TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    pass
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class TimingAdapter(HTTPAdapter):
+    """使用可计时连接的适配器（复用连接时建连耗时为0）"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _TimedHTTPConnectionPool,
+            "https": _TimedHTTPSConnectionPool,
+        }
+
+
+class ApiResponse:
+    """接口响应包装：响应体最多解析一次，其他属性（status_code/text/headers等）透传给原始响应"""
+
+    def __init__(self, response):
+        """
+        Args:
+            response: 原始响应对象（requests.Response或httpx.Response）
+        """
+        self.raw = response
+
+    def json(self):
+        """解析响应JSON（首次调用时解析，之后返回缓存在原始响应上的结果）"""
+        return response_json(self.raw)
+
+    @property
+    def data(self):
+        """解析后的响应JSON"""
+        return self.json()
+
+    def __getattr__(self, name):
+        return getattr(self.raw, name)
+
+    def __bool__(self):
+        return bool(self.raw)
+
+    def __repr__(self):
+        return f"<ApiResponse [{self.raw.status_code}]>"
+
 
 class ApiRunner:
-    def __init__(self, base_url: str, timeout: int = 10):
+    def __init__(self, base_url: str, timeout: int = 10, auth=None, cassette=None, response_cache=None,
+                 connect_timeout: float = None, retry: RetryPolicy = None, breaker=None):
         """初始化执行器
         Args:
             base_url: 接口基础URL（如"https://t.rcwzsh.com:9999"）
-            timeout: 超时时间（秒）
+            timeout: 超时时间（秒）；指定connect_timeout时为读取超时
+            auth: 登录态管理器（AuthManager），指定后由其提供token并在401时自动刷新重试；
+                不指定时读取全局变量global.token
+            cassette: 请求录制回放（Cassette），指定后按其模式录制/回放/校验响应
+            response_cache: 响应复用缓存（ResponseCache），指定后同一次执行中相同的只读请求只发送一次，
+                可在多个执行器间共享；接口配置中 dedupe: false 时不复用，dedupe: true 时其他方法也复用
+            connect_timeout: 建立连接的超时时间（秒），不指定时与timeout相同
+            retry: 重试策略（RetryPolicy），接口配置中的retry可覆盖；不指定时不重试
+            breaker: 熔断器（CircuitBreaker，同一主机共享），熔断期间请求直接抛出CircuitOpenError
         """
         self.base_url = base_url
-        self.timeout = timeout
+        self.timeout = timeout if connect_timeout is None else (connect_timeout, timeout)
+        self.retry = retry
+        self.breaker = breaker
+        self.auth = auth
+        self.cassette = cassette
+        if auth is not None and cassette is not None:
+            auth.cassette = cassette  # 登录态管理器的登录请求与用例请求一起录制/回放/校验
+        self.response_cache = response_cache
         self.session = requests.Session()  # 创建会话，保持cookie等状态
+        # 挂载可计时的连接适配器，用于统计建连和TLS握手耗时
+        adapter = TimingAdapter()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.hooks = []  # 请求完成后的钩子，参数为耗时样本字典
+        self.start_hooks = []  # 请求发出前的钩子，参数为(方法, 路径)
 
-    def run(self, api_config: dict) -> requests.Response:
+    def add_hook(self, hook: Callable[[Dict], None]):
+        """注册请求完成钩子（如TimingRecorder.record），每个请求结束后以耗时样本调用
+        样本字段：case_id/method/path/status/connect/tls/ttfb/download/total（秒）/error/attempt（重试序号）
+        """
+        self.hooks.append(hook)
+
+    def add_start_hook(self, hook: Callable[[str, str], None]):
+        """注册请求发出前的钩子（如实时指标的进行中计数），参数为(方法, 路径)；
+        每次调用之后都会有一次add_hook注册的钩子调用与之对应（包括请求异常）
+        """
+        self.start_hooks.append(hook)
+
+    def run(self, api_config: dict) -> ApiResponse:
         """执行接口请求
         Args:
             api_config: 接口配置字典，包含method/path等信息
         Returns:
-            接口响应对象
+            接口响应对象（ApiResponse，响应体只解析一次）
         """
+        if self.response_cache is not None and api_config.get("dedupe", True):
+            return self.response_cache.get_or_run(api_config, self._run)
+        return self._run(api_config)
+
+    def _run(self, api_config: dict) -> ApiResponse:
+        """发送请求（按重试策略重试；token失效时刷新后重试一次）"""
         # 解析接口配置
         method = api_config.get("method", "get").lower()  # 请求方法（默认get）
         path = api_config.get("path")  # 接口路径（如"/api/order/create"）
         params = api_config.get("params", {})  # URL参数
         json_data = api_config.get("json", {})  # JSON请求体
         data = api_config.get("data", {})  # 表单请求体
-        headers = api_config.get("headers", {})  # 请求头
+        headers = dict(api_config.get("headers", {}))  # 请求头（复制一份，避免修改传入的配置）
 
-        # 自动添加token到请求头（若存在全局token）
-        token = get_var("global.token")
+        # 自动添加token到请求头（优先使用登录态管理器，否则使用全局token）
+        # 登录接口本身不需要token：不通过登录态管理器获取（否则token不可用时会先登录一次）
+        login_request = self.auth is not None and path == self.auth.config.get("login_path")
+        if login_request:
+            token = None
+        else:
+            token = self.auth.get_token() if self.auth is not None else get_var("global.token")
         if token:
             # 按接口要求的格式添加（此处为示例，需根据实际接口调整）
             headers["x-oiltax-token"] = token
@@ -45,22 +178,131 @@ class ApiRunner:
 
         # 拼接完整URL
         full_url = self.base_url + path
-        logger.info(f"【请求】{method.upper()} {full_url}")  # 打印请求方法和URL
-        logger.debug(f"请求参数: params={params}, json={json_data}")  # 调试日志
+        # 日志参数延迟格式化：日志级别未开启时不做任何字符串拼接和序列化
+        logger.info("【请求】%s %s", method.upper(), full_url)  # 打印请求方法和URL
+        logger.debug("请求参数: params=%s, json=%s", lazy_repr(params), lazy_repr(json_data))  # 调试日志
+
+        request_kwargs = dict(method=method, url=full_url, params=params, json=json_data,
+                              data=data, headers=headers)
+        policy = (self.retry or RetryPolicy()).override(api_config.get("retry"))
+        # 流式解析的路径（由CompiledCase.render_api计算）；录制回放需要完整响应体，不流式解析
+        stream_paths = api_config.get("stream") if self.cassette is None else None
+        if not isinstance(stream_paths, (list, tuple)):
+            stream_paths = None
+        response = self._send_with_retry(path, request_kwargs, policy, stream_paths)
+        if response.status_code == 401 and self.auth is not None and not login_request:
+            # token失效：刷新（并发请求只会触发一次登录）后重试一次
+            logger.warning("token已失效（401），刷新token后重试：%s %s", method.upper(), path)
+            headers["x-oiltax-token"] = self.auth.refresh(stale_token=token)
+            response = self._send_with_retry(path, request_kwargs, policy, stream_paths)
+        return ApiResponse(response)
 
+    def _send_with_retry(self, path: str, request_kwargs: dict, policy: RetryPolicy,
+                         stream_paths=None) -> requests.Response:
+        """按重试策略发送请求：连接异常、超时或指定状态码时退避后重试，并向熔断器报告结果
+        连接异常、超时和熔断器的failure_statuses（默认502/503/504）计为主机失败；
+        其他异常不计入成败，但会释放熔断器的探测名额（避免探测请求异常后主机一直处于熔断状态）
+        """
+        method = request_kwargs["method"]
+        retries = policy.max_retries if policy.allows(method) else 0
+        attempt = 0
+        while True:
+            if self.breaker is not None:
+                self.breaker.allow()
+            try:
+                response = self._send(path, request_kwargs, attempt, stream_paths)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if self.breaker is not None:
+                    self.breaker.record_failure()
+                if attempt >= retries:
+                    raise
+                reason = type(e).__name__
+            except BaseException:
+                if self.breaker is not None:
+                    self.breaker.release()
+                raise
+            else:
+                if self.breaker is not None:
+                    if response.status_code in self.breaker.failure_statuses:
+                        self.breaker.record_failure()
+                    else:
+                        self.breaker.record_success()
+                if attempt >= retries or response.status_code not in policy.retry_statuses:
+                    return response
+                reason = f"状态码{response.status_code}"
+                response.close()
+            delay = policy.delay(attempt)
+            attempt += 1
+            add_retry()
+            logger.warning("请求失败（%s），%.2fs后第%d次重试：%s %s", reason, delay, attempt, method.upper(), path)
+            time.sleep(delay)
+
+    def _send(self, path: str, request_kwargs: dict, attempt: int = 0, stream_paths=None) -> requests.Response:
+        """发送单次请求并记录分段耗时（attempt为重试序号，首次请求为0）
+        指定stream_paths时，2xx响应边下载边解析，只保留这些JSONPath的值（见json_stream）
+        """
+        method = request_kwargs["method"]
+        _conn_timing.tcp = _conn_timing.connect = 0.0
+        for hook in self.start_hooks:
+            try:
+                hook(method, path)
+            except Exception as e:
+                logger.warning("请求钩子执行失败: %s", e)
+        start = time.perf_counter()
+        status, error = None, None
+        headers_at = None
         try:
-            # 发送请求
-            response = self.session.request(
-                method=method,
-                url=full_url,
-                params=params,
-                json=json_data,
-                data=data,
-                headers=headers,
-                timeout=self.timeout
-            )
-            logger.info(f"【响应】状态码: {response.status_code}")  # 打印响应状态码
+            # 发送请求（stream=True：收到响应头即返回，便于分别统计首字节和下载耗时）
+            if self.cassette is not None:
+                response = self.cassette.send(self.session, path, request_kwargs,
+                                              timeout=self.timeout, stream=True)
+            else:
+                response = self.session.request(timeout=self.timeout, stream=True, **request_kwargs)
+            headers_at = time.perf_counter()
+            try:
+                if stream_paths and 200 <= response.status_code < 300:
+                    stream_json(response, stream_paths)
+                else:
+                    response.content  # 读取完整响应体（之后与非stream模式用法一致）
+            except (requests.ConnectionError, requests.Timeout):
+                raise
+            except requests.RequestException as e:
+                # 读取响应体中途断开（如ChunkedEncodingError），按连接异常处理（可重试，计入熔断）
+                response.close()
+                raise requests.ConnectionError(f"读取响应体失败：{type(e).__name__}: {e}", response=response) from e
+            status = response.status_code
+            logger.info("【响应】状态码: %s", response.status_code)  # 打印响应状态码
             return response
         except Exception as e:
-            logger.error(f"请求执行失败: {str(e)}")
-            raise  # 抛出异常，让用例捕获
\ No newline at end of file
+            error = str(e)
+            logger.error("请求执行失败: %s", e)
+            raise  # 抛出异常，让用例捕获
+        finally:
+            self._emit_timing(method, path, status, error, start, headers_at, attempt)
+
+    def _emit_timing(self, method, path, status, error, start, headers_at, attempt=0):
+        """生成耗时样本并调用钩子"""
+        end = time.perf_counter()
+        total = end - start
+        add_request_time(total)
+        if not self.hooks:
+            return
+        connect = _conn_timing.connect
+        sample = {
+            "case_id": current_case_id(),
+            "method": method.upper(),
+            "path": path,
+            "status": status,
+            "connect": connect,
+            "tls": max(0.0, connect - _conn_timing.tcp),
+            "ttfb": (headers_at or end) - start,
+            "download": end - headers_at if headers_at else 0.0,
+            "total": total,
+            "error": error,
+            "attempt": attempt,
+        }
+        for hook in self.hooks:
+            try:
+                hook(sample)
+            except Exception as e:
+                logger.warning("请求钩子执行失败: %s", e)
@@ -1,10 +1,141 @@
 """断言工具类：封装常用的断言方法，简化用例中的断言逻辑
 支持响应状态码断言、JSON字段断言等
+批量断言（assert_all）把expected.json中的所有路径编译为一棵路径树，对响应体只遍历一次，
+支持类型/正则/范围/长度/子集匹配，并一次性报告全部不匹配项
+结构断言（assert_schema）使用编译缓存的schema校验函数，可按比例抽样校验
 """
-import jsonpath
+import random
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+from src.utils.json_path import compile_path, find as json_path_find, response_json
 from src.utils.logger import logger
+from src.utils.schema import validate as schema_validate
 import requests
 
+# 断言值为只含以下键的字典时视为匹配器，如 {"$type": "str"}、{"$range": [1, 100]}
+MATCHERS = ("$type", "$regex", "$range", "$len", "$subset")
+# $type支持的类型名
+TYPE_NAMES = {
+    "str": str, "int": int, "float": float, "number": (int, float), "bool": bool,
+    "list": list, "dict": dict, "null": type(None),
+}
+_MISSING = object()
+
+
+def normalize_path(json_path: str) -> str:
+    """expected.json中的键（如"data.orderId"）转为JSONPath（"$.data.orderId"），已是JSONPath时原样返回"""
+    return json_path if json_path.startswith("$") else f"$.{json_path}"
+
+
+@lru_cache(maxsize=256)
+def compile_plan(paths: Tuple[str, ...]):
+    """把一组JSONPath编译为遍历计划（按路径元组缓存，同一用例的路径只编译一次）
+    Returns:
+        (路径树, 回退路径下标列表)：路径树节点为 (取值步骤→子节点 的字典, 在该节点取值的路径下标列表)；
+        过滤、通配符等复杂表达式无法放入路径树，单独用JSONPath求值
+    """
+    root = ({}, [])
+    fallback = []
+    for idx, path in enumerate(paths):
+        steps = compile_path(path).steps
+        if steps is None:
+            fallback.append(idx)
+            continue
+        node = root
+        for step in steps:
+            node = node[0].setdefault(step, ({}, []))
+        node[1].append(idx)
+    return root, fallback
+
+
+def _walk(value, node, actual: list):
+    """沿路径树遍历响应体，把每个路径的取值写入actual（路径不存在的保持_MISSING）"""
+    children, leaves = node
+    for idx in leaves:
+        actual[idx] = value
+    for step, child in children.items():
+        if isinstance(step, int):
+            if isinstance(value, list) and step < len(value):
+                _walk(value[step], child, actual)
+        elif isinstance(value, dict) and step in value:
+            _walk(value[step], child, actual)
+
+
+def is_matcher(expected) -> bool:
+    """预期值是否为匹配器字典（所有键都是MATCHERS中的匹配器）"""
+    return isinstance(expected, dict) and bool(expected) and all(k in MATCHERS for k in expected)
+
+
+def _is_subset(expected, actual) -> bool:
+    """expected是否为actual的子集：字典按键递归比较，列表要求每个元素都能在actual中找到"""
+    if isinstance(expected, dict):
+        return isinstance(actual, dict) and all(
+            k in actual and _is_subset(v, actual[k]) for k, v in expected.items())
+    if isinstance(expected, list):
+        return isinstance(actual, list) and all(
+            any(_is_subset(e, a) for a in actual) for e in expected)
+    return expected == actual
+
+
+def _in_range(value, bounds) -> bool:
+    """bounds为[最小值, 最大值]（任一端可为null表示不限）"""
+    low, high = bounds
+    return (low is None or value >= low) and (high is None or value <= high)
+
+
+def match_value(actual, expected) -> Optional[str]:
+    """按预期值或匹配器校验实际值，匹配时返回None，否则返回原因"""
+    if not is_matcher(expected):
+        return None if actual == expected else f"预期{expected!r}，实际{actual!r}"
+    for name, arg in expected.items():
+        if name == "$type":
+            names = arg if isinstance(arg, list) else [arg]
+            types = tuple(TYPE_NAMES[n] for n in names if n in TYPE_NAMES)
+            # bool是int的子类，未声明bool时不把True/False当作数字
+            ok = isinstance(actual, types) and not (isinstance(actual, bool) and "bool" not in names)
+            if not ok:
+                return f"预期类型{arg}，实际{type(actual).__name__}（{actual!r}）"
+        elif name == "$regex":
+            if not isinstance(actual, str) or re.search(arg, actual) is None:
+                return f"预期匹配正则{arg!r}，实际{actual!r}"
+        elif name == "$range":
+            if isinstance(actual, bool) or not isinstance(actual, (int, float)) or not _in_range(actual, arg):
+                return f"预期范围{arg}，实际{actual!r}"
+        elif name == "$len":
+            try:
+                length = len(actual)
+            except TypeError:
+                return f"预期长度{arg}，实际值没有长度（{actual!r}）"
+            if not (_in_range(length, arg) if isinstance(arg, list) else length == arg):
+                return f"预期长度{arg}，实际长度{length}"
+        elif name == "$subset":
+            if not _is_subset(arg, actual):
+                return f"预期包含{arg!r}，实际{actual!r}"
+    return None
+
+
+def collect_mismatches(body, expected_json: Dict) -> List[str]:
+    """对已解析的响应体一次性校验expected.json中的全部字段，返回所有不匹配项的描述"""
+    paths = tuple(normalize_path(p) for p in expected_json)
+    expected_values = list(expected_json.values())
+    root, fallback = compile_plan(paths)
+    actual = [_MISSING] * len(paths)
+    _walk(body, root, actual)
+    for idx in fallback:
+        result = json_path_find(body, paths[idx])
+        if result:
+            actual[idx] = result[0]
+    mismatches = []
+    for path, act, exp in zip(paths, actual, expected_values):
+        if act is _MISSING:
+            mismatches.append(f"{path}：路径不存在或无匹配值")
+            continue
+        reason = match_value(act, exp)
+        if reason:
+            mismatches.append(f"{path}：{reason}")
+    return mismatches
+
 
 class AssertUtils:
     @staticmethod
@@ -28,15 +159,64 @@ class AssertUtils:
             expected_value: 预期值
         """
         try:
-            # 解析响应JSON并提取字段值
-            actual_value = jsonpath.jsonpath(response.json(), json_path)[0]
-            # 执行断言
-            assert actual_value == expected_value, \
-                f"JSON字段断言失败: 路径{json_path}，预期{expected_value}，实际{actual_value}"
-            logger.info(f"JSON字段断言通过：{json_path} = {expected_value}")
-        except IndexError:
+            # 解析响应JSON（同一响应只解析一次）
+            body = response_json(response)
+        except ValueError:
+            # 响应不是JSON格式
+            raise AssertionError(f"响应无法解析为JSON，无法执行断言：{json_path}")
+        # 用编译缓存的JSONPath提取字段值
+        result = json_path_find(body, json_path)
+        if not result:
             # JSONPath未找到匹配结果
             raise AssertionError(f"JSONPath路径不存在或无匹配值：{json_path}")
-        except TypeError:
-            # 响应不是JSON格式
-            raise AssertionError(f"响应无法解析为JSON，无法执行断言：{json_path}")
\ No newline at end of file
+        actual_value = result[0]
+        # 执行断言
+        assert actual_value == expected_value, \
+            f"JSON字段断言失败: 路径{json_path}，预期{expected_value}，实际{actual_value}"
+        logger.info(f"JSON字段断言通过：{json_path} = {expected_value}")
+
+    @staticmethod
+    def assert_all(response: requests.Response, expected: Dict):
+        """批量断言：状态码和expected.json中的全部字段一次校验完，失败时一并报告所有不匹配项
+        Args:
+            response: 接口响应对象
+            expected: 用例的预期结果，如 {"code": 200, "json": {"msg": "操作成功",
+                "data.list": {"$len": [1, null]}, "data.amount": {"$range": [0, 100]}}}
+        """
+        mismatches = []
+        if "code" in expected and response.status_code != expected["code"]:
+            mismatches.append(f"状态码：预期{expected['code']}，实际{response.status_code}")
+        expected_json = expected.get("json") or {}
+        if expected_json:
+            try:
+                body = response_json(response)
+            except ValueError:
+                mismatches.append("响应无法解析为JSON，无法执行JSON字段断言")
+            else:
+                mismatches.extend(collect_mismatches(body, expected_json))
+        assert not mismatches, \
+            f"断言失败（{len(mismatches)}项）:\n" + "\n".join(mismatches)
+        logger.info(f"批量断言通过：状态码 + {len(expected_json)}个JSON字段")
+
+    @staticmethod
+    def assert_schema(response: requests.Response, schema, sample_rate: float = 1.0) -> bool:
+        """断言响应体符合schema
+        Args:
+            response: 接口响应对象
+            schema: schemas目录下的文件名、schema字典或已编译的校验函数（如CompiledCase.validator）
+            sample_rate: 抽样比例（0~1），高RPS时只校验部分响应
+        Returns:
+            是否执行了校验（未被抽中时返回False）
+        """
+        if sample_rate < 1.0 and random.random() >= sample_rate:
+            return False
+        try:
+            body = response_json(response)
+        except ValueError:
+            raise AssertionError("响应无法解析为JSON，无法执行结构断言")
+        errors = schema_validate(body, schema)
+        assert not errors, \
+            f"响应结构断言失败（{len(errors)}项）:\n" + "\n".join(errors[:20]) + \
+            (f"\n...（共{len(errors)}项）" if len(errors) > 20 else "")
+        logger.info("响应结构断言通过")
+        return True
@@ -0,0 +1,154 @@
+"""异步接口请求执行器：ApiRunner的asyncio版本，适合批量并发发送YAML用例请求
+- 接受与ApiRunner.run相同的api_config字典
+- 所有请求共享一个可调节的长连接池，服务端支持时使用HTTP/2
+- 通过信号量限制同时在途的请求数
+依赖httpx（HTTP/2还需要h2）：pip install "httpx[http2]"
+"""
+import asyncio
+from typing import AsyncIterator, Iterable, Tuple, Union
+from src.utils.api_runner import ApiResponse
+from src.utils.logger import logger
+from src.utils.var_handler import get_var  # 用于获取全局token
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover - 未安装httpx时只有使用异步执行器才会报错
+    httpx = None
+
+try:
+    import h2  # noqa: F401  HTTP/2支持
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+class AsyncApiRunner:
+    def __init__(self, base_url: str, timeout: int = 10, max_concurrency: int = 20,
+                 max_connections: int = 100, max_keepalive_connections: int = 20,
+                 keepalive_expiry: float = 30.0, http2: bool = True, auth=None):
+        """初始化异步执行器
+        Args:
+            base_url: 接口基础URL（如"https://t.rcwzsh.com:9999"）
+            timeout: 超时时间（秒），与ApiRunner一致：连接和读取分别计时
+            max_concurrency: 同时在途的最大请求数
+            max_connections: 连接池最大连接数
+            max_keepalive_connections: 连接池保留的最大空闲长连接数
+            keepalive_expiry: 空闲长连接的保留时间（秒）
+            http2: 是否启用HTTP/2（需安装h2，服务端不支持时自动降级为HTTP/1.1）
+            auth: 登录态管理器（AuthManager），用法与ApiRunner相同
+        """
+        if httpx is None:
+            raise ImportError('AsyncApiRunner依赖httpx，请先安装：pip install "httpx[http2]"')
+        if http2 and not HTTP2_AVAILABLE:
+            logger.warning("未安装h2，AsyncApiRunner将使用HTTP/1.1")
+            http2 = False
+        self.base_url = base_url
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.http2 = http2
+        self.auth = auth
+        self._client = None  # 首次请求时在当前事件循环中创建
+        self._semaphore = None
+
+    @property
+    def client(self) -> "httpx.AsyncClient":
+        """共享的异步客户端（所有请求复用同一个连接池）"""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                limits=self.limits,
+                http2=self.http2,
+                timeout=httpx.Timeout(self.timeout),
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._client
+
+    async def run(self, api_config: dict) -> ApiResponse:
+        """执行接口请求
+        Args:
+            api_config: 接口配置字典，包含method/path等信息
+        Returns:
+            接口响应对象（ApiResponse包装的httpx.Response，status_code/json()等用法与同步版本一致）
+        """
+        # 解析接口配置
+        method = api_config.get("method", "get").lower()  # 请求方法（默认get）
+        path = api_config.get("path")  # 接口路径（如"/api/order/create"）
+        params = api_config.get("params", {})  # URL参数
+        json_data = api_config.get("json", {})  # JSON请求体
+        data = api_config.get("data", {})  # 表单请求体
+        headers = dict(api_config.get("headers", {}))  # 请求头（复制一份，避免并发时修改共享配置）
+
+        # 自动添加token到请求头（优先使用登录态管理器，否则使用全局token）
+        token = self.auth.get_token() if self.auth is not None else get_var("global.token")
+        if token:
+            headers["x-oiltax-token"] = token
+
+        # 校验路径是否存在
+        if not path:
+            raise ValueError("接口配置缺少必要的'path'（路径）参数")
+
+        # 拼接完整URL
+        full_url = self.base_url + path
+        client = self.client
+        async with self._semaphore:
+            logger.info("【异步请求】%s %s", method.upper(), full_url)
+            request_kwargs = dict(
+                method=method,
+                url=full_url,
+                params=params,
+                json=json_data,
+                data=data or None,  # 与requests一致：表单为空时发送JSON请求体
+                headers=headers,
+            )
+            try:
+                response = await client.request(**request_kwargs)
+                if response.status_code == 401 and self.auth is not None:
+                    # token失效：在线程中刷新（并发请求只会触发一次登录），然后重试一次
+                    logger.warning("token已失效（401），刷新token后重试：%s %s", method.upper(), path)
+                    headers["x-oiltax-token"] = await asyncio.to_thread(self.auth.refresh, token)
+                    response = await client.request(**request_kwargs)
+            except Exception as e:
+                logger.error("异步请求执行失败: %s %s，%s", method.upper(), full_url, e)
+                raise
+        logger.info("【异步响应】%s %s 状态码: %s（%s）",
+                    method.upper(), path, response.status_code, response.http_version)
+        return ApiResponse(response)
+
+    async def run_many(self, configs: Iterable[dict]) -> AsyncIterator[
+            Tuple[int, Union[ApiResponse, Exception]]]:
+        """并发执行多个请求，按完成先后逐个返回结果
+        Args:
+            configs: 接口配置字典列表
+        Yields:
+            (配置在列表中的下标, 响应对象或请求异常)，单个请求失败不影响其他请求
+        """
+        async def run_indexed(index, config):
+            try:
+                return index, await self.run(config)
+            except Exception as e:
+                return index, e
+
+        tasks = [asyncio.ensure_future(run_indexed(i, c)) for i, c in enumerate(configs)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # 调用方提前结束迭代时取消尚未完成的请求
+            for task in tasks:
+                task.cancel()
+
+    async def aclose(self):
+        """关闭连接池"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
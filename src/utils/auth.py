@@ -0,0 +1,237 @@
+"""登录态管理：执行登录流程，在内存中缓存token及其过期时间
+- token临近过期时提前刷新（由一个线程刷新，其他线程继续使用旧token）
+- 接口返回401时刷新token，并发请求同时发现失效时只登录一次（single-flight）
+- 同一台机器上的多个进程通过.token_cache.json共享token，文件锁保证只有一个进程去登录
+- 刷新后同步写入global.token（及签发环境的base_url：global.token_base_url），兼容直接读取全局变量的旧用法；
+  启动时只沿用同一base_url签发的global.token，多环境执行时各环境不会拿到其他环境的token
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Dict, Optional
+import requests
+from src.utils.config import DEFAULT_ENV, current_env, get_env_config, load_config
+from src.utils.json_path import find as json_path_find
+from src.utils.logger import logger
+from src.utils.var_handler import get_var, set_var
+
+try:
+    import fcntl  # 跨进程文件锁（Windows下不可用，退化为仅进程内互斥）
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+# 跨进程共享的token缓存文件：项目根目录下的.token_cache.json
+TOKEN_CACHE_FILE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(__file__))), ".token_cache.json"
+)
+
+# 登录相关默认配置（可在config.yaml的auth节点中覆盖）
+DEFAULT_AUTH_CONFIG = {
+    "login_path": "/api/customer/person/login/user",  # 登录接口路径
+    "token_path": "$.data.token",  # token在登录响应中的JSONPath
+    "expires_in_path": "$.data.expiresIn",  # 有效期（秒）在登录响应中的JSONPath，取不到时使用token_ttl
+    "token_ttl": 7200,  # 默认token有效期（秒）
+    "refresh_margin": 300,  # 距离过期不足该秒数时提前刷新
+}
+
+
+class AuthManager:
+    """单个环境（base_url）的登录态管理器，线程安全"""
+
+    def __init__(self, base_url: str, timeout: int = 10, auth_config: Optional[Dict] = None,
+                 cache_file: str = TOKEN_CACHE_FILE):
+        """初始化登录态管理器
+        Args:
+            base_url: 接口基础URL（同时作为共享缓存中的键）
+            timeout: 登录请求超时时间（秒）
+            auth_config: 登录配置，缺省项使用DEFAULT_AUTH_CONFIG
+            cache_file: 跨进程共享的token缓存文件
+        """
+        self.base_url = base_url
+        self.timeout = timeout
+        self.config = {**DEFAULT_AUTH_CONFIG, **(auth_config or {})}
+        self.cache_file = cache_file
+        self._token = None
+        self._expires_at = 0.0
+        self._lock = threading.Lock()  # 进程内的刷新锁（single-flight）
+        self.offline = False  # 离线模式（如cassette回放）：不登录，只使用已有的token
+        self.cassette = None  # 请求录制回放（Cassette），由使用本管理器的ApiRunner设置，登录请求同样录制/校验
+        self._load_initial_token()
+
+    def _load_initial_token(self):
+        """启动时优先使用共享缓存中的有效token，其次使用user_vars.yaml中同一环境签发的global.token"""
+        cached = self._read_shared()
+        if cached:
+            self._token, self._expires_at = cached["token"], cached["expires_at"]
+            return
+        token = get_var("global.token")
+        token_base_url = get_var("global.token_base_url")
+        if token_base_url is None:
+            # 旧版本写入的token没有记录签发环境，按默认环境的token处理
+            token_base_url = ((load_config().get("env") or {}).get(DEFAULT_ENV) or {}).get("base_url")
+        if token and token_base_url == self.base_url:
+            # 不知道已有token的签发时间，先按完整有效期使用，失效时由401触发刷新
+            self._token, self._expires_at = token, time.time() + self.config["token_ttl"]
+
+    @property
+    def token(self) -> Optional[str]:
+        """当前缓存的token（不触发刷新）"""
+        return self._token
+
+    def get_token(self) -> str:
+        """获取可用的token：有效期充足时直接返回；临近过期时由一个线程提前刷新；已过期时刷新后返回"""
+        token, expires_at = self._token, self._expires_at
+        now = time.time()
+        if self.offline or (token and now < expires_at - self.config["refresh_margin"]):
+            return token
+        if token and now < expires_at:
+            # 临近过期但仍可用：抢到锁的线程去刷新，其他线程继续使用当前token，不阻塞
+            if self._lock.acquire(blocking=False):
+                try:
+                    if self._token == token:
+                        self._refresh_locked(token)
+                except Exception as e:
+                    logger.warning(f"提前刷新token失败，继续使用当前token：{e}")
+                finally:
+                    self._lock.release()
+            return self._token
+        return self.refresh(stale_token=token)
+
+    def refresh(self, stale_token: Optional[str] = None) -> str:
+        """刷新token（single-flight）
+        Args:
+            stale_token: 调用方认为已失效的token；若其他线程/进程已经换成了新token，则直接使用新token
+        """
+        if self.offline:
+            return self._token
+        with self._lock:
+            if self._token and self._token != stale_token and time.time() < self._expires_at:
+                return self._token  # 等待期间已被其他线程刷新
+            return self._refresh_locked(stale_token)
+
+    def set_token(self, token: str, expires_in: Optional[float] = None):
+        """使用外部获取的token（如登录用例中提取的token），并同步到共享缓存和global.token"""
+        expires_at = time.time() + (expires_in or self.config["token_ttl"])
+        with self._lock:
+            self._token, self._expires_at = token, expires_at
+            if self.offline:
+                return  # 离线模式下的token（如回放的登录响应）不写入共享缓存
+            with self._file_lock():
+                self._write_shared(token, expires_at)
+        set_var("global.token", token)
+        set_var("global.token_base_url", self.base_url)
+
+    def _refresh_locked(self, stale_token: Optional[str]) -> str:
+        """已持有进程内锁时刷新：先看其他进程是否已刷新，否则执行登录"""
+        with self._file_lock():
+            cached = self._read_shared()
+            if cached and cached["token"] != stale_token:
+                token, expires_at = cached["token"], cached["expires_at"]
+                logger.info("已使用其他进程刷新的token")
+            else:
+                token, expires_at = self.login()
+                self._write_shared(token, expires_at)
+        self._token, self._expires_at = token, expires_at
+        set_var("global.token", token)
+        set_var("global.token_base_url", self.base_url)
+        return token
+
+    def login(self):
+        """执行登录流程，返回(token, 过期时间戳)"""
+        username = get_var("user.username")  # 读取用户手机号
+        sms_code = get_var("user.smsCode")  # 读取验证码
+        if not username or not sms_code:
+            raise ValueError("请在config/user_vars.yaml中配置user.username和user.smsCode")
+        path = self.config["login_path"]
+        url = self.base_url + path
+        logger.info(f"【登录】POST {url}")
+        request_kwargs = dict(method="post", url=url, json={"mobile": username, "smsCode": sms_code})
+        with requests.Session() as session:
+            if self.cassette is not None:
+                response = self.cassette.send(session, path, request_kwargs, timeout=self.timeout)
+            else:
+                response = session.request(**request_kwargs, timeout=self.timeout)
+        try:
+            body = response.json()
+        except ValueError:
+            raise ValueError(f"登录失败：响应不是JSON（状态码{response.status_code}）")
+        token_list = json_path_find(body, self.config["token_path"])
+        if response.status_code != 200 or not token_list or not token_list[0]:
+            raise ValueError(f"登录失败：状态码{response.status_code}，"
+                             f"未从响应中提取到token（JSONPath：{self.config['token_path']}）")
+        expires_in = json_path_find(body, self.config["expires_in_path"])
+        ttl = expires_in[0] if expires_in and isinstance(expires_in[0], (int, float)) \
+            else self.config["token_ttl"]
+        logger.info(f"登录成功，token有效期{ttl}s")
+        return token_list[0], time.time() + ttl
+
+    # ---------- 跨进程共享缓存 ----------
+
+    def _file_lock(self):
+        """跨进程文件锁（上下文管理器）"""
+        return _FileLock(self.cache_file + ".lock")
+
+    def _read_shared(self) -> Optional[Dict]:
+        """读取共享缓存中当前环境未过期的token"""
+        try:
+            with open(self.cache_file, "r", encoding="utf-8") as f:
+                entry = json.load(f).get(self.base_url)
+        except (OSError, ValueError):
+            return None
+        if entry and entry.get("token") and time.time() < entry.get("expires_at", 0) - self.config["refresh_margin"]:
+            return entry
+        return None
+
+    def _write_shared(self, token: str, expires_at: float):
+        """写入共享缓存（需持有文件锁），临时文件+重命名保证其他进程读到完整内容"""
+        try:
+            with open(self.cache_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = {}
+        data[self.base_url] = {"token": token, "expires_at": expires_at}
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.cache_file), suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.cache_file)
+
+
+class _FileLock:
+    """基于fcntl.flock的排他文件锁；不支持fcntl的平台上为空操作"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fd = None
+
+    def __enter__(self):
+        if fcntl is not None:
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+
+
+# 每个环境一个登录态管理器（进程内共享）
+_managers: Dict[str, AuthManager] = {}
+_managers_lock = threading.Lock()
+
+
+def get_auth_manager(env: str = None) -> AuthManager:
+    """获取指定环境的登录态管理器（首次调用时按config.yaml创建），不指定环境时为当前执行环境"""
+    env = env or current_env()
+    with _managers_lock:
+        if env not in _managers:
+            env_config = get_env_config(env)
+            _managers[env] = AuthManager(
+                base_url=env_config["base_url"],
+                timeout=env_config.get("timeout", 10),
+                auth_config=load_config().get("auth"),
+            )
+        return _managers[env]
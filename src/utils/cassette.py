@@ -0,0 +1,235 @@
+"""请求录制回放（cassette）：把接口请求/响应对保存到本地文件，离线时直接用本地响应执行用例
+- record：正常请求接口，同时把响应写入cassette文件
+- replay：不访问网络，按请求返回录制的响应（未录制的请求直接报错）
+- verify：正常请求接口，并与录制的响应对比，记录状态码和JSON字段的差异
+- off：不启用
+请求以 方法 + 路径 + 请求参数的规范化哈希 作为键（不含base_url和请求头，同一份录制可用于不同环境）；
+同一个键录制了多次时按顺序依次返回，用完后重复返回最后一次的响应
+"""
+import base64
+import hashlib
+import json
+import os
+import threading
+from typing import Dict, List, Optional
+import requests
+from requests.structures import CaseInsensitiveDict
+from src.utils.json_path import response_json
+from src.utils.logger import logger
+
+# cassette文件默认目录：项目根目录下的cassettes
+CASSETTE_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "cassettes"
+)
+MODES = ("off", "record", "replay", "verify")
+# 录制时保留的响应头（其他响应头与用例断言无关，不保存）
+KEPT_HEADERS = ("Content-Type",)
+
+
+class CassetteError(Exception):
+    """回放模式下请求未被录制"""
+
+
+def request_key(method: str, path: str, params=None, json_data=None, data=None) -> str:
+    """生成请求键：方法 + 路径 + 请求参数的规范化JSON（键排序、无空白）的sha1"""
+    body = json.dumps({"params": params or {}, "json": json_data or {}, "data": data or {}},
+                      sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    digest = hashlib.sha1(body.encode("utf-8")).hexdigest()[:16]
+    return f"{method.upper()} {path} {digest}"
+
+
+def diff_json(expected, actual, path: str = "$") -> List[str]:
+    """逐字段对比两个JSON值，返回差异描述列表"""
+    if isinstance(expected, dict) and isinstance(actual, dict):
+        diffs = []
+        for key in expected.keys() | actual.keys():
+            if key not in actual:
+                diffs.append(f"{path}.{key}：字段缺失")
+            elif key not in expected:
+                diffs.append(f"{path}.{key}：新增字段")
+            else:
+                diffs.extend(diff_json(expected[key], actual[key], f"{path}.{key}"))
+        return diffs
+    if isinstance(expected, list) and isinstance(actual, list):
+        if len(expected) != len(actual):
+            return [f"{path}：数组长度 {len(expected)} → {len(actual)}"]
+        diffs = []
+        for i, (e, a) in enumerate(zip(expected, actual)):
+            diffs.extend(diff_json(e, a, f"{path}[{i}]"))
+        return diffs
+    if expected != actual:
+        return [f"{path}：{expected!r} → {actual!r}"]
+    return []
+
+
+class Cassette:
+    """单个cassette文件（JSON Lines，每行一条录制记录），线程安全"""
+
+    def __init__(self, name: str = "default", mode: str = "off", cassette_dir: str = CASSETTE_DIR,
+                 ignore_paths: Optional[List[str]] = None):
+        """初始化cassette
+        Args:
+            name: cassette名称（文件名为<name>.jsonl）
+            mode: 工作模式：off/record/replay/verify
+            cassette_dir: cassette文件目录
+            ignore_paths: verify模式下不对比的字段（如"$.data.timestamp"、"$.traceId"）
+        """
+        if mode not in MODES:
+            raise ValueError(f"不支持的cassette模式：{mode}，可选：{'/'.join(MODES)}")
+        self.mode = mode
+        self.file_path = os.path.join(cassette_dir, f"{name}.jsonl")
+        self.ignore_paths = set(ignore_paths or [])
+        self.mismatches: List[Dict] = []  # verify模式下发现的差异
+        self._entries: Dict[str, List[Dict]] = {}
+        self._cursor: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._file = None
+        if mode in ("replay", "verify"):
+            self._load()
+
+    @property
+    def replaying(self) -> bool:
+        """是否为离线回放（不访问网络）"""
+        return self.mode == "replay"
+
+    def _load(self):
+        """读取cassette文件"""
+        if not os.path.exists(self.file_path):
+            raise FileNotFoundError(f"cassette文件不存在：{self.file_path}，请先以record模式录制")
+        with open(self.file_path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self._entries.setdefault(entry["key"], []).append(entry)
+        logger.info(f"已加载cassette：{self.file_path}，共{sum(map(len, self._entries.values()))}条录制")
+
+    def _next_entry(self, key: str) -> Optional[Dict]:
+        """按录制顺序取出键对应的下一条记录（用完后重复返回最后一条）"""
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                return None
+            position = self._cursor.get(key, 0)
+            self._cursor[key] = position + 1
+            return entries[min(position, len(entries) - 1)]
+
+    def send(self, session: requests.Session, path: str, request_kwargs: dict, **send_kwargs):
+        """按当前模式发送请求（替代session.request）
+        Args:
+            session: 实际发送请求使用的会话（replay模式下不使用）
+            path: 接口路径（用于生成请求键）
+            request_kwargs: session.request的请求参数（method/url/params/json/data/headers）
+            send_kwargs: 其他发送参数（如timeout、stream）
+        """
+        key = request_key(request_kwargs["method"], path, request_kwargs.get("params"),
+                          request_kwargs.get("json"), request_kwargs.get("data"))
+        if self.mode == "replay":
+            entry = self._next_entry(key)
+            if entry is None:
+                raise CassetteError(f"cassette中没有录制该请求：{key}（{self.file_path}）")
+            return self._build_response(entry, request_kwargs["url"])
+        response = session.request(**request_kwargs, **send_kwargs)
+        if self.mode == "record":
+            self._append(key, request_kwargs["method"], path, response)
+        elif self.mode == "verify":
+            self._verify(key, response)
+        return response
+
+    def _append(self, key: str, method: str, path: str, response: requests.Response):
+        """追加一条录制记录（首次写入时清空旧文件，每次record都是一份完整的新录制）"""
+        content = response.content
+        try:
+            body, encoding = content.decode("utf-8"), "utf-8"
+        except UnicodeDecodeError:
+            body, encoding = base64.b64encode(content).decode("ascii"), "base64"
+        entry = {
+            "key": key,
+            "method": method.upper(),
+            "path": path,
+            "status": response.status_code,
+            "reason": response.reason,
+            "headers": {k: response.headers[k] for k in KEPT_HEADERS if k in response.headers},
+            "body": body,
+            "body_encoding": encoding,
+        }
+        line = json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n"
+        with self._lock:
+            if self._file is None:
+                os.makedirs(os.path.dirname(self.file_path), exist_ok=True)
+                self._file = open(self.file_path, "w", encoding="utf-8")
+            self._file.write(line)
+            self._file.flush()
+
+    def _verify(self, key: str, response: requests.Response):
+        """对比实时响应与录制的响应，差异记录到mismatches"""
+        entry = self._next_entry(key)
+        if entry is None:
+            diffs = ["cassette中没有录制该请求"]
+        else:
+            diffs = []
+            if entry["status"] != response.status_code:
+                diffs.append(f"状态码：{entry['status']} → {response.status_code}")
+            recorded = self._build_response(entry, response.url)
+            try:
+                diffs.extend(d for d in diff_json(recorded.json(), response_json(response))
+                             if not self._ignored(d.split("：")[0]))
+            except ValueError:
+                if recorded.content != response.content:
+                    diffs.append("响应体不一致（非JSON）")
+        if diffs:
+            logger.warning(f"【cassette差异】{key}：" + "；".join(diffs[:10]))
+            with self._lock:
+                self.mismatches.append({"key": key, "diffs": diffs})
+
+    def _ignored(self, path: str) -> bool:
+        """字段（或其上级字段）是否在ignore_paths中"""
+        return any(path == p or path.startswith((p + ".", p + "[")) for p in self.ignore_paths)
+
+    @staticmethod
+    def _build_response(entry: Dict, url: str) -> requests.Response:
+        """把录制记录还原为requests.Response"""
+        response = requests.Response()
+        response.status_code = entry["status"]
+        response.reason = entry.get("reason") or ""
+        response.headers = CaseInsensitiveDict(entry.get("headers") or {})
+        body = entry["body"]
+        response._content = base64.b64decode(body) if entry.get("body_encoding") == "base64" \
+            else body.encode("utf-8")
+        # 响应体已完整还原（没有raw连接），close()时无需再读取或关闭连接
+        response._content_consumed = True
+        response.encoding = "utf-8"
+        response.url = url
+        return response
+
+    def save_report(self, file_path: str = "report/cassette_diff.json") -> Optional[str]:
+        """导出verify模式的差异报告（没有差异时不生成），返回文件绝对路径"""
+        if not self.mismatches:
+            return None
+        os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+        with open(file_path, "w", encoding="utf-8") as f:
+            json.dump(self.mismatches, f, ensure_ascii=False, indent=2)
+        return os.path.abspath(file_path)
+
+    def close(self):
+        """关闭录制文件"""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def load_cassette(cassette_config: Optional[Dict] = None, mode: Optional[str] = None) -> Optional[Cassette]:
+    """按config.yaml的cassette节点创建cassette，mode参数（命令行指定）优先于配置
+    Returns:
+        Cassette对象；模式为off时返回None
+    """
+    cassette_config = cassette_config or {}
+    mode = mode or cassette_config.get("mode") or "off"
+    if mode == "off":
+        return None
+    return Cassette(
+        name=cassette_config.get("name", "default"),
+        mode=mode,
+        cassette_dir=cassette_config.get("dir") or CASSETTE_DIR,
+        ignore_paths=cassette_config.get("ignore_paths"),
+    )
@@ -0,0 +1,57 @@
+"""环境配置读取工具：读取config/config.yaml，进程内只解析一次"""
+import os
+import yaml
+
+# 配置文件路径：config/config.yaml
+CONFIG_FILE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(__file__))),
+    "config", "config.yaml"
+)
+
+_config = None
+# 默认执行环境（user_vars.yaml中未记录签发环境的旧token视为该环境的token）
+DEFAULT_ENV = "test"
+# 当前执行环境（pytest --env / run.py --env 指定），未显式传入环境名时使用
+_current_env = DEFAULT_ENV
+
+
+def load_config() -> dict:
+    """读取完整配置（首次调用时解析文件，之后返回缓存）"""
+    global _config
+    if _config is None:
+        if not os.path.exists(CONFIG_FILE):
+            raise FileNotFoundError(f"配置文件不存在：{CONFIG_FILE}")
+        with open(CONFIG_FILE, "r", encoding="utf-8") as f:
+            _config = yaml.safe_load(f) or {}
+    return _config
+
+
+def reload_config() -> dict:
+    """丢弃缓存重新读取配置（用于常驻进程中配置文件有修改的场景）"""
+    global _config
+    _config = None
+    return load_config()
+
+
+def current_env() -> str:
+    """当前执行环境名称"""
+    return _current_env
+
+
+def set_current_env(env: str):
+    """切换当前执行环境（环境必须已在config.yaml中配置）"""
+    global _current_env
+    get_env_config(env)
+    _current_env = env
+
+
+def get_env_config(env: str = None) -> dict:
+    """读取指定环境的配置（如base_url、timeout）
+    Args:
+        env: 环境名称（对应config.yaml中env下的键，如"test"），不指定时为当前执行环境
+    """
+    env = env or _current_env
+    envs = load_config().get("env") or {}
+    if env not in envs:
+        raise KeyError(f"config.yaml中未配置环境：{env}（可选：{', '.join(envs)}）")
+    return envs[env]
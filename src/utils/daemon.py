@@ -0,0 +1,297 @@
+"""常驻执行进程：避免每次执行都重新启动解释器、加载pytest插件、解析YAML用例、建立TLS连接和登录
+- 服务端（run.py --daemon serve）：常驻内存保存编译好的用例、保持连接池的ApiRunner（各次执行复用，不重新握手）
+  和登录态管理器中的token；用例YAML、config.yaml、user_vars.yaml有修改时在下一次执行前自动重新加载
+- 只执行部分用例时，自动带上它们（传递）依赖的上游用例，避免使用上次执行遗留的过期变量
+- 客户端（run.py --client --cases ...）：通过本地Unix socket提交要执行的用例，逐条接收执行结果
+协议：每个连接一个请求，请求和响应均为JSON Lines；
+  请求 {"cmd": "run", "cases": [case_id...], "changed_only": false} → 逐条 {"type": "result", ...}，
+  最后 {"type": "done", "counts": {...}, "duration": 秒}；出错时返回 {"type": "error", "error": "..."}
+  开始时返回 {"type": "start", "cases": 用例数, "dependencies": [自动带上的上游case_id...], "reloaded": [...]}
+  其他命令：status（运行状态）、reload（强制重新加载用例和配置）、stop（停止服务）
+本模块顶层只依赖标准库，客户端不需要加载框架的其他模块
+"""
+import json
+import os
+import socket
+import socketserver
+import threading
+import time
+from typing import Dict, Iterator, List, Set
+
+# 默认socket文件：项目根目录下的.run_daemon.sock
+SOCKET_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(__file__))), ".run_daemon.sock"
+)
+
+
+class DaemonNotRunning(ConnectionError):
+    """常驻进程未启动（socket不存在或无法连接）"""
+
+
+def request_daemon(message: Dict, socket_path: str = SOCKET_PATH) -> Iterator[Dict]:
+    """向常驻进程发送一个请求，逐条返回响应消息"""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(socket_path)
+    except (FileNotFoundError, ConnectionRefusedError):
+        sock.close()
+        raise DaemonNotRunning(f"常驻进程未启动（{socket_path}），请先执行：python run.py --daemon serve")
+    with sock, sock.makefile("rb") as reader:
+        sock.sendall((json.dumps(message, ensure_ascii=False) + "\n").encode("utf-8"))
+        for line in reader:
+            yield json.loads(line)
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    """处理一个客户端连接（一个请求）"""
+
+    def handle(self):
+        line = self.rfile.readline()
+        if not line:
+            return
+
+        def send(message: Dict):
+            self.wfile.write((json.dumps(message, ensure_ascii=False, default=str) + "\n").encode("utf-8"))
+            self.wfile.flush()
+
+        try:
+            self.server.run_daemon.handle(json.loads(line), send)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # 客户端提前断开
+        except Exception as e:
+            send({"type": "error", "error": f"{type(e).__name__}: {e}"})
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class RunDaemon:
+    """常驻执行服务（同一时间只执行一批用例，其他执行请求排队等待）"""
+
+    def __init__(self, env: str = "test", workers: int = 4, mock: bool = False,
+                 socket_path: str = SOCKET_PATH, data_dir: str = "data"):
+        """
+        Args:
+            env: 执行环境（config.yaml中env下的键）
+            workers: 每次执行的并发线程数
+            mock: 是否启动本地mock服务替代环境的base_url
+            socket_path: 监听的Unix socket文件
+            data_dir: 用例目录
+        """
+        from src.utils.config import load_config, set_current_env
+        from src.utils.timing import TimingRecorder
+
+        set_current_env(env)
+        self.env = env
+        self.workers = workers
+        self.socket_path = socket_path
+        self.data_dir = data_dir
+        self.env_config = {}
+        self.cases = []
+        self.deps = []  # 每个用例依赖的用例下标（scheduler.build_dependencies）
+        self.mtimes: Dict[str, float] = {}
+        self.runs = 0
+        self.started_at = time.time()
+        self.recorder = TimingRecorder()  # 当前这次执行的耗时样本
+        self._idle_runners = []  # 空闲的ApiRunner（保持连接池，各次执行复用）
+        self._in_use = []  # 本次执行取出的ApiRunner
+        self._response_cache = None  # 本次执行的响应复用缓存
+        self._runners_lock = threading.Lock()
+        self._run_lock = threading.Lock()
+        self._server = None
+        self.mock_server = None
+        self.base_url = None
+        self._reload()
+        if mock:
+            from src.utils.auth import get_auth_manager
+            from src.utils.mock_server import MOCK_TOKEN, start_mock_server
+            self.mock_server = start_mock_server(self.cases, load_config().get("mock"),
+                                                 login_path=(load_config().get("auth") or {}).get("login_path"))
+            self.base_url = self.mock_server.base_url
+            get_auth_manager(env).offline = True
+            get_auth_manager(env).set_token(MOCK_TOKEN)
+            self._apply_config()
+            self.mtimes = self._snapshot()  # mock服务切换到了独立的变量文件
+
+    def _snapshot(self) -> Dict[str, float]:
+        """用例文件、config.yaml和user_vars.yaml的修改时间"""
+        import glob
+        from src.utils.config import CONFIG_FILE
+        from src.utils.var_handler import current_var_file
+
+        paths = glob.glob(os.path.join(self.data_dir, "*.yaml")) + [CONFIG_FILE, current_var_file()]
+        return {path: os.path.getmtime(path) for path in paths if os.path.exists(path)}
+
+    def _reload(self, force: bool = False) -> List[str]:
+        """文件有变化（或force）时重新加载，返回重新加载的内容（cases/config/vars）"""
+        from src.utils.config import CONFIG_FILE, reload_config
+        from src.utils.logger import logger
+        from src.utils.scheduler import build_dependencies, load_all_cases
+        from src.utils.template import compile_case
+        from src.utils.var_handler import current_var_file, reload_vars
+
+        var_file = current_var_file()
+        mtimes = self._snapshot()
+        changed = {path for path in set(mtimes) | set(self.mtimes) if mtimes.get(path) != self.mtimes.get(path)}
+        reloaded = []
+        if force or CONFIG_FILE in changed:
+            if self.mtimes:  # 首次加载时配置尚未使用，不需要重新读取
+                reload_config()
+            self._apply_config()
+            reloaded.append("config")
+        if force or var_file in changed:
+            reload_vars()
+            reloaded.append("vars")
+        if force or changed - {CONFIG_FILE, var_file}:
+            self.cases = [compile_case(case) for case in load_all_cases(self.data_dir)]
+            self.deps = build_dependencies(self.cases)
+            if self.mock_server is not None:
+                self.mock_server.load_routes(self.cases)  # 新增或修改的用例需要对应的mock路由
+            reloaded.append("cases")
+        self.mtimes = mtimes
+        if reloaded:
+            logger.info(f"常驻进程已加载：{', '.join(reloaded)}（用例{len(self.cases)}个）")
+        return reloaded
+
+    def _apply_config(self):
+        """按当前配置设置环境、重试和熔断；已有的ApiRunner关闭，下次执行时按新配置创建"""
+        from src.utils.config import get_env_config, load_config
+        from src.utils.resilience import load_resilience
+
+        self.env_config = get_env_config(self.env)
+        if self.mock_server is None:
+            self.base_url = self.env_config["base_url"]
+        self.retry, self.breaker = load_resilience(load_config().get("resilience"), self.base_url)
+        with self._runners_lock:
+            for runner in self._idle_runners:
+                runner.session.close()
+            self._idle_runners = []
+
+    def _with_dependencies(self, selected: Set[str]) -> List[int]:
+        """选中用例及其传递依赖的用例下标（按用例顺序）"""
+        pending = [idx for idx, case in enumerate(self.cases) if case.case_id in selected]
+        included = set(pending)
+        while pending:
+            for dep in self.deps[pending.pop()]:
+                if dep not in included:
+                    included.add(dep)
+                    pending.append(dep)
+        return sorted(included)
+
+    def _runner_factory(self):
+        """取一个空闲的ApiRunner（没有时新建），用完后由run放回"""
+        from src.utils.api_runner import ApiRunner
+        from src.utils.auth import get_auth_manager
+
+        with self._runners_lock:
+            if self._idle_runners:
+                runner = self._idle_runners.pop()
+            else:
+                runner = ApiRunner(base_url=self.base_url, timeout=self.env_config.get("timeout", 10),
+                                   auth=get_auth_manager(self.env), retry=self.retry, breaker=self.breaker,
+                                   connect_timeout=self.env_config.get("connect_timeout"))
+                runner.add_hook(lambda sample: self.recorder.record(sample))
+            runner.response_cache = self._response_cache
+            self._in_use.append(runner)
+        return runner
+
+    def handle(self, request: Dict, send):
+        """处理一个请求"""
+        cmd = request.get("cmd")
+        if cmd == "run":
+            self.run(request, send)
+        elif cmd == "status":
+            send({"type": "status", **self.status()})
+        elif cmd == "reload":
+            with self._run_lock:
+                self._reload(force=True)
+            send({"type": "status", **self.status()})
+        elif cmd == "stop":
+            send({"type": "stopping"})
+            threading.Thread(target=self.stop, daemon=True).start()
+        else:
+            send({"type": "error", "error": f"不支持的命令：{cmd}"})
+
+    def run(self, request: Dict, send):
+        """执行一批用例，逐条发送结果"""
+        from src.utils.config import load_config
+        from src.utils.result_cache import load_result_cache
+        from src.utils.scheduler import CaseScheduler
+        from src.utils.test_base import TestBase
+        from src.utils.timing import TimingRecorder
+        from src.utils.var_handler import current_var_file, flush_vars
+
+        with self._run_lock:
+            reloaded = self._reload()
+            cases, dependencies = self.cases, []
+            selected = set(request.get("cases") or [])
+            if selected:
+                unknown = selected - {case.case_id for case in cases}
+                if unknown:
+                    send({"type": "error", "error": f"用例不存在：{', '.join(sorted(unknown))}"})
+                    return
+                cases = [self.cases[idx] for idx in self._with_dependencies(selected)]
+                dependencies = [case.case_id for case in cases if case.case_id not in selected]
+            send({"type": "start", "cases": len(cases), "dependencies": dependencies, "reloaded": reloaded})
+
+            self._response_cache, last_green = load_result_cache(
+                load_config().get("result_cache"), bool(request.get("changed_only")),
+                scope="mock" if self.mock_server else self.env)
+            self.recorder = TimingRecorder()
+            start = time.perf_counter()
+            try:
+                results = CaseScheduler(cases, self._runner_factory, workers=request.get("workers") or self.workers,
+                                        executor=last_green.wrap(TestBase.run_case),
+                                        on_result=lambda result: send({"type": "result", **result}),
+                                        close_runners=False).run()
+            finally:
+                with self._runners_lock:
+                    self._idle_runners.extend(self._in_use)
+                    self._in_use = []
+                flush_vars()
+                var_file = current_var_file()
+                if os.path.exists(var_file):
+                    self.mtimes[var_file] = os.path.getmtime(var_file)  # 本进程写回的变量不需要重新加载
+                last_green.save()
+            self.runs += 1
+            counts = {}
+            for result in results:
+                counts[result["status"]] = counts.get(result["status"], 0) + 1
+            send({"type": "done", "counts": counts, "duration": time.perf_counter() - start,
+                  "latency": self.recorder.overall()})
+
+    def status(self) -> Dict:
+        from src.utils.auth import get_auth_manager
+        return {"pid": os.getpid(), "env": self.env, "base_url": self.base_url, "cases": len(self.cases),
+                "runs": self.runs, "idle_runners": len(self._idle_runners),
+                "uptime": time.time() - self.started_at, "token_cached": bool(get_auth_manager(self.env).token)}
+
+    def serve_forever(self):
+        """监听socket并处理请求，直到收到stop命令"""
+        from src.utils.logger import logger
+
+        if os.path.exists(self.socket_path):
+            try:
+                for _ in request_daemon({"cmd": "status"}, self.socket_path):
+                    raise RuntimeError(f"常驻进程已在运行：{self.socket_path}")
+            except DaemonNotRunning:
+                os.remove(self.socket_path)  # 上次异常退出遗留的socket文件
+        self._server = _Server(self.socket_path, _Handler)
+        self._server.run_daemon = self
+        logger.info(f"常驻进程已启动：{self.socket_path}（环境{self.env}，{self.base_url}）")
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+            if self.mock_server is not None:
+                self.mock_server.stop()
+            for runner in self._idle_runners:
+                runner.session.close()
+            logger.info("常驻进程已停止")
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
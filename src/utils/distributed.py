@@ -0,0 +1,239 @@
+"""多进程/多机分布式执行：把data目录下的用例分片到多个工作进程，结束后合并结果
+- 通过extract/${变量}存在依赖关系的用例（依赖图的连通分量）分到同一个分片
+- 每个工作进程使用独立的ApiRunner、变量文件（变量命名空间）和日志文件
+- 每个分片的结果和耗时数据写入输出目录的worker-<分片号>.json，合并后生成一份汇总报告
+多机执行：每台机器执行 run.py --shard i/N，把各自的输出目录文件拷贝到一起后执行 run.py --merge 目录
+"""
+import glob
+import heapq
+import json
+import os
+import re
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Tuple
+from src.utils.scheduler import build_dependencies, load_all_cases
+from src.utils.timing import TimingRecorder
+
+# 分片结果的默认输出目录
+DEFAULT_OUTPUT_DIR = os.path.join("report", "workers")
+# 日志行的时间戳前缀（与LOG_FORMAT一致），用于按时间合并多个工作进程的日志
+_LOG_TIME_PATTERN = re.compile(r"^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2},\d{3}")
+
+
+def shard_cases(cases: List, shard_count: int) -> List[List[int]]:
+    """按变量依赖把用例分成shard_count个分片，返回每个分片的用例下标（保持原有先后顺序）
+    有依赖关系的用例属于同一个连通分量，整个分量分到同一个分片；
+    分量按用例数从大到小依次放入当前用例最少的分片，使各分片的用例数尽量均衡
+    """
+    parent = list(range(len(cases)))
+
+    def root(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for idx, deps in enumerate(build_dependencies(cases)):
+        for dep in deps:
+            parent[root(dep)] = root(idx)
+
+    components = {}
+    for idx in range(len(cases)):
+        components.setdefault(root(idx), []).append(idx)
+    # 用例数相同时按首个用例的位置排序，保证每台机器上的分片结果一致
+    ordered = sorted(components.values(), key=lambda c: (-len(c), c[0]))
+
+    shard_count = max(1, shard_count)
+    shards = [[] for _ in range(shard_count)]
+    heap = [(0, i) for i in range(shard_count)]
+    for component in ordered:
+        size, i = heapq.heappop(heap)
+        shards[i].extend(component)
+        heapq.heappush(heap, (size + len(component), i))
+    return [sorted(shard) for shard in shards]
+
+
+def new_run_id() -> str:
+    """生成执行批次标识（时间 + 随机后缀），同一批次的工作进程共用，日志文件名中使用"""
+    return f"{datetime.now().strftime('%H%M%S')}-{uuid.uuid4().hex[:6]}"
+
+
+def parse_shard(value: str) -> Tuple[int, int]:
+    """解析 --shard 参数（如"1/3"，分片号从1开始），返回(分片下标, 分片总数)"""
+    try:
+        index, count = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise ValueError(f"--shard格式错误：{value}，应为 i/N（如 1/3）")
+    if not 1 <= index <= count:
+        raise ValueError(f"--shard分片号超出范围：{value}")
+    return index - 1, count
+
+
+def run_shard(shard_index: int, shard_count: int, env: str = "test", threads: int = 4,
+              output_dir: str = DEFAULT_OUTPUT_DIR, data_dir: str = "data",
+              worker_id: str = None, mock: bool = False, run_id: str = None) -> str:
+    """在当前进程中执行一个分片，返回分片结果文件路径（也是工作进程的入口函数）
+    Args:
+        worker_id: 工作进程标识（日志、变量和结果文件名中使用），默认为w<分片号>
+        run_id: 执行批次标识（本机多进程执行时各进程共用），每个批次写入新的日志文件，默认新生成
+        mock: 是否在本进程中启动本地mock服务替代环境的base_url
+    """
+    from src.utils.api_runner import ApiRunner
+    from src.utils.auth import get_auth_manager
+    from src.utils.config import get_env_config, load_config, set_current_env
+    from src.utils.logger import logger, setup_logging, shutdown_logging
+    from src.utils.mock_server import MOCK_TOKEN, start_mock_server
+    from src.utils.resilience import load_resilience
+    from src.utils.scheduler import CaseScheduler
+    from src.utils.timing import default_recorder
+    from src.utils.var_handler import flush_vars, use_var_file
+
+    worker_id = worker_id or f"w{shard_index + 1}"
+    run_id = run_id or new_run_id()
+    set_current_env(env)
+    os.makedirs(output_dir, exist_ok=True)
+    # 每个工作进程独立的日志文件（按执行批次新建，合并时不混入当天之前的执行）和变量文件（以user_vars.yaml为初始值）
+    log_path = setup_logging(**{**(load_config().get("log") or {}), "worker_id": worker_id,
+                                "run_id": run_id, "console": False})
+    var_path = os.path.join(output_dir, f"vars-{worker_id}.yaml")
+    if os.path.exists(var_path):
+        os.remove(var_path)  # 不沿用上一次执行残留的变量
+    use_var_file(var_path)
+
+    cases = load_all_cases(data_dir)
+    indexes = shard_cases(cases, shard_count)[shard_index]
+    logger.info(f"工作进程{worker_id}开始执行：分片{shard_index + 1}/{shard_count}，共{len(indexes)}个用例")
+
+    env_config = get_env_config(env)
+    base_url = env_config["base_url"]
+    mock_server = None
+    if mock:
+        # 变量已切换到本进程的变量文件，mock服务不再另建临时变量文件
+        mock_server = start_mock_server(cases, load_config().get("mock"),
+                                        login_path=(load_config().get("auth") or {}).get("login_path"),
+                                        isolate_vars=False)
+        base_url = mock_server.base_url
+        get_auth_manager(env).offline = True
+        get_auth_manager(env).set_token(MOCK_TOKEN)
+    retry, breaker = load_resilience(load_config().get("resilience"), base_url)
+
+    def runner_factory():
+        runner = ApiRunner(base_url=base_url, timeout=env_config.get("timeout", 10),
+                           auth=get_auth_manager(env), connect_timeout=env_config.get("connect_timeout"),
+                           retry=retry, breaker=breaker)
+        runner.add_hook(default_recorder.record)
+        return runner
+
+    start = time.perf_counter()
+    results = CaseScheduler([cases[i] for i in indexes], runner_factory, workers=threads).run()
+    for idx, result in zip(indexes, results):
+        result["index"] = idx  # 用例在全部用例中的位置，合并时恢复原有顺序
+        result["worker"] = worker_id
+    flush_vars()
+    if mock_server is not None:
+        mock_server.stop()
+
+    output = {
+        "worker": worker_id,
+        "run_id": run_id,
+        "shard": [shard_index + 1, shard_count],
+        "host": os.uname().nodename if hasattr(os, "uname") else "",
+        "env": env,
+        "base_url": base_url,
+        "duration": time.perf_counter() - start,
+        "log_file": os.path.abspath(log_path),
+        "results": results,
+        "timing": default_recorder.export_data(),
+    }
+    file_path = os.path.join(output_dir, f"worker-{worker_id}.json")
+    with open(file_path, "w", encoding="utf-8") as f:
+        json.dump(output, f, ensure_ascii=False)
+    logger.info(f"工作进程{worker_id}执行完成，结果已写入：{file_path}")
+    shutdown_logging()
+    return file_path
+
+
+def run_workers(workers: int, env: str = "test", threads: int = 4,
+                output_dir: str = DEFAULT_OUTPUT_DIR, data_dir: str = "data", mock: bool = False) -> List[str]:
+    """在本机启动workers个工作进程，每个进程执行一个分片，返回各分片结果文件路径"""
+    for stale in glob.glob(os.path.join(output_dir, "worker-*.json")):
+        os.remove(stale)  # 清理上一次的结果，避免合并到旧数据
+    run_id = new_run_id()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(run_shard, i, workers, env, threads, output_dir, data_dir,
+                               mock=mock, run_id=run_id)
+                   for i in range(workers)]
+        return [future.result() for future in futures]
+
+
+def _log_entries(file_path: str):
+    """按日志记录读取文件（没有时间戳前缀的行属于上一条记录，如异常堆栈）"""
+    entry = None
+    with open(file_path, "r", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            match = _LOG_TIME_PATTERN.match(line)
+            if match:
+                if entry is not None:
+                    yield entry
+                entry = (match.group(0), line)
+            elif entry is not None:
+                entry = (entry[0], entry[1] + line)
+    if entry is not None:
+        yield entry
+
+
+def merge_logs(log_files: List[str], output_path: str) -> str:
+    """按时间戳合并多个工作进程的文本日志（各文件本身已按时间有序）"""
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as out:
+        for _, text in heapq.merge(*(_log_entries(p) for p in log_files), key=lambda e: e[0]):
+            out.write(text)
+    return os.path.abspath(output_path)
+
+
+def merge_results(output_dir: str = DEFAULT_OUTPUT_DIR,
+                  report_path: str = "report/distributed_report.json") -> Dict:
+    """合并输出目录中所有分片的结果、耗时数据和日志，生成汇总报告
+    Returns:
+        汇总报告字典（results按用例原有顺序排列，recorder为合并后的TimingRecorder）
+    """
+    files = sorted(glob.glob(os.path.join(output_dir, "worker-*.json")))
+    if not files:
+        raise FileNotFoundError(f"目录中没有分片结果文件（worker-*.json）：{output_dir}")
+    recorder = TimingRecorder()
+    results, workers, log_files = [], [], []
+    for file_path in files:
+        with open(file_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        results.extend(data["results"])
+        recorder.merge(data["timing"])
+        counts = {}
+        for result in data["results"]:
+            counts[result["status"]] = counts.get(result["status"], 0) + 1
+        workers.append({"worker": data["worker"], "run_id": data.get("run_id"), "host": data.get("host", ""),
+                        "shard": data["shard"], "duration": data["duration"], "counts": counts})
+        # 多机执行时日志文件可能与结果文件拷贝在同一目录
+        for log_path in (data.get("log_file") or "",
+                         os.path.join(output_dir, os.path.basename(data.get("log_file") or ""))):
+            if log_path and os.path.isfile(log_path) and not log_path.endswith(".jsonl"):
+                log_files.append(log_path)
+                break
+    results.sort(key=lambda r: r.get("index", 0))
+
+    report = {
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+        "workers": workers,
+        "results": results,
+        "latency": recorder.summary(),
+    }
+    os.makedirs(os.path.dirname(report_path) or ".", exist_ok=True)
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    if log_files:
+        report["log_file"] = merge_logs(log_files, os.path.join(os.path.dirname(report_path) or ".",
+                                                                "distributed.log"))
+    report["recorder"] = recorder
+    return report
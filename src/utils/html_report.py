@@ -0,0 +1,152 @@
+"""分页HTML报告：从results_sink写出的JSON Lines结果文件按需生成报告
+- 每page_size个用例一页（page-0001.html ...），index.html为汇总（状态计数、各页链接和失败数）
+- 增量续写：已写满（且已有下一页）的页和结果文件的读取位置记录在render_state.json中，
+  再次生成时只从最后一页开始读取，执行过程中或中断后都可以反复生成，总开销与用例数成线性
+- 最后一页（即使已写满）不带“下一页”链接，之后有新结果时重新生成；结果文件被新一次执行覆盖时删除旧的分页
+- 结果文件末尾不完整的行（执行中断时正在写入）会被忽略，下次生成时再读取
+用法：python run.py --render-report（或在config.yaml的report节点开启render_on_finish，会话结束时自动生成）
+"""
+import glob
+import html
+import json
+import os
+from datetime import datetime
+from typing import Dict, List
+from src.utils.results_sink import DEFAULT_RESULTS_FILE
+
+# 默认报告目录
+DEFAULT_HTML_DIR = os.path.join("report", "html")
+# 默认每页用例数
+DEFAULT_PAGE_SIZE = 500
+STATE_FILE = "render_state.json"
+
+_STYLE = """<style>
+body{font-family:-apple-system,Segoe UI,Microsoft YaHei,sans-serif;margin:20px;color:#222}
+table{border-collapse:collapse;width:100%;font-size:13px}
+th,td{border:1px solid #ddd;padding:4px 6px;text-align:left;vertical-align:top}
+th{background:#f5f5f5}
+.passed{color:#2e7d32}.failed{color:#c62828}.error{color:#ad1457}.skipped{color:#757575}
+pre{white-space:pre-wrap;margin:0;font-size:12px}
+nav{margin:10px 0}
+</style>"""
+
+
+def _status_counts(records: List[Dict]) -> Dict[str, int]:
+    counts = {}
+    for record in records:
+        counts[record["status"]] = counts.get(record["status"], 0) + 1
+    return counts
+
+
+def _page_name(page: int) -> str:
+    return f"page-{page:04d}.html"
+
+
+def _write_html(file_path: str, title: str, body: str):
+    """写入HTML文件（先写临时文件再替换，生成中途中断不会留下半个文件）"""
+    tmp_path = file_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(f"<!DOCTYPE html><html><head><meta charset='utf-8'><title>{html.escape(title)}</title>"
+                f"{_STYLE}</head><body>{body}</body></html>")
+    os.replace(tmp_path, file_path)
+
+
+def _render_page(output_dir: str, page: int, records: List[Dict], first_index: int, last_page: int):
+    """生成一页用例结果"""
+    nav = [f"<a href='index.html'>汇总</a>"]
+    if page > 1:
+        nav.append(f"<a href='{_page_name(page - 1)}'>上一页</a>")
+    if page < last_page:
+        nav.append(f"<a href='{_page_name(page + 1)}'>下一页</a>")
+    rows = []
+    for i, record in enumerate(records, first_index):
+        requests = "<br>".join(
+            html.escape(f"{r['method']} {r['path']} → {r['status'] if r['status'] is not None else r.get('error')} "
+                        f"({r['total_ms']}ms{'，重试' if r.get('attempt') else ''})")
+            for r in record.get("requests") or []
+        )
+        message = record.get("message")
+        detail = f"<details><summary>详情</summary><pre>{html.escape(message)}</pre></details>" if message else ""
+        rows.append(
+            f"<tr><td>{i}</td><td>{html.escape(str(record['case_id']))}</td>"
+            f"<td class='{html.escape(record['status'])}'>{html.escape(record['status'])}</td>"
+            f"<td>{record['duration_ms']}</td><td>{requests}</td><td>{record.get('retries', 0)}</td>"
+            f"<td>{detail}</td></tr>"
+        )
+    body = (f"<h2>用例结果 第{page}页</h2><nav>{' | '.join(nav)}</nav>"
+            "<table><tr><th>#</th><th>case_id</th><th>状态</th><th>耗时(ms)</th><th>请求</th>"
+            f"<th>重试</th><th>失败信息</th></tr>{''.join(rows)}</table><nav>{' | '.join(nav)}</nav>")
+    _write_html(os.path.join(output_dir, _page_name(page)), f"用例结果 第{page}页", body)
+
+
+def _render_index(output_dir: str, state: Dict, last_counts: Dict[str, int], results_file: str):
+    """生成汇总页"""
+    page_counts = state["page_counts"] + ([last_counts] if last_counts else [])
+    total = {}
+    for counts in page_counts:
+        for status, count in counts.items():
+            total[status] = total.get(status, 0) + count
+    summary = "".join(f"<li class='{html.escape(s)}'>{html.escape(s)}：{c}</li>" for s, c in sorted(total.items()))
+    pages = "".join(
+        f"<tr><td><a href='{_page_name(page)}'>第{page}页</a></td><td>{sum(counts.values())}</td>"
+        f"<td class='failed'>{counts.get('failed', 0) + counts.get('error', 0)}</td>"
+        f"<td>{'' if sum(counts.values()) >= state['page_size'] else '未写满'}</td></tr>"
+        for page, counts in enumerate(page_counts, 1)
+    )
+    body = (f"<h2>接口自动化测试报告</h2><p>结果文件：{html.escape(os.path.abspath(results_file))}<br>"
+            f"执行批次：{html.escape(state['run_id'])}<br>生成时间：{datetime.now().isoformat(timespec='seconds')}</p>"
+            f"<ul>{summary}</ul><table><tr><th>页</th><th>用例数</th><th>失败/出错</th><th></th></tr>{pages}</table>")
+    _write_html(os.path.join(output_dir, "index.html"), "接口自动化测试报告", body)
+
+
+def render_report(results_file: str = DEFAULT_RESULTS_FILE, output_dir: str = DEFAULT_HTML_DIR,
+                  page_size: int = DEFAULT_PAGE_SIZE) -> str:
+    """从结果文件增量生成分页报告，返回index.html的绝对路径"""
+    if not os.path.exists(results_file):
+        raise FileNotFoundError(f"结果文件不存在：{results_file}")
+    os.makedirs(output_dir, exist_ok=True)
+    state_path = os.path.join(output_dir, STATE_FILE)
+    try:
+        with open(state_path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        state = {}
+
+    with open(results_file, "rb") as f:
+        header_line = f.readline()
+        if not header_line.endswith(b"\n"):
+            raise ValueError(f"结果文件为空或不完整：{results_file}")
+        run_id = json.loads(header_line).get("run_id", "")
+        # 结果文件已被新一次执行覆盖（批次不同）或每页条数变化时从头生成
+        if state.get("run_id") != run_id or state.get("page_size") != page_size \
+                or state.get("page_offset", 0) > os.path.getsize(results_file):
+            state = {"run_id": run_id, "page_size": page_size, "page_offset": len(header_line), "page_counts": []}
+            for stale in glob.glob(os.path.join(output_dir, "page-*.html")):
+                os.remove(stale)  # 上一次执行的分页
+        f.seek(state["page_offset"])
+        offset, records = state["page_offset"], []
+        while True:
+            line = f.readline()
+            if not line.endswith(b"\n"):
+                break  # 文件末尾或正在写入的不完整行
+            line_start, offset = offset, offset + len(line)
+            record = json.loads(line)
+            if record.get("type") != "case":
+                continue  # 追加模式下后续会话的会话头
+            if len(records) == page_size:
+                # 当前页已写满且有下一条结果：下一页必定会生成，可以带“下一页”链接
+                page = len(state["page_counts"]) + 1
+                _render_page(output_dir, page, records, (page - 1) * page_size + 1, page + 1)
+                state["page_counts"].append(_status_counts(records))
+                state["page_offset"], records = line_start, []
+                with open(state_path, "w", encoding="utf-8") as sf:
+                    json.dump(state, sf)
+            records.append(record)
+
+    if records:
+        page = len(state["page_counts"]) + 1
+        _render_page(output_dir, page, records, (page - 1) * page_size + 1, page)
+    _render_index(output_dir, state, _status_counts(records), results_file)
+    with open(state_path, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    return os.path.abspath(os.path.join(output_dir, "index.html"))
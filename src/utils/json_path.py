@@ -0,0 +1,105 @@
+"""JSONPath求值工具：编译结果按表达式缓存，简单路径直接按下标/键取值
+- 形如 $.a.b[0].c、$['a'] 的简单路径编译为取值步骤，不经过jsonpath库
+- 其他表达式（过滤、通配符、递归下降等）回退到jsonpath库
+- 返回值与jsonpath.jsonpath一致：匹配时返回结果列表，未匹配返回False
+"""
+import re
+from functools import lru_cache
+import jsonpath
+
+# 简单路径的单个步骤：.key / [0] / ['key'] / ["key"]
+_STEP_PATTERN = re.compile(r"\.([^.\[\]*@()?,:'\"]+)|\[(\d+)\]|\[(['\"])(.*?)\3\]")
+
+# 响应对象上缓存解析结果的属性名
+_JSON_CACHE_ATTR = "_parsed_json"
+_MISSING = object()
+
+
+class CompiledPath:
+    """编译后的JSONPath表达式"""
+    __slots__ = ("expr", "steps")
+
+    def __init__(self, expr: str):
+        self.expr = expr
+        self.steps = self._parse(expr)  # 简单路径的取值步骤，None表示需要回退到jsonpath库
+
+    @staticmethod
+    def _parse(expr: str):
+        """将简单路径解析为步骤元组（键为str，下标为int），无法解析时返回None"""
+        if not expr.startswith("$"):
+            return None
+        steps, pos = [], 1
+        while pos < len(expr):
+            m = _STEP_PATTERN.match(expr, pos)
+            if not m:
+                return None
+            if m.group(1) is not None:
+                steps.append(m.group(1))
+            elif m.group(2) is not None:
+                steps.append(int(m.group(2)))
+            else:
+                steps.append(m.group(4))
+            pos = m.end()
+        return tuple(steps)
+
+    def find(self, data):
+        """在已解析的JSON数据上求值
+        Returns:
+            匹配结果列表；未匹配时返回False（与jsonpath.jsonpath一致）
+        """
+        if self.steps is None:
+            return jsonpath.jsonpath(data, self.expr)
+        value = data
+        for step in self.steps:
+            if isinstance(step, int):
+                if not isinstance(value, list) or step >= len(value):
+                    return False
+            elif not isinstance(value, dict) or step not in value:
+                return False
+            value = value[step]
+        return [value]
+
+    def first(self, data, default=None):
+        """返回第一个匹配结果，未匹配时返回default"""
+        result = self.find(data)
+        return result[0] if result else default
+
+
+@lru_cache(maxsize=1024)
+def compile_path(expr: str) -> CompiledPath:
+    """编译JSONPath表达式（按表达式字符串LRU缓存）"""
+    return CompiledPath(expr)
+
+
+def find(data, expr: str):
+    """对已解析的JSON数据求值，返回值与jsonpath.jsonpath一致"""
+    return compile_path(expr).find(data)
+
+
+def assign_path(body, steps: tuple, value):
+    """按取值步骤（compile_path解析出的键/下标）在响应体中写入值，中间层级不存在（或类型不符）时自动创建，
+    列表长度不足时用None补齐
+    """
+    current = body
+    for step, next_step in zip(steps, steps[1:] + (None,)):
+        if isinstance(step, int):
+            while len(current) <= step:
+                current.append(None)
+        if next_step is None:
+            current[step] = value
+            break
+        container_type = list if isinstance(next_step, int) else dict
+        child = current[step] if isinstance(step, int) else current.get(step)
+        if not isinstance(child, container_type):
+            child = current[step] = container_type()
+        current = child
+    return body
+
+
+def response_json(response):
+    """获取响应的JSON解析结果，同一个响应对象只解析一次"""
+    cached = getattr(response, _JSON_CACHE_ATTR, _MISSING)
+    if cached is _MISSING:
+        cached = response.json()
+        setattr(response, _JSON_CACHE_ATTR, cached)
+    return cached
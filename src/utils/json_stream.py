@@ -0,0 +1,176 @@
+"""大响应流式解析：边下载边解析响应体，只保留用例extract和expected.json用到的JSONPath对应的值
+- 用例在api中配置 stream: true 开启（加载用例时由CompiledCase计算需要的路径）
+- 解析结果为只包含这些路径的“稀疏”文档，缓存到响应对象上，提取变量和断言的用法不变
+- 所有路径都已取到值时立即停止读取并关闭连接，内存占用与响应体大小无关
+- 只支持简单路径（$.a.b[0].c）；用例含过滤/通配符等复杂路径、根路径$或配置了schema（需要完整响应体）时不流式解析
+- 依赖ijson（可选）；未安装时退化为完整读取后解析再裁剪，结果一致但内存占用不受限
+"""
+from typing import Dict, Iterable, Optional, Tuple
+import requests
+from src.utils.assert_utils import normalize_path
+from src.utils.json_path import assign_path, compile_path, response_json
+from src.utils.logger import logger
+
+try:
+    import ijson
+except ImportError:  # pragma: no cover - 未安装ijson时退化为完整解析
+    ijson = None
+
+# 每次从连接读取的字节数
+CHUNK_SIZE = 64 * 1024
+# 响应对象上缓存解析结果的属性名（与json_path.response_json一致）
+_JSON_CACHE_ATTR = "_parsed_json"
+
+_fallback_logged = False
+
+
+def case_stream_paths(extract: Optional[Dict], expected: Optional[Dict], schema=None) -> Optional[Tuple[str, ...]]:
+    """计算用例需要从响应中取值的JSONPath（extract的路径 + expected.json的键）
+    Returns:
+        去重后的路径元组（已被其他路径包含的子路径会去掉）；无法流式解析时返回None
+    """
+    if schema:
+        return None
+    exprs = list((extract or {}).values()) + [normalize_path(k) for k in ((expected or {}).get("json") or {})]
+    by_steps = {}
+    for expr in exprs:
+        steps = compile_path(expr).steps if isinstance(expr, str) else None
+        if not steps:  # 复杂路径或根路径$
+            return None
+        by_steps.setdefault(steps, expr)
+    if not by_steps:
+        return None
+    kept = []
+    for steps in sorted(by_steps, key=len):
+        if not any(steps[:len(parent)] == parent for parent in kept):
+            kept.append(steps)
+    return tuple(by_steps[steps] for steps in kept)
+
+
+class _ChunkReader:
+    """把响应的iter_content包装为ijson可读取的文件对象，并统计读取的字节数"""
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self.bytes_read = 0
+
+    def read(self, size: int = -1) -> bytes:
+        if size == 0:  # ijson先以read(0)探测返回类型（bytes/str）
+            return b""
+        for chunk in self._chunks:
+            if chunk:
+                self.bytes_read += len(chunk)
+                return chunk
+        return b""
+
+
+def _skip(events, event: str):
+    """跳过当前值（对象/数组时一直读到对应的结束事件）"""
+    if event not in ("start_map", "start_array"):
+        return
+    depth = 1
+    for event, _ in events:
+        if event in ("start_map", "start_array"):
+            depth += 1
+        elif event in ("end_map", "end_array"):
+            depth -= 1
+            if depth == 0:
+                return
+
+
+def _build(events, event: str, value):
+    """从当前事件开始构建完整的值（对象/数组时一直读到对应的结束事件）"""
+    builder = ijson.ObjectBuilder()
+    builder.event(event, value)
+    if event in ("start_map", "start_array"):
+        depth = 1
+        for event, value in events:
+            builder.event(event, value)
+            if event in ("start_map", "start_array"):
+                depth += 1
+            elif event in ("end_map", "end_array"):
+                depth -= 1
+                if depth == 0:
+                    break
+    return builder.value
+
+
+def _parse_targets(reader: _ChunkReader, targets: set):
+    """按事件流解析，只构建目标路径上的值，全部取到后停止
+    Returns:
+        (稀疏文档, 是否提前停止)
+    """
+    prefixes = {steps[:i] for steps in targets for i in range(len(steps))}
+    sparse = None
+    stack = []  # 当前所在容器：[键, 是否为数组]，数组的键为当前下标
+    events = ijson.basic_parse(reader, buf_size=CHUNK_SIZE)
+    for event, value in events:
+        if event == "map_key":
+            stack[-1][0] = value
+            continue
+        if event in ("end_map", "end_array"):
+            stack.pop()
+            continue
+        if stack and stack[-1][1]:
+            stack[-1][0] += 1
+        path = tuple(frame[0] for frame in stack)
+        if sparse is None:
+            sparse = {} if event == "start_map" else []
+        if path in targets:
+            assign_path(sparse, path, _build(events, event, value))
+            targets.discard(path)
+            if not targets:
+                return sparse, True
+            prefixes = {steps[:i] for steps in targets for i in range(len(steps))}
+        elif path in prefixes and event in ("start_map", "start_array"):
+            stack.append([None, False] if event == "start_map" else [-1, True])
+        elif path:
+            _skip(events, event)
+        elif event not in ("start_map", "start_array"):
+            return value, False  # 响应体为标量
+    return sparse, False
+
+
+def stream_json(response, paths: Iterable[str]):
+    """流式读取并解析响应体，只保留paths对应的值，结果缓存到响应对象上（response_json直接返回）
+    Args:
+        response: 以stream=True发送的requests.Response（响应体尚未读取）
+        paths: 需要的JSONPath（简单路径）
+    Returns:
+        稀疏文档
+    Raises:
+        ValueError: 响应体不是合法的JSON（或解析过程中的其他异常）
+        requests.RequestException: 读取响应体时的传输异常
+    """
+    compiled = [compile_path(expr) for expr in paths]
+    if ijson is None:
+        global _fallback_logged
+        if not _fallback_logged:
+            _fallback_logged = True
+            logger.warning("未安装ijson，stream: true的用例将完整读取响应体后再裁剪（pip install ijson）")
+        body = response_json(response)
+        sparse = {} if isinstance(body, dict) else []
+        for path in compiled:
+            found = path.find(body)
+            if found:
+                assign_path(sparse, path.steps, found[0])
+        setattr(response, _JSON_CACHE_ATTR, sparse)
+        return sparse
+
+    reader = _ChunkReader(response.iter_content(CHUNK_SIZE))
+    try:
+        sparse, stopped = _parse_targets(reader, {path.steps for path in compiled})
+    except ijson.JSONError as e:
+        response.close()
+        raise ValueError(f"响应体流式解析失败（已读取{reader.bytes_read}字节）：{e}") from e
+    except requests.RequestException:
+        response.close()  # 读取响应体时的传输异常，由调用方按连接异常处理
+        raise
+    except Exception as e:
+        response.close()
+        raise ValueError(f"响应体流式解析失败（已读取{reader.bytes_read}字节）：{type(e).__name__}: {e}") from e
+    if stopped:
+        response.close()  # 剩余响应体不再读取，连接随之关闭
+    logger.info("流式解析响应：读取%d字节，%s", reader.bytes_read, "已取到全部字段，提前结束" if stopped else "读取完毕")
+    setattr(response, _JSON_CACHE_ATTR, sparse)
+    return sparse
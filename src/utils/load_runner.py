@@ -0,0 +1,187 @@
+"""压测模式：复用data目录下的YAML用例，按目标RPS或固定虚拟用户数持续发压
+按case_id统计耗时分位数（p50/p90/p99/max）、错误率和吞吐量
+"""
+import itertools
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List
+from src.utils.assert_utils import collect_mismatches
+from src.utils.json_path import response_json
+from src.utils.logger import logger
+from src.utils.stats import LatencyStats, format_summary_table
+from src.utils.template import compile_case
+from src.utils.timing import case_label
+
+
+def prepare_case(case) -> dict:
+    """压测前预先渲染用例中的变量、编译schema，发压过程中直接复用"""
+    compiled = compile_case(case)
+    return {
+        "case_id": compiled.case_id,
+        "api": compiled.render_api(),
+        "expected": compiled.render_expected(),
+        "validator": compiled.validator,
+    }
+
+
+def check_response(response, expected: dict, validator=None, schema_sample_rate: float = 0.0) -> bool:
+    """静默校验响应是否符合预期（状态码 + JSON字段 + 抽样的结构校验），不输出断言日志"""
+    if "code" in expected and response.status_code != expected["code"]:
+        return False
+    check_schema = validator is not None and schema_sample_rate > 0 and \
+        (schema_sample_rate >= 1.0 or random.random() < schema_sample_rate)
+    if expected.get("json") or check_schema:
+        try:
+            body = response_json(response)
+        except ValueError:
+            return False
+        if expected.get("json") and collect_mismatches(body, expected["json"]):
+            return False
+        if check_schema:
+            errors = []
+            validator(body, "$", errors)
+            return not errors
+    return True
+
+
+class LoadRunner:
+    """压测执行器：支持固定RPS（开放模型）和固定虚拟用户数（封闭模型）两种模式"""
+
+    def __init__(self, cases: List[Dict], runner_factory: Callable, duration: float = 60,
+                 rps: float = 0, vus: int = 0, max_workers: int = 100, schema_sample_rate: float = 0.0):
+        """初始化压测执行器
+        Args:
+            cases: 参与压测的用例（按轮询方式依次发送）
+            runner_factory: 创建ApiRunner的无参函数，每个发压线程调用一次
+            duration: 压测持续时间（秒）
+            rps: 目标每秒请求数（>0时使用固定RPS模式）
+            vus: 虚拟用户数（固定RPS模式下忽略）
+            max_workers: 固定RPS模式下的最大发压线程数
+            schema_sample_rate: 对配置了schema的用例，按该比例抽样校验响应结构（0表示不校验）
+        """
+        if not cases:
+            raise ValueError("没有可用于压测的用例")
+        if rps <= 0 and vus <= 0:
+            raise ValueError("请指定目标RPS（rps>0）或虚拟用户数（vus>0）")
+        self.cases = [prepare_case(case) for case in cases]
+        self.runner_factory = runner_factory
+        self.duration = duration
+        self.rps = rps
+        self.vus = vus
+        self.max_workers = max_workers
+        self.schema_sample_rate = schema_sample_rate
+        self.stats = {case["case_id"]: LatencyStats(case["case_id"]) for case in self.cases}
+        self._local = threading.local()
+        self._runners = []
+        self._runners_lock = threading.Lock()
+
+    def _get_runner(self):
+        """获取当前发压线程专属的ApiRunner"""
+        runner = getattr(self._local, "runner", None)
+        if runner is None:
+            runner = self.runner_factory()
+            self._local.runner = runner
+            with self._runners_lock:
+                self._runners.append(runner)
+        return runner
+
+    def _fire(self, case: dict, scheduled_at: float):
+        """发送一次请求并记录结果
+        Args:
+            scheduled_at: 计划发送时间，耗时从计划时间开始计算，
+                避免发压端排队时低估服务端延迟
+        """
+        ok = False
+        try:
+            # 标记当前case_id，请求钩子（如实时指标）按用例归类
+            with case_label(case["case_id"]):
+                response = self._get_runner().run(case["api"])
+                ok = check_response(response, case.get("expected", {}), case.get("validator"),
+                                    self.schema_sample_rate)
+        except Exception as e:
+            logger.debug(f"压测请求失败：{case['case_id']}，{e}")
+        self.stats[case["case_id"]].record(time.perf_counter() - scheduled_at, ok)
+
+    def _run_vus(self, deadline: float):
+        """固定虚拟用户数：每个用户循环发送用例，上一个请求结束后立即发送下一个"""
+        def user_loop(offset):
+            for i in itertools.count(offset):
+                now = time.perf_counter()
+                if now >= deadline:
+                    return
+                self._fire(self.cases[i % len(self.cases)], now)
+
+        threads = [threading.Thread(target=user_loop, args=(i,), name=f"vu-{i}", daemon=True)
+                   for i in range(self.vus)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+    def _run_rps(self, start: float, deadline: float):
+        """固定RPS：按计划时间均匀派发请求，与响应快慢无关
+        派发队列有上限（发压线程数的2倍）：后端变慢导致请求积压时，到计划时间的新请求直接丢弃并计数；
+        已排队但到结束时间仍未开始的请求也丢弃，压测不会因积压超出设定时长
+        """
+        interval = 1.0 / self.rps
+        slots = threading.BoundedSemaphore(self.max_workers * 2)
+
+        def fire(case, scheduled_at):
+            try:
+                if time.perf_counter() >= deadline:
+                    self.stats[case["case_id"]].record_dropped()
+                else:
+                    self._fire(case, scheduled_at)
+            finally:
+                slots.release()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="load") as pool:
+            for i in itertools.count():
+                scheduled_at = start + i * interval
+                if scheduled_at >= deadline:
+                    break
+                delay = scheduled_at - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                case = self.cases[i % len(self.cases)]
+                if not slots.acquire(blocking=False):
+                    self.stats[case["case_id"]].record_dropped()
+                    continue
+                pool.submit(fire, case, scheduled_at)
+
+    def run(self) -> List[Dict]:
+        """执行压测，返回每个case_id的统计结果"""
+        mode = f"RPS={self.rps}" if self.rps > 0 else f"VUs={self.vus}"
+        logger.info(f"压测开始：{mode}，持续{self.duration}s，用例数{len(self.cases)}")
+        start = time.perf_counter()
+        deadline = start + self.duration
+        if self.rps > 0:
+            self._run_rps(start, deadline)
+        else:
+            self._run_vus(deadline)
+        elapsed = time.perf_counter() - start
+        for runner in self._runners:
+            runner.session.close()
+
+        rows = [s.summary(elapsed) for s in self.stats.values()]
+        total = LatencyStats("TOTAL")
+        for s in self.stats.values():
+            total.merge(s)
+        rows.append(total.summary(elapsed))
+        if total.dropped:
+            logger.warning(f"发压端积压，丢弃了{total.dropped}个请求（后端变慢或发压线程数max_workers不足），"
+                           "实际RPS低于目标")
+        logger.info(f"压测结束，实际耗时{elapsed:.1f}s\n{format_summary_table(rows)}")
+        return rows
+
+
+def save_report(rows: List[Dict], report_path: str):
+    """将压测结果保存为JSON文件"""
+    os.makedirs(os.path.dirname(report_path) or ".", exist_ok=True)
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(rows, f, ensure_ascii=False, indent=2)
+    logger.info(f"压测报告已保存：{os.path.abspath(report_path)}")
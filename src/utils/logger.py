@@ -1,6 +1,16 @@
-"""日志工具：同时输出日志到控制台和文件，按日期保存"""
+"""日志工具：同时输出日志到控制台和文件，按日期保存
+导入时使用同步写入的默认配置；并发/压测场景可调用setup_logging切换为
+后台队列写入，并支持JSON Lines格式、按大小/时间轮转以及按工作进程分文件
+"""
+import atexit
+import json
 import logging
+import logging.handlers
 import os
+import queue
+import reprlib
+import threading
+import time
 from datetime import datetime
 
 # 日志目录：项目根目录下的logs文件夹（自动创建）
@@ -13,14 +23,237 @@ os.makedirs(log_dir, exist_ok=True)  # 若目录不存在则创建
 log_file = os.path.join(log_dir, f"{datetime.now().strftime('%Y%m%d')}.log")
 
 # 配置日志格式：时间-日志名-级别-内容
+LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+# 本模块挂到根日志上的处理器（重新配置时只替换这些，不影响pytest等添加的处理器）
+_installed_handlers = [
+    logging.FileHandler(log_file, encoding="utf-8"),  # 输出到文件
+    logging.StreamHandler()  # 输出到控制台
+]
 logging.basicConfig(
     level=logging.INFO,  # 日志级别：INFO及以上才会输出
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    handlers=[
-        logging.FileHandler(log_file, encoding="utf-8"),  # 输出到文件
-        logging.StreamHandler()  # 输出到控制台
-    ]
+    format=LOG_FORMAT,
+    handlers=_installed_handlers
 )
 
 # 创建日志实例，供其他模块调用
-logger = logging.getLogger("auto_test")
\ No newline at end of file
+logger = logging.getLogger("auto_test")
+
+
+# 异步模式下日志队列满时，丢弃统计的输出间隔（秒）
+DROP_WARNING_INTERVAL = 10.0
+
+# 单条日志中请求/响应内容的最大长度（字符），超出部分截断
+MAX_PAYLOAD_LENGTH = 2000
+
+# 大报文采样：只展示前若干个元素/键和有限的嵌套层级，避免完整序列化
+_payload_repr = reprlib.Repr()
+_payload_repr.maxlevel = 6
+_payload_repr.maxdict = 30
+_payload_repr.maxlist = 20
+_payload_repr.maxtuple = 20
+_payload_repr.maxstring = 500
+_payload_repr.maxother = 200
+
+
+class LazyPayload:
+    """延迟格式化的日志参数：只有日志记录真正被输出时才生成文本，
+    且大报文按采样和长度截断后输出，用法：logger.debug("响应: %s", lazy_repr(body))
+    """
+    __slots__ = ("obj", "limit")
+
+    def __init__(self, obj, limit: int = MAX_PAYLOAD_LENGTH):
+        self.obj = obj
+        self.limit = limit
+
+    def __str__(self):
+        obj = self.obj
+        text = obj if isinstance(obj, str) else _payload_repr.repr(obj)
+        if self.limit and len(text) > self.limit:
+            return f"{text[:self.limit]}...(共{len(text)}字符，已截断)"
+        return text
+
+
+def lazy_repr(obj, limit: int = MAX_PAYLOAD_LENGTH) -> LazyPayload:
+    """包装日志参数，推迟到输出时再格式化（配合%s占位符使用）"""
+    return LazyPayload(obj, limit)
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """结构化日志：每条记录输出为一行JSON，便于后续用工具检索和统计"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "process": record.process,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = self.formatStack(record.stack_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """有界队列日志处理器：队列已满时丢弃记录并计数，调用方永远不会因写日志而阻塞
+    记录原样入队，消息格式化（含LazyPayload）和异常堆栈都在后台线程中处理，调用方只付出入队的开销
+    （日志参数在输出前被调用方修改时，输出的是修改后的内容）
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+        self._dropped_lock = threading.Lock()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """不在调用方线程中格式化（QueueHandler默认会先生成消息文本并清除exc_info）"""
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._dropped_lock:
+                self.dropped += 1
+
+
+class BlockingStopQueueListener(logging.handlers.QueueListener):
+    """后台写日志线程：停止时以阻塞方式放入结束标记，保证队列满时也能正常停止；
+    队列有丢弃时每隔DROP_WARNING_INTERVAL秒输出一次丢弃统计
+    """
+
+    def __init__(self, queue_handler: DroppingQueueHandler, *handlers, respect_handler_level: bool = False):
+        super().__init__(queue_handler.queue, *handlers, respect_handler_level=respect_handler_level)
+        self.queue_handler = queue_handler
+        self._reported = 0  # 已输出统计的丢弃数
+        self._reported_at = time.monotonic()
+
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)
+
+    def handle(self, record: logging.LogRecord):
+        super().handle(record)
+        self.report_dropped()
+
+    def report_dropped(self, final: bool = False):
+        """输出新增的丢弃数（final为True时不受间隔限制，输出累计丢弃数）"""
+        dropped = self.queue_handler.dropped
+        now = time.monotonic()
+        if final:
+            if not dropped:
+                return
+        elif dropped == self._reported or now - self._reported_at < DROP_WARNING_INTERVAL:
+            return
+        if final:
+            message = f"日志队列已满，共丢弃{dropped}条日志"
+        else:
+            message = f"日志队列已满，最近{now - self._reported_at:.0f}秒丢弃{dropped - self._reported}条日志（累计{dropped}条）"
+        self._reported, self._reported_at = dropped, now
+        super().handle(logger.makeRecord(logger.name, logging.WARNING, __file__, 0, message, None, None))
+
+
+# 当前生效的后台写日志线程（未启用异步模式时为None）
+_listener = None
+_queue_handler = None
+
+
+def _build_file_handler(file_path: str, rotate: str, max_bytes: int,
+                        backup_count: int, when: str) -> logging.Handler:
+    """按轮转方式创建文件处理器：none（不轮转）/ size（按大小）/ time（按时间）"""
+    if rotate == "size":
+        return logging.handlers.RotatingFileHandler(
+            file_path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8")
+    if rotate == "time":
+        return logging.handlers.TimedRotatingFileHandler(
+            file_path, when=when, backupCount=backup_count, encoding="utf-8")
+    return logging.FileHandler(file_path, encoding="utf-8")
+
+
+def setup_logging(async_mode: bool = False, queue_size: int = 10000, json_lines: bool = False,
+                  rotate: str = "none", max_bytes: int = 50 * 1024 * 1024, backup_count: int = 10,
+                  when: str = "midnight", worker_id=None, run_id=None, console: bool = True,
+                  level: str = "INFO") -> str:
+    """重新配置日志输出（可重复调用，后一次调用会替换前一次的配置）
+    Args:
+        async_mode: 是否启用后台队列写日志（调用方只负责入队，文件和控制台输出由后台线程完成）
+        queue_size: 后台队列容量，队列满时丢弃新记录而不是阻塞调用方
+        json_lines: 文件日志是否使用JSON Lines格式（扩展名为.jsonl）
+        rotate: 文件轮转方式：none（按日期命名，不轮转）/ size（按大小）/ time（按时间）
+        max_bytes: 按大小轮转时单个文件的最大字节数
+        backup_count: 轮转时保留的历史文件数
+        when: 按时间轮转的周期（同TimedRotatingFileHandler的when参数，如"midnight"、"H"）
+        worker_id: 工作进程/线程标识，指定后写入独立的日志文件（如20240520-w1.log）
+        run_id: 执行批次标识，指定后每次执行写入新的日志文件（如20240520-153000-ab12cd-w1.log），
+            不与当天其他执行的日志混在一起
+        console: 是否同时输出到控制台
+        level: 日志级别
+    Returns:
+        日志文件路径
+    """
+    global _listener, _queue_handler
+    shutdown_logging()
+
+    # 日志文件名：不轮转时沿用按日期命名，轮转时使用固定文件名由处理器负责切分
+    base_name = datetime.now().strftime("%Y%m%d") if rotate == "none" else "auto_test"
+    if run_id is not None:
+        base_name = f"{base_name}-{run_id}"
+    if worker_id is not None:
+        base_name = f"{base_name}-{worker_id}"
+    file_path = os.path.join(log_dir, base_name + (".jsonl" if json_lines else ".log"))
+
+    file_handler = _build_file_handler(file_path, rotate, max_bytes, backup_count, when)
+    file_handler.setFormatter(JsonLinesFormatter() if json_lines else logging.Formatter(LOG_FORMAT))
+    handlers = [file_handler]
+    if console:
+        stream_handler = logging.StreamHandler()
+        stream_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        handlers.append(stream_handler)
+
+    root = logging.getLogger()
+    for handler in _installed_handlers:
+        root.removeHandler(handler)
+        handler.close()
+    root.setLevel(level)
+
+    if async_mode:
+        _queue_handler = DroppingQueueHandler(queue.Queue(maxsize=queue_size))
+        _listener = BlockingStopQueueListener(_queue_handler, *handlers, respect_handler_level=True)
+        _listener.start()
+        _installed_handlers[:] = [_queue_handler]
+    else:
+        _installed_handlers[:] = handlers
+    for handler in _installed_handlers:
+        root.addHandler(handler)
+    return file_path
+
+
+def shutdown_logging():
+    """停止后台写日志线程并写完队列中剩余的记录（未启用异步模式时无操作）
+    停止后根日志器改为直接输出到控制台，之后的日志（如退出时写回变量的警告）不会丢失
+    """
+    global _listener, _queue_handler
+    if _listener is None:
+        return
+    root = logging.getLogger()
+    root.removeHandler(_queue_handler)
+    _installed_handlers.remove(_queue_handler)
+    _listener.stop()  # 会先处理完队列中已有的记录
+    # 队列已停止，直接交给目标处理器输出累计丢弃数
+    _listener.report_dropped(final=True)
+    for handler in _listener.handlers:
+        handler.close()
+    _listener = None
+    _queue_handler = None
+    # 记入_installed_handlers：再次调用setup_logging时会被移除
+    fallback = logging.StreamHandler()
+    fallback.setFormatter(logging.Formatter(LOG_FORMAT))
+    _installed_handlers.append(fallback)
+    root.addHandler(fallback)
+
+
+atexit.register(shutdown_logging)
@@ -0,0 +1,282 @@
+"""运行期实时指标：长时间稳定性/压测执行期间按 接口（方法+路径）+ case_id 统计
+请求数、失败数、重试数、进行中的请求数和耗时直方图（p50/p99）
+- 通过ApiRunner钩子采集：请求发出前计入进行中，请求结束后（耗时样本）计入请求数、失败、重试和耗时
+- 按线程分片：每个线程只写自己的计数器，记录时不加锁；抓取时合并各分片（只在新线程首次记录时加一次锁）
+- 耗时直方图使用对数分桶（相邻桶上限相差约19%），内存固定，分位数由桶内线性插值估算
+- 本地HTTP端点（/metrics）输出Prometheus文本格式，可由本地Prometheus/脚本抓取；
+  另有后台线程按间隔输出一行汇总（最近一个间隔的吞吐、失败、重试、进行中和p50/p99）
+失败的定义：请求异常（连接失败、超时、熔断等）或5xx响应；4xx可能是用例预期的结果，不计为失败
+"""
+import bisect
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from src.utils.logger import logger
+from src.utils.stats import BUCKET_BOUNDS, histogram_quantile
+from src.utils.timing import current_case_id
+
+# 输出的分位数
+QUANTILES = (0.5, 0.9, 0.99)
+PREFIX = "apitest"
+
+
+class _Series:
+    """单个线程内某个 接口+用例 的计数（只由所属线程写入）"""
+    __slots__ = ("started", "requests", "failures", "retries", "total", "buckets")
+
+    def __init__(self):
+        self.started = 0  # 已发出的请求数（减去requests即为进行中）
+        self.requests = 0  # 已结束的请求数
+        self.failures = 0
+        self.retries = 0
+        self.total = 0.0  # 耗时总和（秒）
+        self.buckets = [0] * (len(BUCKET_BOUNDS) + 1)
+
+
+class _Totals:
+    """合并后的计数（抓取和汇总时使用）"""
+    __slots__ = ("started", "requests", "failures", "retries", "total", "buckets")
+
+    def __init__(self):
+        self.started = self.requests = self.failures = self.retries = 0
+        self.total = 0.0
+        self.buckets = [0] * (len(BUCKET_BOUNDS) + 1)
+
+    def add(self, series):
+        self.started += series.started
+        self.requests += series.requests
+        self.failures += series.failures
+        self.retries += series.retries
+        self.total += series.total
+        buckets = self.buckets
+        for i, count in enumerate(series.buckets):
+            if count:
+                buckets[i] += count
+
+    def minus(self, other: "_Totals") -> "_Totals":
+        """与之前的快照相减，得到这段时间内的增量"""
+        delta = _Totals()
+        delta.requests = self.requests - other.requests
+        delta.failures = self.failures - other.failures
+        delta.retries = self.retries - other.retries
+        delta.total = self.total - other.total
+        delta.buckets = [a - b for a, b in zip(self.buckets, other.buckets)]
+        return delta
+
+    @property
+    def in_flight(self) -> int:
+        return max(0, self.started - self.requests)
+
+    def quantile(self, q: float) -> float:
+        """由直方图估算分位数（秒）"""
+        return histogram_quantile(self.buckets, q)
+
+
+def _escape(value) -> str:
+    """Prometheus标签值转义"""
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+class Metrics:
+    """指标注册表：作为ApiRunner的钩子使用（attach），按线程分片记录"""
+
+    def __init__(self):
+        self.started_at = time.time()
+        self._local = threading.local()
+        self._shards: List[Dict[Tuple[str, str, str], _Series]] = []  # 各线程的 (方法, 路径, case_id) → 计数
+        self._shards_lock = threading.Lock()
+
+    def _series(self, method: str, path: str, case_id: Optional[str]) -> _Series:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._shards_lock:
+                self._shards.append(shard)
+        key = (method.upper(), path or "", case_id or "-")
+        series = shard.get(key)
+        if series is None:
+            series = shard[key] = _Series()
+        return series
+
+    def attach(self, runner):
+        """注册到ApiRunner：请求发出前和结束后各调用一次"""
+        runner.add_start_hook(self.on_start)
+        runner.add_hook(self.record)
+
+    def on_start(self, method: str, path: str):
+        """请求发出前（ApiRunner开始钩子）：计入进行中"""
+        self._series(method, path, current_case_id()).started += 1
+
+    def record(self, sample: Dict):
+        """请求结束后（ApiRunner钩子）：计入请求数、失败、重试和耗时"""
+        series = self._series(sample["method"], sample["path"], sample.get("case_id"))
+        total = sample["total"]
+        series.requests += 1
+        series.total += total
+        series.buckets[bisect.bisect_left(BUCKET_BOUNDS, total)] += 1
+        status = sample.get("status")
+        if sample.get("error") is not None or status is None or status >= 500:
+            series.failures += 1
+        if sample.get("attempt"):
+            series.retries += 1
+
+    def collect(self) -> Dict[Tuple[str, str, str], _Totals]:
+        """合并各线程分片，返回 (方法, 路径, case_id) → 合并后的计数
+        （不阻塞记录，正在记录的样本可能只有部分字段计入，下次抓取时补齐）
+        """
+        with self._shards_lock:
+            shards = list(self._shards)
+        merged: Dict[Tuple[str, str, str], _Totals] = {}
+        for shard in shards:
+            for key, series in list(shard.items()):
+                totals = merged.get(key)
+                if totals is None:
+                    totals = merged[key] = _Totals()
+                totals.add(series)
+        return merged
+
+    def overall(self, merged: Optional[Dict] = None) -> _Totals:
+        """全部接口和用例合计"""
+        totals = _Totals()
+        for series in (self.collect() if merged is None else merged).values():
+            totals.add(series)
+        return totals
+
+    def prometheus_text(self) -> str:
+        """生成Prometheus文本格式（text/plain; version=0.0.4）"""
+        merged = self.collect()
+        lines = []
+
+        def family(name, kind, help_text, rows):
+            lines.append(f"# HELP {PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {PREFIX}_{name} {kind}")
+            lines.extend(rows)
+
+        def labels(key, **extra):
+            method, path, case_id = key
+            pairs = [("method", method), ("path", path), ("case", case_id)] + list(extra.items())
+            return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+        items = sorted(merged.items())
+        family("requests_total", "counter", "已完成的请求数",
+               [f"{PREFIX}_requests_total{labels(k)} {t.requests}" for k, t in items])
+        family("request_failures_total", "counter", "失败的请求数（请求异常或5xx）",
+               [f"{PREFIX}_request_failures_total{labels(k)} {t.failures}" for k, t in items])
+        family("request_retries_total", "counter", "重试的请求数",
+               [f"{PREFIX}_request_retries_total{labels(k)} {t.retries}" for k, t in items])
+        family("requests_in_flight", "gauge", "进行中的请求数",
+               [f"{PREFIX}_requests_in_flight{labels(k)} {t.in_flight}" for k, t in items])
+        rows = []
+        for key, totals in items:
+            cumulative = 0
+            for bound, count in zip(BUCKET_BOUNDS, totals.buckets):
+                cumulative += count
+                rows.append(f"{PREFIX}_request_duration_seconds_bucket{labels(key, le=f'{bound:.6g}')} {cumulative}")
+            cumulative += totals.buckets[-1]  # 与各桶取自同一份计数，保证单调
+            rows.append(f"{PREFIX}_request_duration_seconds_bucket{labels(key, le='+Inf')} {cumulative}")
+            rows.append(f"{PREFIX}_request_duration_seconds_sum{labels(key)} {totals.total:.6f}")
+            rows.append(f"{PREFIX}_request_duration_seconds_count{labels(key)} {cumulative}")
+        family("request_duration_seconds", "histogram", "请求总耗时（秒）", rows)
+        family("request_duration_quantile_seconds", "gauge", "由直方图估算的请求耗时分位数（秒）",
+               [f"{PREFIX}_request_duration_quantile_seconds{labels(k, quantile=q)} {t.quantile(q):.6f}"
+                for k, t in items for q in QUANTILES])
+        family("uptime_seconds", "gauge", "指标采集已运行的时间（秒）",
+               [f"{PREFIX}_uptime_seconds {time.time() - self.started_at:.3f}"])
+        return "\n".join(lines) + "\n"
+
+
+def format_summary(totals: _Totals, interval: float, cumulative: _Totals) -> str:
+    """一行汇总：最近一个间隔的吞吐、失败、重试、进行中和耗时分位数，以及累计请求数和失败数"""
+    rate = totals.requests / interval if interval > 0 else 0.0
+    return (f"【实时指标】近{interval:.0f}s：请求{totals.requests}（{rate:.1f}/s），失败{totals.failures}，"
+            f"重试{totals.retries}，进行中{cumulative.in_flight}，p50 {totals.quantile(0.5) * 1000:.1f}ms，"
+            f"p99 {totals.quantile(0.99) * 1000:.1f}ms ｜ 累计：请求{cumulative.requests}，失败{cumulative.failures}")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """/metrics 输出Prometheus文本格式"""
+
+    def do_GET(self):
+        if self.path.split("?", 1)[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = self.server.metrics.prometheus_text().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # 抓取请求不写日志
+
+
+class MetricsExporter:
+    """指标输出：本地HTTP端点 + 定时控制台汇总（后台守护线程）"""
+
+    def __init__(self, metrics: Metrics, host: str = "127.0.0.1", port: int = 9464,
+                 summary_interval: float = 10.0):
+        """
+        Args:
+            metrics: 指标注册表
+            host: HTTP端点监听地址（默认只监听本机）
+            port: HTTP端点端口，0表示随机分配，None表示不启动HTTP端点
+            summary_interval: 控制台汇总的间隔（秒），0表示不输出
+        """
+        self.metrics = metrics
+        self.summary_interval = float(summary_interval or 0)
+        self._server = None
+        self._stop = threading.Event()
+        self._last = metrics.overall()
+        self._last_at = time.perf_counter()
+        if port is not None:
+            self._server = ThreadingHTTPServer((host, int(port)), _Handler)
+            self._server.daemon_threads = True
+            self._server.metrics = metrics
+            threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True).start()
+            logger.info(f"实时指标端点已启动：{self.url}")
+        if self.summary_interval > 0:
+            threading.Thread(target=self._summary_loop, name="metrics-summary", daemon=True).start()
+
+    @property
+    def url(self) -> Optional[str]:
+        if self._server is None:
+            return None
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/metrics"
+
+    def log_summary(self):
+        """输出自上次汇总以来的一行汇总"""
+        now = time.perf_counter()
+        cumulative = self.metrics.overall()
+        delta = cumulative.minus(self._last)
+        logger.info(format_summary(delta, now - self._last_at, cumulative))
+        self._last, self._last_at = cumulative, now
+
+    def _summary_loop(self):
+        while not self._stop.wait(self.summary_interval):
+            self.log_summary()
+
+    def stop(self):
+        """停止汇总线程和HTTP端点（停止前输出最后一个间隔的汇总）"""
+        self._stop.set()
+        if self.summary_interval > 0 and time.perf_counter() - self._last_at >= 1.0:
+            self.log_summary()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+
+# 默认的全局指标注册表
+default_metrics = Metrics()
+
+
+def start_metrics(metrics_config: Optional[Dict], enabled: bool = False,
+                  metrics: Metrics = default_metrics) -> Optional[MetricsExporter]:
+    """按config.yaml的metrics节点启动指标输出（enabled为命令行开关），未启用时返回None"""
+    metrics_config = dict(metrics_config or {})
+    if not (enabled or metrics_config.pop("enabled", False)):
+        return None
+    metrics_config.pop("enabled", None)
+    return MetricsExporter(metrics, **metrics_config)
@@ -0,0 +1,261 @@
+"""本地mock服务：根据data目录下YAML用例的api/expected/extract生成路由，用于无网络依赖的基准测试和压测
+- 路由：用例的 方法 + 路径（请求参数也一致时优先精确匹配），另含登录接口
+- 响应：状态码取expected.code，响应体按expected.json的JSONPath构造出满足断言的值，
+  extract的JSONPath填入mock值（后续用例引用这些变量时按mock值渲染）
+- 支持注入固定延迟、随机抖动和错误率，便于测量框架自身的吞吐上限并复现压测场景
+"""
+import json
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+from src.utils.assert_utils import is_matcher, normalize_path
+from src.utils.cassette import request_key
+from src.utils.json_path import assign_path, compile_path
+from src.utils.logger import logger
+from src.utils.template import compile_case, global_lookup
+from src.utils.var_handler import current_var_file, use_var_file
+
+# mock登录接口返回的token
+MOCK_TOKEN = "mock-token"
+
+
+def _sample_value(expected):
+    """生成满足断言的mock值：普通值原样返回；匹配器（$type/$range/$len/$subset）尽量构造符合条件的值，
+    $regex无法反向生成，使用占位字符串
+    """
+    if not is_matcher(expected):
+        return expected
+    if "$subset" in expected:
+        return expected["$subset"]
+    type_name = expected.get("$type")
+    type_name = type_name[0] if isinstance(type_name, list) else type_name
+    if "$range" in expected:
+        low, high = expected["$range"]
+        return low if low is not None else (high if high is not None else 0)
+    if "$len" in expected:
+        length = expected["$len"]
+        length = (length[0] or 0) if isinstance(length, list) else length
+        return "x" * length if type_name == "str" else [{} for _ in range(length)]
+    return {"str": "mock", "int": 0, "float": 0.0, "number": 0, "bool": True,
+            "list": [], "dict": {}, "null": None}.get(type_name, "mock")
+
+
+def _merge(base, extra):
+    """深度合并响应体（同一路由被多个用例使用时，使所有用例的断言都能通过；冲突时后者覆盖）"""
+    if isinstance(base, dict) and isinstance(extra, dict):
+        for key, value in extra.items():
+            base[key] = _merge(base[key], value) if key in base else value
+        return base
+    if isinstance(base, list) and isinstance(extra, list):
+        for i, value in enumerate(extra):
+            if i < len(base):
+                base[i] = _merge(base[i], value)
+            else:
+                base.append(value)
+        return base
+    return extra
+
+
+def build_routes(cases: List, login_path: Optional[str] = None) -> Tuple[Dict, Dict]:
+    """根据用例生成路由
+    Returns:
+        (精确路由, 路径路由)：精确路由的键为request_key（方法+路径+请求参数哈希），
+        路径路由的键为(方法, 路径)；值均为(状态码, 响应体)
+    """
+    mock_values = {}  # 用例提取的变量 → mock值
+
+    def lookup(name):
+        value = mock_values.get(name)
+        return global_lookup(name) if value is None else value
+
+    exact, by_path = {}, {}
+    for case in map(compile_case, cases):
+        api = case.render_api(lookup)
+        expected = case.render_expected(lookup)
+        method, path = api.get("method", "get").upper(), api.get("path")
+        if not path:
+            continue
+        body = {}
+        for json_path, value in (expected.get("json") or {}).items():
+            steps = compile_path(normalize_path(json_path)).steps
+            if steps:
+                assign_path(body, steps, _sample_value(value))
+        for var_name, json_path in (case.extract or {}).items():
+            compiled = compile_path(json_path)
+            if compiled.steps and not compiled.find(body):
+                assign_path(body, compiled.steps, f"mock_{var_name}")
+            found = compiled.find(body) if compiled.steps else False
+            if found:
+                mock_values[var_name] = found[0]
+        status = expected.get("code", 200)
+        key = request_key(method, path, api.get("params"), api.get("json"), api.get("data"))
+        for routes, route_key in ((exact, key), (by_path, (method, path))):
+            if route_key in routes:
+                routes[route_key] = (status, _merge(routes[route_key][1], json.loads(json.dumps(body))))
+            else:
+                routes[route_key] = (status, json.loads(json.dumps(body)))
+    if login_path:
+        login_body = {"code": "0000", "msg": "操作成功",
+                      "data": {"token": MOCK_TOKEN, "userId": 1, "expiresIn": 7200}}
+        by_path[("POST", login_path)] = (200, login_body)
+    return exact, by_path
+
+
+def _encode(body) -> bytes:
+    return json.dumps(body, ensure_ascii=False).encode("utf-8")
+
+
+class _MockHandler(BaseHTTPRequestHandler):
+    """mock请求处理器（保持长连接）"""
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True  # 响应头和响应体分两次写出，关闭Nagle避免与延迟ACK叠加出约40ms的等待
+
+    def _handle(self):
+        mock = self.server.mock
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        status, content = mock.respond(self.command, self.path, raw)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json;charset=UTF-8")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    do_GET = do_POST = do_PUT = do_DELETE = do_PATCH = _handle
+
+    def log_message(self, format, *args):
+        pass  # 不输出访问日志，避免影响基准测试
+
+
+class MockServer:
+    """由YAML用例生成的本地mock服务"""
+
+    def __init__(self, cases: List, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0,
+                 jitter: float = 0.0, error_rate: float = 0.0, login_path: Optional[str] = None):
+        """初始化mock服务
+        Args:
+            cases: 用例列表（用例字典或CompiledCase）
+            host: 监听地址
+            port: 监听端口（0表示随机分配空闲端口）
+            latency: 每个请求注入的固定延迟（秒）
+            jitter: 在固定延迟基础上额外注入的随机延迟上限（秒）
+            error_rate: 返回500错误的概率（0~1）
+            login_path: 登录接口路径（返回MOCK_TOKEN）
+        """
+        self.login_path = login_path
+        self.load_routes(cases)
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.request_count = 0
+        self.error_count = 0
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+        self._var_dir = None  # start_mock_server创建的临时变量目录（停止时删除）
+        self._previous_var_file = None  # 切换到临时变量文件之前使用的变量文件（停止时恢复）
+
+    def load_routes(self, cases: List):
+        """按用例（重新）生成路由，服务运行中也可调用（如常驻进程重新加载了用例）"""
+        exact, by_path = build_routes(cases, self.login_path)
+        # 响应体预先序列化，处理请求时不再重复编码
+        self.exact = {key: (status, _encode(body)) for key, (status, body) in exact.items()}
+        self.by_path = {key: (status, _encode(body)) for key, (status, body) in by_path.items()}
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def respond(self, method: str, raw_path: str, raw_body: bytes) -> Tuple[int, bytes]:
+        """按路由生成响应（在请求处理线程中调用），返回(状态码, 序列化后的响应体)"""
+        delay = self.latency + (random.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay > 0:
+            time.sleep(delay)
+        injected = self.error_rate > 0 and random.random() < self.error_rate
+        with self._lock:
+            self.request_count += 1
+            self.error_count += injected
+        if injected:
+            return 500, _encode({"code": "5000", "msg": "mock注入错误"})
+
+        url = urlsplit(raw_path)
+        try:
+            json_data = json.loads(raw_body) if raw_body else None
+        except ValueError:
+            json_data = None
+        key = request_key(method, url.path, dict(parse_qsl(url.query)) or None,
+                          json_data if isinstance(json_data, dict) else None)
+        route = self.exact.get(key) or self.by_path.get((method.upper(), url.path))
+        if route is None:
+            return 404, _encode({"code": "404", "msg": f"mock路由不存在：{method} {url.path}"})
+        return route
+
+    def start(self) -> str:
+        """在后台线程中启动服务，返回base_url"""
+        self._server = ThreadingHTTPServer((self.host, self.port), _MockHandler)
+        self._server.daemon_threads = True
+        self._server.mock = self
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name="mock-server", daemon=True)
+        self._thread.start()
+        logger.info(f"mock服务已启动：{self.base_url}，路由{len(self.by_path)}个，"
+                    f"延迟{self.latency}s（抖动{self.jitter}s），错误率{self.error_rate}")
+        return self.base_url
+
+    def stop(self):
+        """停止服务"""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+            logger.info(f"mock服务已停止，共处理{self.request_count}个请求（注入错误{self.error_count}个）")
+        if self._var_dir is not None:
+            # 恢复原来的变量文件（切换时会先写回临时变量），再删除临时目录
+            use_var_file(self._previous_var_file)
+            shutil.rmtree(self._var_dir, ignore_errors=True)
+            self._var_dir = self._previous_var_file = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def start_mock_server(cases: List, mock_config: Optional[Dict] = None,
+                      login_path: Optional[str] = None, isolate_vars: bool = True) -> MockServer:
+    """按config.yaml的mock节点创建并启动mock服务
+    Args:
+        isolate_vars: 是否把变量切换到临时文件（mock返回的token和提取的变量不写回user_vars.yaml），
+            服务停止时删除临时文件并恢复原来的变量文件
+    """
+    mock_config = mock_config or {}
+    var_dir = previous_var_file = None
+    if isolate_vars:
+        var_dir, previous_var_file = tempfile.mkdtemp(prefix="mock_vars_"), current_var_file()
+        use_var_file(os.path.join(var_dir, "user_vars.yaml"))
+    server = MockServer(
+        cases,
+        host=mock_config.get("host", "127.0.0.1"),
+        port=mock_config.get("port", 0),
+        latency=mock_config.get("latency", 0.0),
+        jitter=mock_config.get("jitter", 0.0),
+        error_rate=mock_config.get("error_rate", 0.0),
+        login_path=login_path,
+    )
+    server._var_dir, server._previous_var_file = var_dir, previous_var_file
+    try:
+        server.start()
+    except BaseException:
+        server.stop()  # 启动失败（如端口被占用）时同样恢复变量文件
+        raise
+    return server
@@ -0,0 +1,119 @@
+"""多环境并发执行：同一套用例同时在多个环境（如test、staging、prod-canary）执行，输出结果和耗时对比
+- 每个环境在独立的工作进程中执行（复用分布式执行的run_shard），拥有独立的ApiRunner、
+  登录态（token按base_url缓存）、变量文件（变量命名空间）和日志文件
+- 各环境的结果写入 <输出目录>/<环境>/worker-<环境>.json，汇总后生成对比报告：
+  用例状态在各环境间不一致的标记为“差异”，平均耗时超过最快环境slow_ratio倍（且至少慢slow_min_ms）的标记为“慢”
+"""
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, List
+from src.utils.config import get_env_config
+from src.utils.distributed import new_run_id, run_shard
+from src.utils.timing import TimingRecorder
+
+# 多环境执行结果的默认输出目录
+DEFAULT_OUTPUT_DIR = os.path.join("report", "envs")
+# 平均耗时超过最快环境的该倍数时标记为“慢”
+DEFAULT_SLOW_RATIO = 1.5
+# 与最快环境的耗时差低于该值（毫秒）时不标记为“慢”，避免毫秒级抖动被误判
+DEFAULT_SLOW_MIN_MS = 50.0
+
+
+def parse_envs(value: str) -> List[str]:
+    """解析逗号分隔的环境列表（如"test,staging"），校验环境均已在config.yaml中配置"""
+    envs = list(dict.fromkeys(env.strip() for env in value.split(",") if env.strip()))
+    for env in envs:
+        get_env_config(env)
+    return envs
+
+
+def run_envs(envs: List[str], threads: int = 4, output_dir: str = DEFAULT_OUTPUT_DIR,
+             data_dir: str = "data", mock: bool = False) -> Dict[str, str]:
+    """每个环境启动一个工作进程并发执行全部用例，返回 环境 → 结果文件路径"""
+    run_id = new_run_id()
+    with ProcessPoolExecutor(max_workers=len(envs)) as pool:
+        futures = {env: pool.submit(run_shard, 0, 1, env, threads, os.path.join(output_dir, env), data_dir,
+                                    worker_id=env, mock=mock, run_id=run_id)
+                   for env in envs}
+        return {env: future.result() for env, future in futures.items()}
+
+
+def compare_envs(result_files: Dict[str, str], slow_ratio: float = DEFAULT_SLOW_RATIO,
+                 slow_min_ms: float = DEFAULT_SLOW_MIN_MS, report_path: str = "report/env_compare.json") -> Dict:
+    """汇总各环境的结果，按用例对比状态和平均耗时，写入对比报告
+    Returns:
+        对比报告字典：envs为各环境汇总（用例状态计数、耗时分位数），cases为逐用例对比
+    """
+    envs, cases = [], {}
+    for env, file_path in result_files.items():
+        with open(file_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        recorder = TimingRecorder()
+        recorder.merge(data["timing"])
+        by_case = {row["name"]: row for row in recorder.summary()["by_case"]}
+        counts = {}
+        for result in data["results"]:
+            counts[result["status"]] = counts.get(result["status"], 0) + 1
+            row = by_case.get(result["case_id"])
+            cases.setdefault(result["case_id"], {})[env] = {
+                "status": result["status"],
+                "total_ms": row["total_mean_ms"] if row else None,
+                "retries": result.get("retries", 0),
+                "error": result.get("error"),
+            }
+        overall = recorder.overall(env)
+        envs.append({"env": env, "base_url": data.get("base_url"),
+                     "duration": data["duration"], "counts": counts, "requests": overall["count"],
+                     "p50_ms": overall["total_p50_ms"], "p90_ms": overall["total_p90_ms"],
+                     "p99_ms": overall["total_p99_ms"], "log_file": data.get("log_file")})
+
+    rows = []
+    for case_id, by_env in cases.items():
+        statuses = {item["status"] for item in by_env.values()}
+        timings = [item["total_ms"] for item in by_env.values() if item["total_ms"]]
+        fastest = min(timings) if timings else None
+        slow = sorted(env for env, item in by_env.items()
+                      if fastest and item["total_ms"] and item["total_ms"] > fastest * slow_ratio
+                      and item["total_ms"] - fastest >= slow_min_ms)
+        rows.append({"case_id": case_id, "envs": by_env, "status_differs": len(statuses) > 1
+                     or len(by_env) < len(result_files), "slow_envs": slow})
+
+    report = {
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+        "slow_ratio": slow_ratio,
+        "slow_min_ms": slow_min_ms,
+        "envs": envs,
+        "cases": rows,
+    }
+    os.makedirs(os.path.dirname(report_path) or ".", exist_ok=True)
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    report["report_file"] = os.path.abspath(report_path)
+    return report
+
+
+def format_comparison(report: Dict) -> str:
+    """生成对比文本表格：环境汇总 + 逐用例的 状态/平均耗时(ms)"""
+    env_names = [item["env"] for item in report["envs"]]
+    lines = ["【多环境执行汇总】（耗时单位：ms）",
+             f"{'env':<16}{'duration(s)':>12}{'requests':>10}{'p50':>9}{'p90':>9}{'p99':>9}  counts"]
+    for item in report["envs"]:
+        lines.append(f"{item['env'][:15]:<16}{item['duration']:>12.2f}{item['requests']:>10}{item['p50_ms']:>9.1f}"
+                     f"{item['p90_ms']:>9.1f}{item['p99_ms']:>9.1f}  {item['counts']}")
+    lines += ["", "【逐用例对比】（状态/平均耗时ms）",
+              f"{'case_id':<30}" + "".join(f"{env[:21]:>22}" for env in env_names) + "  备注"]
+    for row in report["cases"]:
+        cells = []
+        for env in env_names:
+            item = row["envs"].get(env)
+            if item is None:
+                cells.append(f"{'-':>22}")
+            else:
+                total = f"{item['total_ms']:.1f}" if item["total_ms"] is not None else "-"
+                cells.append(f"{item['status'] + '/' + total:>22}")
+        notes = (["差异"] if row["status_differs"] else []) + \
+                ([f"慢：{','.join(row['slow_envs'])}"] if row["slow_envs"] else [])
+        lines.append(f"{row['case_id'][:29]:<30}" + "".join(cells) + "  " + " ".join(notes))
+    return "\n".join(lines)
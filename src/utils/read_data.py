@@ -1,9 +1,65 @@
 """YAML用例数据读取工具：读取data目录下的用例数据文件
 支持YAML多文档格式，返回用例列表
+大数据文件使用流式读取 + 磁盘索引缓存：
+- 解析优先使用C加速的CSafeLoader（未安装libyaml时回退到SafeLoader）
+- 首次读取时逐条解析顶层列表，写入.case_cache下的用例缓存和case_id索引
+- 文件未变化（mtime/大小一致，或内容哈希一致）时直接从缓存读取，不再解析YAML
+- 测试模块用LazyCase参数化：收集时只读取索引中的case_id，由pytest按 -k 等条件筛选，
+  只有实际执行的用例才反序列化和编译
 """
-import yaml
+import hashlib
+import json
 import os
-from typing import List, Dict
+import pickle
+import tempfile
+import yaml
+from typing import Callable, Dict, Iterator, List, Optional
+
+# 优先使用libyaml的C实现
+YamlLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+# 用例缓存目录：项目根目录下的.case_cache
+CACHE_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(__file__))), ".case_cache"
+)
+# 缓存格式版本：缓存结构变化时递增，使旧缓存失效
+CACHE_VERSION = 1
+
+
+class _StreamFallback(Exception):
+    """文件结构不适合逐条解析（多文档、跨用例锚点等），需要回退到整体解析"""
+
+
+class LazyCase:
+    """延迟加载的用例：case_id来自索引，首次访问其他属性时才从缓存反序列化（并按factory转换，如compile_case）"""
+
+    __slots__ = ("case_id", "_bin_path", "_offset", "_length", "_factory", "_case")
+
+    def __init__(self, case_id, bin_path: str, offset: int, length: int, factory: Optional[Callable] = None):
+        self.case_id = case_id
+        self._bin_path = bin_path
+        self._offset = offset
+        self._length = length
+        self._factory = factory
+        self._case = None
+
+    def load(self):
+        """返回用例（用例字典，或factory转换后的对象）"""
+        if self._case is None:
+            with open(self._bin_path, "rb") as f:
+                f.seek(self._offset)
+                case = pickle.loads(f.read(self._length))
+            self._case = self._factory(case) if self._factory is not None else case
+        return self._case
+
+    def __getattr__(self, name):
+        return getattr(self.load(), name)
+
+    def __getitem__(self, key):
+        return self.load()[key]
+
+    def __repr__(self):
+        return f"LazyCase({self.case_id!r})"
 
 
 class DataReader:
@@ -21,9 +77,163 @@ class DataReader:
 
         # 读取YAML文件（支持多文档）
         with open(file_path, "r", encoding="utf-8") as f:
-            # safe_load_all返回生成器，转换为列表
-            cases = list(yaml.safe_load_all(f))
+            # load_all返回生成器，转换为列表
+            cases = list(yaml.load_all(f, Loader=YamlLoader))
             # 处理单文档情况（若文件只有一个文档，外层加列表）
             if len(cases) == 1 and isinstance(cases[0], list):
                 return cases[0]
-            return cases
\ No newline at end of file
+            return cases
+
+    @staticmethod
+    def read_cases(file_path: str) -> List[Dict]:
+        """通过索引缓存读取全部用例
+        Args:
+            file_path: YAML文件路径
+        """
+        return list(DataReader.iter_cases(file_path))
+
+    @staticmethod
+    def iter_cases(file_path: str) -> Iterator[Dict]:
+        """惰性逐条返回用例（只打开一次缓存文件，按索引顺序读取；LazyCase.load()仅用于单条访问）"""
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(f"用例文件不存在: {file_path}")
+        index = _load_index(file_path)
+        with open(index["bin_path"], "rb") as f:
+            for _, offset, length in index["cases"]:
+                f.seek(offset)
+                yield pickle.loads(f.read(length))
+
+    @staticmethod
+    def read_lazy_cases(file_path: str, factory: Optional[Callable] = None) -> List[LazyCase]:
+        """读取用例索引，返回延迟加载的用例列表（用于pytest参数化，未被选中执行的用例不会反序列化）
+        Args:
+            file_path: YAML文件路径
+            factory: 用例首次加载后的转换函数（如compile_case）
+        """
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(f"用例文件不存在: {file_path}")
+        index = _load_index(file_path)
+        return [LazyCase(case_id, index["bin_path"], offset, length, factory)
+                for case_id, offset, length in index["cases"]]
+
+
+def _file_sha1(file_path: str) -> str:
+    """计算文件内容哈希（分块读取）"""
+    digest = hashlib.sha1()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _stream_items(file_path: str) -> Iterator:
+    """逐条解析顶层为列表的YAML文件：按行首的"- "切分出每个用例单独解析，内存占用与单个用例相当"""
+    def parse(chunk):
+        if not chunk:
+            return []
+        try:
+            items = yaml.load("".join(chunk), Loader=YamlLoader)
+        except yaml.YAMLError as e:
+            raise _StreamFallback(str(e))
+        if items is None:  # 只有注释
+            return []
+        if not isinstance(items, list):
+            raise _StreamFallback("顶层不是列表")
+        return items
+
+    with open(file_path, "r", encoding="utf-8") as f:
+        chunk, started = [], False
+        for line in f:
+            if line.startswith(("---", "...")):
+                raise _StreamFallback("多文档文件")
+            if line.startswith("- ") or line.rstrip("\r\n") == "-":
+                if started:
+                    yield from parse(chunk)
+                    chunk = []
+                started = True
+            elif not started and line.strip() and not line.lstrip().startswith("#"):
+                raise _StreamFallback("顶层不是列表")
+            chunk.append(line)
+        yield from parse(chunk)
+
+
+def _atomic_write(path: str, writer):
+    """先写临时文件再重命名，避免并发读取到写了一半的缓存"""
+    fd, tmp_path = tempfile.mkstemp(dir=CACHE_DIR, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            writer(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _build_cache(file_path: str, bin_path: str) -> list:
+    """解析YAML并写入用例缓存文件，返回索引条目[(case_id, 偏移, 长度), ...]"""
+    entries = []
+
+    def write_items(f, items):
+        for case in items:
+            blob = pickle.dumps(case, protocol=pickle.HIGHEST_PROTOCOL)
+            case_id = case.get("case_id") if isinstance(case, dict) else None
+            entries.append((case_id, f.tell(), len(blob)))
+            f.write(blob)
+
+    def writer(f):
+        try:
+            write_items(f, _stream_items(file_path))
+        except _StreamFallback:
+            # 无法逐条解析时整体解析一次
+            entries.clear()
+            f.seek(0)
+            f.truncate()
+            write_items(f, DataReader.read_yaml(file_path))
+
+    _atomic_write(bin_path, writer)
+    return entries
+
+
+def _load_index(file_path: str) -> dict:
+    """读取（必要时重建）文件对应的用例索引"""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    abs_path = os.path.abspath(file_path)
+    key = hashlib.sha1(abs_path.encode("utf-8")).hexdigest()[:16]
+    idx_path = os.path.join(CACHE_DIR, f"{key}.idx")
+    bin_path = os.path.join(CACHE_DIR, f"{key}.bin")
+    stat = os.stat(abs_path)
+
+    index = None
+    if os.path.exists(idx_path) and os.path.exists(bin_path):
+        try:
+            with open(idx_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+        except ValueError:
+            index = None
+    if index is not None and index.get("version") == CACHE_VERSION and index.get("path") == abs_path:
+        if index["mtime_ns"] == stat.st_mtime_ns and index["size"] == stat.st_size:
+            index["bin_path"] = bin_path
+            return index
+        # mtime变化但内容未变（如重新checkout）：只刷新mtime，不重新解析
+        sha1 = _file_sha1(abs_path)
+        if sha1 == index["sha1"]:
+            index["mtime_ns"], index["size"] = stat.st_mtime_ns, stat.st_size
+            _atomic_write(idx_path, lambda f: f.write(json.dumps(index).encode("utf-8")))
+            index["bin_path"] = bin_path
+            return index
+    else:
+        sha1 = _file_sha1(abs_path)
+
+    index = {
+        "version": CACHE_VERSION,
+        "path": abs_path,
+        "mtime_ns": stat.st_mtime_ns,
+        "size": stat.st_size,
+        "sha1": sha1,
+        "cases": _build_cache(abs_path, bin_path),
+    }
+    _atomic_write(idx_path, lambda f: f.write(json.dumps(index, ensure_ascii=False).encode("utf-8")))
+    index["bin_path"] = bin_path
+    return index
+
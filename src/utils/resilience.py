@@ -0,0 +1,159 @@
+"""请求容错策略：重试（指数退避 + 随机抖动）和按主机的熔断器
+- RetryPolicy：连接异常、超时或指定状态码（如502/503/504）时重试，默认只重试幂等方法；
+  用例可在api中用 retry: 覆盖全局策略（retry: 0 关闭，retry: 3 指定次数，或字典覆盖任意字段）
+- CircuitBreaker：同一主机连续失败（连接异常、超时或网关类状态码502/503/504，可配置）达到阈值后熔断，
+  熔断期间请求直接失败（不再等待超时），冷却时间过后放行一个探测请求，成功则恢复，失败则继续熔断；
+  业务返回的500等状态码默认不计为主机失败
+"""
+import random
+import threading
+import time
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+from src.utils.logger import logger
+
+# 默认重试的幂等方法
+IDEMPOTENT_METHODS = ("get", "head", "options", "put", "delete")
+
+
+class CircuitOpenError(Exception):
+    """主机已熔断，请求未发送"""
+
+
+class RetryPolicy:
+    """重试策略"""
+
+    def __init__(self, max_retries: int = 0, backoff: float = 0.5, max_backoff: float = 8.0,
+                 retry_statuses=(502, 503, 504), methods=IDEMPOTENT_METHODS):
+        """
+        Args:
+            max_retries: 最大重试次数（不含首次请求），0表示不重试
+            backoff: 首次重试的基础等待时间（秒），之后每次翻倍
+            max_backoff: 单次等待时间上限（秒）
+            retry_statuses: 需要重试的响应状态码
+            methods: 允许重试的请求方法（非幂等方法重试可能产生重复数据）
+        """
+        self.max_retries = int(max_retries)
+        self.backoff = float(backoff)
+        self.max_backoff = float(max_backoff)
+        self.retry_statuses = frozenset(retry_statuses or ())
+        self.methods = frozenset(m.lower() for m in methods or ())
+
+    @classmethod
+    def from_config(cls, retry_config: Optional[Dict]) -> "RetryPolicy":
+        """按配置字典创建（字段与构造参数一致，缺省使用默认值）"""
+        return cls(**(retry_config or {}))
+
+    def override(self, case_retry) -> "RetryPolicy":
+        """按用例api中的retry配置生成新的策略（None表示沿用全局策略）"""
+        if case_retry is None:
+            return self
+        if case_retry is False or isinstance(case_retry, int):
+            fields = {"max_retries": int(case_retry)}
+        elif isinstance(case_retry, dict):
+            fields = case_retry
+        else:
+            raise ValueError(f"不支持的retry配置：{case_retry!r}")
+        return RetryPolicy(**{**self.to_dict(), **fields})
+
+    def to_dict(self) -> Dict:
+        return {"max_retries": self.max_retries, "backoff": self.backoff, "max_backoff": self.max_backoff,
+                "retry_statuses": sorted(self.retry_statuses), "methods": sorted(self.methods)}
+
+    def allows(self, method: str) -> bool:
+        """该方法是否允许重试"""
+        return self.max_retries > 0 and method.lower() in self.methods
+
+    def delay(self, attempt: int) -> float:
+        """第attempt次重试（从0开始）前的等待时间：在[0, 指数退避上限]内随机（full jitter），
+        避免大量用例在同一时刻集中重试
+        """
+        return random.uniform(0, min(self.max_backoff, self.backoff * (2 ** attempt)))
+
+
+class CircuitBreaker:
+    """熔断器（线程安全）：closed（正常）→ open（熔断）→ half_open（放行一个探测请求）"""
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 failure_statuses=(502, 503, 504)):
+        """
+        Args:
+            name: 名称（主机名，用于日志）
+            failure_threshold: 连续失败多少次后熔断，0表示不启用
+            reset_timeout: 熔断后多久放行探测请求（秒）
+            failure_statuses: 计为主机失败的响应状态码（其他状态码视为主机可用）
+        """
+        self.name = name
+        self.failure_threshold = int(failure_threshold)
+        self.reset_timeout = float(reset_timeout)
+        self.failure_statuses = frozenset(failure_statuses or ())
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        """是否处于熔断冷却期（请求会直接失败）"""
+        with self._lock:
+            return self.state == "open" and time.monotonic() - self.opened_at < self.reset_timeout
+
+    def allow(self):
+        """请求前检查：熔断中抛出CircuitOpenError；冷却结束后只放行一个探测请求"""
+        if self.failure_threshold <= 0:
+            return
+        with self._lock:
+            if self.state == "closed":
+                return
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = "half_open"
+            if self.state == "half_open" and not self._probing:
+                self._probing = True
+                logger.info(f"熔断冷却结束，发送探测请求：{self.name}")
+                return
+            remaining = max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+        raise CircuitOpenError(f"主机已熔断：{self.name}（连续失败{self.failures}次，{remaining:.0f}s后重试）")
+
+    def record_success(self):
+        with self._lock:
+            if self.state != "closed":
+                logger.info(f"熔断恢复：{self.name}")
+            self.state, self.failures, self._probing = "closed", 0, False
+
+    def release(self):
+        """请求未得出主机是否可用的结论（如响应体解析异常）时调用：释放探测名额，不计入成功或失败"""
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self):
+        if self.failure_threshold <= 0:
+            return
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == "half_open" or (self.state == "closed" and self.failures >= self.failure_threshold):
+                if self.state == "closed":
+                    logger.error(f"主机连续失败{self.failures}次，熔断{self.reset_timeout}s：{self.name}")
+                self.state, self.opened_at = "open", time.monotonic()
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(base_url: str, breaker_config: Optional[Dict] = None) -> CircuitBreaker:
+    """获取主机对应的熔断器（同一主机的所有执行器共享）"""
+    host = urlsplit(base_url).netloc or base_url
+    with _breakers_lock:
+        breaker = _breakers.get(host)
+        if breaker is None:
+            breaker = _breakers[host] = CircuitBreaker(host, **(breaker_config or {}))
+        return breaker
+
+
+def load_resilience(resilience_config: Optional[Dict], base_url: str) -> Tuple[RetryPolicy, CircuitBreaker]:
+    """按config.yaml的resilience节点创建(重试策略, 熔断器)"""
+    resilience_config = resilience_config or {}
+    return (RetryPolicy.from_config(resilience_config.get("retry")),
+            get_breaker(base_url, resilience_config.get("breaker")))
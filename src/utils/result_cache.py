@@ -0,0 +1,172 @@
+"""结果缓存：减少重复执行
+- ResponseCache：同一次执行中，渲染后完全相同的只读请求（GET/HEAD/OPTIONS，方法+路径+请求参数一致）
+  只发送一次，其余用例复用该响应；并发的相同请求只有一个真正发出，其他等待其结果（single-flight）。
+  只缓存2xx响应；其他方法（可能修改数据）默认每次都发送，用例api中显式配置 dedupe: true 时才复用
+- LastGreenCache：记录每个用例上次通过时的指纹（渲染后的请求 + 预期结果 + 提取规则 + schema），
+  changed-only模式下指纹未变化的用例不再执行。指纹在执行前按当前变量渲染，
+  上游用例重新提取出不同的值时，下游用例的指纹随之变化而重新执行
+默认关闭（config.yaml中result_cache.dedupe）；用例可在api中配置 dedupe: false 关闭响应复用
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from typing import Callable, Dict, Optional, Tuple
+from src.utils.cassette import request_key
+from src.utils.logger import logger
+from src.utils.template import compile_case
+
+# 默认复用响应的只读方法
+DEDUPE_METHODS = ("get", "head", "options")
+# 上次通过的用例指纹：项目根目录下的.result_cache.json
+LAST_GREEN_FILE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(__file__))), ".result_cache.json"
+)
+
+
+class CaseCached(Exception):
+    """用例指纹与上次通过时一致，本次不执行（调度器记为cached，视同通过）"""
+
+
+def case_fingerprint(case) -> str:
+    """按当前变量渲染用例，计算请求和预期的指纹"""
+    case = compile_case(case)
+    content = json.dumps({
+        "api": case.render_api(),
+        "expected": case.render_expected(),
+        "extract": case.extract,
+        "schema": case.schema,
+    }, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(content.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """单次执行内的响应复用（线程安全）"""
+
+    def __init__(self):
+        self._responses: Dict[str, object] = {}
+        self._pending: Dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+
+    def get_or_run(self, api_config: dict, send: Callable):
+        """相同请求已有响应时直接返回，否则调用send(api_config)发送并缓存
+        非只读方法（未显式配置 dedupe: true）直接发送；请求失败（抛出异常）或非2xx响应不缓存，
+        等待中的相同请求会各自重新发送
+        """
+        method = api_config.get("method", "get")
+        if method.lower() not in DEDUPE_METHODS and api_config.get("dedupe") is not True:
+            return send(api_config)
+        key = request_key(method, api_config.get("path"),
+                          api_config.get("params"), api_config.get("json"), api_config.get("data"))
+        if api_config.get("stream"):
+            # 流式解析的响应只包含所需路径的值，路径不同的用例不能复用
+            key += " stream:" + ",".join(api_config["stream"])
+        while True:
+            with self._lock:
+                if key in self._responses:
+                    self.hits += 1
+                    logger.info(f"复用相同请求的响应：{key}")
+                    return self._responses[key]
+                event = self._pending.get(key)
+                if event is None:
+                    event = self._pending[key] = threading.Event()
+                    break
+            event.wait()  # 其他线程正在发送相同的请求
+        try:
+            response = send(api_config)
+            if 200 <= response.status_code < 300:
+                with self._lock:
+                    self._responses[key] = response
+            return response
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+            event.set()
+
+
+class LastGreenCache:
+    """上次通过的用例指纹：每次执行都记录结果，changed-only模式下跳过未变化的用例"""
+
+    def __init__(self, file_path: str = LAST_GREEN_FILE, skip_unchanged: bool = False, scope: str = "default"):
+        """
+        Args:
+            file_path: 指纹文件路径
+            skip_unchanged: 是否跳过指纹未变化且上次通过的用例（changed-only模式）
+            scope: 执行目标（环境名，mock服务为"mock"），不同目标的通过记录互不影响
+        """
+        self.file_path = file_path
+        self.skip_unchanged = skip_unchanged
+        self.scope = scope
+        self._lock = threading.Lock()
+        try:
+            with open(file_path, "r", encoding="utf-8") as f:
+                self._data: Dict[str, Dict[str, str]] = json.load(f)
+        except (OSError, ValueError):
+            self._data = {}
+        self._green = self._data.setdefault(scope, {})
+        self._dirty = False
+
+    def is_unchanged(self, case_id: Optional[str], fingerprint: str) -> bool:
+        """用例上次通过且指纹未变化"""
+        return bool(case_id) and self._green.get(case_id) == fingerprint
+
+    def record(self, case_id: Optional[str], fingerprint: str, passed: bool):
+        """记录本次执行结果：通过时保存指纹，未通过时清除（下次必定重新执行）"""
+        if not case_id:
+            return
+        with self._lock:
+            if passed:
+                self._green[case_id] = fingerprint
+            else:
+                self._green.pop(case_id, None)
+            self._dirty = True
+
+    def check(self, case) -> str:
+        """执行前检查：changed-only模式下指纹未变化时抛出CaseCached，否则返回指纹供执行后记录"""
+        case = compile_case(case)
+        fingerprint = case_fingerprint(case)
+        if self.skip_unchanged and self.is_unchanged(case.case_id, fingerprint):
+            raise CaseCached(f"用例未变化且上次已通过：{case.case_id}")
+        return fingerprint
+
+    def wrap(self, executor: Callable) -> Callable:
+        """包装用例执行函数（签名为executor(api_runner, case)）：执行前检查指纹，执行后记录结果"""
+        def run(api_runner, case):
+            fingerprint = self.check(case)
+            try:
+                executor(api_runner, case)
+            except BaseException:
+                self.record(compile_case(case).case_id, fingerprint, False)
+                raise
+            self.record(compile_case(case).case_id, fingerprint, True)
+        return run
+
+    def save(self):
+        """原子写回文件"""
+        with self._lock:
+            if not self._dirty:
+                return
+            content = json.dumps(self._data, ensure_ascii=False, indent=2, sort_keys=True)
+            self._dirty = False
+        file_path = os.path.abspath(self.file_path)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(file_path), prefix=os.path.basename(file_path) + ".")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.replace(tmp_path, file_path)
+
+
+def load_result_cache(cache_config: Optional[Dict] = None, changed_only: bool = False,
+                      scope: str = "default") -> Tuple[Optional[ResponseCache], LastGreenCache]:
+    """按config.yaml的result_cache节点创建缓存
+    Args:
+        scope: 执行目标（环境名，mock服务为"mock"）
+    Returns:
+        (响应复用缓存（dedupe为false时为None）, 上次通过的用例指纹)
+    """
+    cache_config = cache_config or {}
+    response_cache = ResponseCache() if cache_config.get("dedupe", False) else None
+    last_green = LastGreenCache(cache_config.get("file") or LAST_GREEN_FILE, skip_unchanged=changed_only,
+                                scope=scope)
+    return response_cache, last_green
@@ -0,0 +1,89 @@
+"""用例结果流式落盘：每个用例执行完立即向JSON Lines文件追加一行结果，不在内存中累积
+- 每次会话开始时写入一行会话头（type=session，含run_id），之后每个用例一行（type=case）：
+  case_id、节点ID、状态、耗时、请求（方法+路径+状态码）、分段耗时、重试次数、断言失败信息
+- 每行写完立即flush，执行中断时已完成的用例结果不会丢失
+- 报告由html_report按需从该文件生成（分页、可增量续写），与用例执行解耦
+"""
+import json
+import os
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional
+
+# 默认结果文件
+DEFAULT_RESULTS_FILE = os.path.join("report", "results.jsonl")
+# 断言失败信息的最大长度（字符），超出部分截断
+MAX_MESSAGE_LENGTH = 4000
+
+
+class ResultsSink:
+    """用例结果追加写入器（线程安全），同时作为ApiRunner钩子收集每个用例的请求耗时样本"""
+
+    def __init__(self, file_path: str = DEFAULT_RESULTS_FILE, append: bool = False):
+        """
+        Args:
+            file_path: 结果文件路径
+            append: 是否追加到已有文件（默认每次会话重新开始）
+        """
+        self.file_path = file_path
+        self.run_id = uuid.uuid4().hex[:12]
+        self.counts: Dict[str, int] = {}
+        self._samples: Dict[str, List[Dict]] = {}  # case_id → 尚未写出的请求样本
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+        self._file = open(file_path, "a" if append else "w", encoding="utf-8")
+        self._write({"type": "session", "run_id": self.run_id, "started_at": time.time()})
+
+    def _write(self, record: Dict):
+        line = json.dumps(record, ensure_ascii=False, separators=(",", ":"), default=str) + "\n"
+        with self._lock:
+            if self._file is not None:
+                self._file.write(line)
+                self._file.flush()
+
+    def record_sample(self, sample: Dict):
+        """ApiRunner钩子：按case_id暂存请求样本，用例结果写出时一并写入（不属于任何用例的请求不暂存）"""
+        case_id = sample.get("case_id")
+        if not case_id:
+            return
+        with self._lock:
+            self._samples.setdefault(case_id, []).append(sample)
+
+    def add_result(self, case_id: str, status: str, duration: float, nodeid: Optional[str] = None,
+                   message: Optional[str] = None):
+        """写入一个用例的结果
+        Args:
+            case_id: 用例ID
+            status: passed/failed/error/skipped
+            duration: 用例耗时（秒）
+            nodeid: pytest节点ID
+            message: 失败、出错或跳过的原因（断言失败时为全部不匹配项）
+        """
+        with self._lock:
+            samples = self._samples.pop(case_id, [])
+            self.counts[status] = self.counts.get(status, 0) + 1
+        record = {
+            "type": "case",
+            "case_id": case_id,
+            "nodeid": nodeid,
+            "status": status,
+            "duration_ms": round(duration * 1000, 2),
+            "requests": [
+                {"method": s["method"], "path": s["path"], "status": s["status"], "attempt": s.get("attempt", 0),
+                 "ttfb_ms": round(s["ttfb"] * 1000, 2), "total_ms": round(s["total"] * 1000, 2),
+                 "error": s.get("error")}
+                for s in samples
+            ],
+            "retries": sum(1 for s in samples if s.get("attempt")),
+            "message": message[:MAX_MESSAGE_LENGTH] if message else None,
+            "ts": time.time(),
+        }
+        self._write(record)
+
+    def close(self):
+        """关闭结果文件"""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
@@ -0,0 +1,188 @@
+"""并发用例调度器：根据用例间的变量依赖构建DAG，无依赖的用例并发执行
+依赖关系来自YAML用例：extract 产出变量，${变量} 引用变量
+每个工作线程使用独立的ApiRunner，整体耗时约等于最长依赖链的耗时
+"""
+import glob
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Callable, Dict, List, Set
+from src.utils.logger import logger
+from src.utils.read_data import DataReader
+from src.utils.result_cache import CaseCached
+from src.utils.template import CompiledCase, compile_case
+from src.utils.test_base import TestBase
+from src.utils.timing import case_context
+
+# 数据文件的执行顺序（与conftest中的模块顺序保持一致），未列出的文件按文件名排在最后
+DATA_FILE_ORDER = ["user_cases.yaml", "order_cases.yaml"]
+# 视为通过的用例状态（cached：未变化且上次已通过，本次未执行）
+PASSED_STATUSES = ("passed", "cached")
+
+
+def load_all_cases(data_dir: str = "data") -> List[Dict]:
+    """按约定顺序读取data目录下所有YAML用例"""
+    files = glob.glob(os.path.join(data_dir, "*.yaml"))
+    files.sort(key=lambda p: (
+        DATA_FILE_ORDER.index(os.path.basename(p))
+        if os.path.basename(p) in DATA_FILE_ORDER else len(DATA_FILE_ORDER),
+        os.path.basename(p)
+    ))
+    cases = []
+    for file_path in files:
+        cases.extend(DataReader.read_cases(file_path))
+    return cases
+
+
+def case_inputs(case: CompiledCase) -> Set[str]:
+    """用例引用的变量（请求配置和预期结果中的 ${变量}，编译时已收集）"""
+    return case.variables
+
+
+def case_outputs(case: CompiledCase) -> Set[str]:
+    """用例提取（产出）的变量"""
+    return set(case.extract.keys())
+
+
+def build_dependencies(cases: List) -> List[Set[int]]:
+    """按用例顺序构建依赖关系，返回每个用例依赖的用例下标集合
+    - 读后写：引用变量的用例依赖它之前最后一个产出该变量的用例
+    - 写后读：产出变量的用例需等待之前引用该变量的用例执行完
+    - 写后写：只有在之后有用例引用该变量时，才需要让多个产出者串行，
+      否则互不依赖（如所有用例都提取licenseNumber但没有用例引用它）
+    """
+    deps = [set() for _ in cases]
+    last_writer = {}  # 变量 → 最近一个已确定顺序的产出用例
+    pending_writers = {}  # 变量 → 尚未确定先后顺序的产出用例
+    readers = {}  # 变量 → 最近一次产出之后引用它的用例
+    for idx, case in enumerate(map(compile_case, cases)):
+        for var in case_inputs(case):
+            writers = pending_writers.pop(var, [])
+            if writers:
+                # 有用例引用该变量：让之前的产出者按用例顺序串行，保证取到的是最后一个值
+                for earlier, later in zip(writers, writers[1:]):
+                    deps[later].add(earlier)
+                last_writer[var] = writers[-1]
+            if var in last_writer and last_writer[var] != idx:
+                deps[idx].add(last_writer[var])
+            readers.setdefault(var, []).append(idx)
+        for var in case_outputs(case):
+            deps[idx].update(r for r in readers.pop(var, []) if r != idx)
+            pending_writers.setdefault(var, []).append(idx)
+    return deps
+
+
+class CaseScheduler:
+    """依赖感知的并发用例执行器"""
+
+    def __init__(self, cases: List[Dict], runner_factory: Callable, workers: int = 4,
+                 executor: Callable = TestBase.run_case, on_result: Callable = None, close_runners: bool = True):
+        """初始化调度器
+        Args:
+            cases: 用例列表（按期望的先后顺序排列，用例字典或CompiledCase）
+            runner_factory: 创建ApiRunner的无参函数，每个工作线程调用一次
+            workers: 并发线程数
+            executor: 单个用例的执行函数，签名为 executor(api_runner, case)；
+                抛出CaseCached表示用例未变化、本次不执行（记为cached，下游用例照常执行）
+            on_result: 每个用例出结果（含被跳过的下游用例）时以结果字典调用，在调度线程中执行
+            close_runners: 执行结束后是否关闭ApiRunner的会话（执行器由调用方复用时传False）
+        """
+        self.cases = [compile_case(case) for case in cases]
+        self.runner_factory = runner_factory
+        self.workers = max(1, workers)
+        self.executor = executor
+        self.on_result = on_result
+        self.close_runners = close_runners
+        self.deps = build_dependencies(self.cases)
+        self._local = threading.local()
+        self._runners = []
+        self._runners_lock = threading.Lock()
+
+    def _get_runner(self):
+        """获取当前工作线程专属的ApiRunner（首次调用时创建）"""
+        runner = getattr(self._local, "runner", None)
+        if runner is None:
+            runner = self.runner_factory()
+            self._local.runner = runner
+            with self._runners_lock:
+                self._runners.append(runner)
+        return runner
+
+    def _run_one(self, idx: int) -> dict:
+        """在工作线程中执行单个用例，返回执行结果"""
+        case = self.cases[idx]
+        start = time.perf_counter()
+        state = {"retries": 0}
+        try:
+            with case_context(case.case_id or f"case_{idx}") as state:
+                self.executor(self._get_runner(), case)
+            status, error = "passed", None
+        except CaseCached:
+            status, error = "cached", None
+        except AssertionError as e:
+            status, error = "failed", str(e)
+        except Exception as e:
+            status, error = "error", f"{type(e).__name__}: {e}"
+        if error:
+            logger.error(f"用例执行失败：{case.case_id}，原因：{error}")
+        return {
+            "case_id": case.case_id or f"case_{idx}",
+            "status": status,
+            "error": error,
+            "duration": time.perf_counter() - start,
+            "retries": state["retries"],
+        }
+
+    def run(self) -> List[dict]:
+        """执行全部用例，返回与用例顺序一致的结果列表
+        依赖的用例未通过（passed或cached）时，下游用例标记为skipped，不再发送请求
+        """
+        results = [None] * len(self.cases)
+        dependents = [[] for _ in self.cases]
+        remaining = [len(d) for d in self.deps]
+        for idx, deps in enumerate(self.deps):
+            for dep in deps:
+                dependents[dep].append(idx)
+
+        def finish(idx, result):
+            """记录结果并返回因此变为可执行的下游用例"""
+            results[idx] = result
+            if self.on_result is not None:
+                self.on_result(result)
+            ready = []
+            for child in dependents[idx]:
+                remaining[child] -= 1
+                if result["status"] not in PASSED_STATUSES and results[child] is None:
+                    results[child] = {
+                        "case_id": self.cases[child].case_id or f"case_{child}",
+                        "status": "skipped",
+                        "error": f"依赖的用例未通过：{result['case_id']}",
+                        "duration": 0.0,
+                        "retries": 0,
+                    }
+                    ready.extend(finish(child, results[child]))
+                elif remaining[child] == 0 and results[child] is None:
+                    ready.append(child)
+            return ready
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="case-worker") as pool:
+            futures = {pool.submit(self._run_one, idx): idx
+                       for idx, count in enumerate(remaining) if count == 0}
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    idx = futures.pop(future)
+                    for child in finish(idx, future.result()):
+                        futures[pool.submit(self._run_one, child)] = child
+        if self.close_runners:
+            for runner in self._runners:
+                runner.session.close()
+
+        counts = {}
+        for result in results:
+            counts[result["status"]] = counts.get(result["status"], 0) + 1
+        logger.info(f"并发执行完成：共{len(results)}个用例，{counts}，"
+                    f"耗时{time.perf_counter() - start:.2f}s，并发数{self.workers}")
+        return results
@@ -0,0 +1,198 @@
+"""响应结构校验：把JSON Schema（常用子集）编译为校验函数，按会话缓存
+用例通过 schema: 引用schemas目录下的文件（如 schema: order_list.yaml），或直接内嵌schema字典
+支持的关键字：type、enum、const、properties、required、additionalProperties、items、
+minItems/maxItems、minLength/maxLength、pattern、minimum/maximum、$ref（#/definitions/... 或 #/$defs/...）
+编译时把每个关键字转为一个闭包，校验时不再解析schema字典，适合在压测中对响应做抽样校验
+"""
+import json
+import os
+import re
+from functools import lru_cache
+from typing import Callable, Dict, List, Union
+import yaml
+
+# schema文件目录：项目根目录下的schemas
+SCHEMA_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "schemas"
+)
+
+# JSON Schema类型名 → 校验函数（bool是int的子类，需要单独排除）
+_TYPE_CHECKS = {
+    "string": lambda v: isinstance(v, str),
+    "integer": lambda v: isinstance(v, int) and not isinstance(v, bool),
+    "number": lambda v: isinstance(v, (int, float)) and not isinstance(v, bool),
+    "boolean": lambda v: isinstance(v, bool),
+    "array": lambda v: isinstance(v, list),
+    "object": lambda v: isinstance(v, dict),
+    "null": lambda v: v is None,
+}
+
+# 校验函数签名：validate(value, path, errors)，不通过时把描述追加到errors
+Validator = Callable[[object, str, List[str]], None]
+
+
+class SchemaError(Exception):
+    """schema本身有误（不支持的类型、无法解析的$ref等）"""
+
+
+def compile_schema(schema: Dict, root: Dict = None) -> Validator:
+    """把schema编译为校验函数
+    Args:
+        schema: schema字典
+        root: 根schema（解析$ref时使用，缺省为schema本身）
+    """
+    root = schema if root is None else root
+    refs = {}  # $ref → 已编译的校验函数（同一定义只编译一次，也支持递归定义）
+    return _compile(schema, root, refs)
+
+
+def _resolve_ref(ref: str, root: Dict) -> Dict:
+    if not ref.startswith("#/"):
+        raise SchemaError(f"只支持本文件内的$ref：{ref}")
+    node = root
+    for part in ref[2:].split("/"):
+        if not isinstance(node, dict) or part not in node:
+            raise SchemaError(f"无法解析$ref：{ref}")
+        node = node[part]
+    return node
+
+
+def _compile(schema: Dict, root: Dict, refs: Dict) -> Validator:
+    if not isinstance(schema, dict):
+        raise SchemaError(f"schema必须是字典：{schema!r}")
+    if "$ref" in schema:
+        ref = schema["$ref"]
+        if ref not in refs:
+            holder = []
+            refs[ref] = lambda value, path, errors: holder[0](value, path, errors)  # 递归引用占位
+            holder.append(_compile(_resolve_ref(ref, root), root, refs))
+        return refs[ref]
+
+    checks = []  # 本层的校验函数列表
+
+    if "type" in schema:
+        names = schema["type"] if isinstance(schema["type"], list) else [schema["type"]]
+        unknown = [n for n in names if n not in _TYPE_CHECKS]
+        if unknown:
+            raise SchemaError(f"不支持的type：{unknown}")
+        type_checks = [_TYPE_CHECKS[n] for n in names]
+        expected_type = "/".join(names)
+
+        def check_type(value, path, errors):
+            if not any(check(value) for check in type_checks):
+                errors.append(f"{path}：期望类型{expected_type}，实际{type(value).__name__}")
+                return False
+            return True
+        checks.append(check_type)
+
+    if "enum" in schema:
+        options = schema["enum"]
+
+        def check_enum(value, path, errors):
+            if value not in options:
+                errors.append(f"{path}：值{value!r}不在{options}中")
+        checks.append(check_enum)
+
+    if "const" in schema:
+        const = schema["const"]
+
+        def check_const(value, path, errors):
+            if value != const:
+                errors.append(f"{path}：期望{const!r}，实际{value!r}")
+        checks.append(check_const)
+
+    if "minimum" in schema or "maximum" in schema:
+        low, high = schema.get("minimum"), schema.get("maximum")
+
+        def check_range(value, path, errors):
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                if (low is not None and value < low) or (high is not None and value > high):
+                    errors.append(f"{path}：值{value}超出范围[{low}, {high}]")
+        checks.append(check_range)
+
+    if "minLength" in schema or "maxLength" in schema or "pattern" in schema:
+        min_len, max_len = schema.get("minLength"), schema.get("maxLength")
+        pattern = re.compile(schema["pattern"]) if "pattern" in schema else None
+
+        def check_string(value, path, errors):
+            if not isinstance(value, str):
+                return
+            if (min_len is not None and len(value) < min_len) or (max_len is not None and len(value) > max_len):
+                errors.append(f"{path}：字符串长度{len(value)}超出范围[{min_len}, {max_len}]")
+            if pattern is not None and pattern.search(value) is None:
+                errors.append(f"{path}：{value!r}不匹配{pattern.pattern!r}")
+        checks.append(check_string)
+
+    if "properties" in schema or "required" in schema or "additionalProperties" in schema:
+        properties = {name: _compile(sub, root, refs) for name, sub in (schema.get("properties") or {}).items()}
+        required = list(schema.get("required") or [])
+        additional = schema.get("additionalProperties", True)
+        additional_validator = _compile(additional, root, refs) if isinstance(additional, dict) else None
+
+        def check_object(value, path, errors):
+            if not isinstance(value, dict):
+                return
+            for name in required:
+                if name not in value:
+                    errors.append(f"{path}.{name}：缺少必填字段")
+            for name, item in value.items():
+                validator = properties.get(name)
+                if validator is not None:
+                    validator(item, f"{path}.{name}", errors)
+                elif additional is False:
+                    errors.append(f"{path}.{name}：不允许的字段")
+                elif additional_validator is not None:
+                    additional_validator(item, f"{path}.{name}", errors)
+        checks.append(check_object)
+
+    if "items" in schema or "minItems" in schema or "maxItems" in schema:
+        item_validator = _compile(schema["items"], root, refs) if isinstance(schema.get("items"), dict) else None
+        min_items, max_items = schema.get("minItems"), schema.get("maxItems")
+
+        def check_array(value, path, errors):
+            if not isinstance(value, list):
+                return
+            if (min_items is not None and len(value) < min_items) or \
+                    (max_items is not None and len(value) > max_items):
+                errors.append(f"{path}：数组长度{len(value)}超出范围[{min_items}, {max_items}]")
+            if item_validator is not None:
+                for i, item in enumerate(value):
+                    item_validator(item, f"{path}[{i}]", errors)
+        checks.append(check_array)
+
+    type_check = checks.pop(0) if "type" in schema else None
+
+    def validate(value, path, errors):
+        # 类型不符时不再检查其他关键字，避免一个错误产生一串连带错误
+        if type_check is not None and not type_check(value, path, errors):
+            return
+        for check in checks:
+            check(value, path, errors)
+    return validate
+
+
+@lru_cache(maxsize=256)
+def load_validator(name: str) -> Validator:
+    """按文件名读取schemas目录下的schema（YAML或JSON）并编译，同一文件在进程内只编译一次"""
+    file_path = name if os.path.isabs(name) else os.path.join(SCHEMA_DIR, name)
+    if not os.path.exists(file_path):
+        raise FileNotFoundError(f"schema文件不存在：{file_path}")
+    with open(file_path, "r", encoding="utf-8") as f:
+        schema = json.load(f) if file_path.endswith(".json") else yaml.safe_load(f)
+    return compile_schema(schema)
+
+
+def get_validator(schema: Union[str, Dict, Callable]) -> Validator:
+    """获取校验函数：文件名（缓存）、schema字典（每次编译，调用方应自行缓存）或已编译的校验函数"""
+    if callable(schema):
+        return schema
+    if isinstance(schema, str):
+        return load_validator(schema)
+    return compile_schema(schema)
+
+
+def validate(data, schema: Union[str, Dict, Callable]) -> List[str]:
+    """校验已解析的JSON数据，返回所有不符合schema的描述（空列表表示通过）"""
+    errors = []
+    get_validator(schema)(data, "$", errors)
+    return errors
@@ -0,0 +1,126 @@
+"""耗时统计工具：收集请求耗时样本，计算分位数、错误率和吞吐量
+压测统计（LatencyStats）使用对数分桶直方图（与实时指标共用桶上限），长时间压测时内存固定，
+分位数由桶内线性插值估算（误差在一个桶宽度内，相邻桶上限相差约19%），最小/最大值和平均值精确
+"""
+import bisect
+import math
+import threading
+from typing import Dict, List, Sequence, Tuple
+
+# 直方图桶上限（秒）：0.5ms ~ 约90s，每4个桶翻倍；超出最后一个上限的计入+Inf桶
+BUCKET_BOUNDS: Tuple[float, ...] = tuple(0.0005 * 2 ** (i / 4) for i in range(70))
+
+
+def percentile(sorted_samples: List[float], pct: float) -> float:
+    """计算分位数（最近秩法）
+    Args:
+        sorted_samples: 已升序排列的样本
+        pct: 百分位（如99表示p99）
+    """
+    if not sorted_samples:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_samples)))
+    return sorted_samples[min(rank, len(sorted_samples)) - 1]
+
+
+def histogram_quantile(buckets: Sequence[int], q: float, high: float = None) -> float:
+    """由直方图（按BUCKET_BOUNDS分桶的计数）估算分位数（秒）：定位所在桶后在桶的上下限之间线性插值
+    Args:
+        buckets: 各桶计数（最后一个为+Inf桶）
+        q: 分位（0~1）
+        high: 已知的最大值（秒），用于限定插值上限，落在+Inf桶时直接返回
+    """
+    count = sum(buckets)
+    if not count:
+        return 0.0
+    rank = q * count
+    cumulative = 0
+    for i, bucket in enumerate(buckets):
+        if bucket and cumulative + bucket >= rank:
+            lower = BUCKET_BOUNDS[i - 1] if i > 0 else 0.0
+            if i == len(BUCKET_BOUNDS):
+                return lower if high is None else high
+            upper = BUCKET_BOUNDS[i] if high is None else min(BUCKET_BOUNDS[i], high)
+            return lower + (upper - lower) * (rank - cumulative) / bucket
+        cumulative += bucket
+    return BUCKET_BOUNDS[-1]
+
+
+class LatencyStats:
+    """单个统计对象（如某个case_id）的耗时直方图和错误计数，线程安全，内存占用与请求数无关"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.count = 0
+        self.errors = 0
+        self.dropped = 0  # 发压端积压、未发送就丢弃的请求数（不计入count）
+        self.total = 0.0  # 耗时总和（秒）
+        self.max = 0.0
+        self.buckets = [0] * (len(BUCKET_BOUNDS) + 1)
+        self._lock = threading.Lock()
+
+    def record(self, latency: float, ok: bool = True):
+        """记录一次请求的耗时和结果"""
+        index = bisect.bisect_left(BUCKET_BOUNDS, latency)
+        with self._lock:
+            self.count += 1
+            self.total += latency
+            self.max = max(self.max, latency)
+            self.buckets[index] += 1
+            if not ok:
+                self.errors += 1
+
+    def record_dropped(self):
+        """记录一次因发压端积压而丢弃（未发送）的请求"""
+        with self._lock:
+            self.dropped += 1
+
+    def merge(self, other: "LatencyStats"):
+        """合并另一个统计对象（用于汇总多个线程/进程的结果）"""
+        with other._lock:
+            count, errors, total, high, buckets = other.count, other.errors, other.total, other.max, list(other.buckets)
+            dropped = other.dropped
+        with self._lock:
+            self.count += count
+            self.errors += errors
+            self.dropped += dropped
+            self.total += total
+            self.max = max(self.max, high)
+            for i, bucket in enumerate(buckets):
+                self.buckets[i] += bucket
+
+    def summary(self, duration: float = 0.0) -> Dict:
+        """汇总统计结果（耗时单位：毫秒）
+        Args:
+            duration: 统计时长（秒），用于计算吞吐量，为0时不计算
+        """
+        with self._lock:
+            count, errors, total, high, buckets = self.count, self.errors, self.total, self.max, list(self.buckets)
+            dropped = self.dropped
+        return {
+            "name": self.name,
+            "count": count,
+            "errors": errors,
+            "dropped": dropped,
+            "error_rate": errors / count if count else 0.0,
+            "throughput": count / duration if duration else 0.0,
+            "mean_ms": total / count * 1000 if count else 0.0,
+            "p50_ms": histogram_quantile(buckets, 0.50, high) * 1000,
+            "p90_ms": histogram_quantile(buckets, 0.90, high) * 1000,
+            "p99_ms": histogram_quantile(buckets, 0.99, high) * 1000,
+            "max_ms": high * 1000,
+        }
+
+
+def format_summary_table(rows: List[Dict]) -> str:
+    """将summary()的结果格式化为对齐的文本表格"""
+    header = f"{'name':<34}{'count':>8}{'err%':>9}{'dropped':>9}{'rps':>11}" \
+             f"{'p50(ms)':>10}{'p90(ms)':>10}{'p99(ms)':>10}{'max(ms)':>10}"
+    lines = [header, "-" * len(header)]
+    for row in rows:
+        lines.append(
+            f"{row['name']:<34}{row['count']:>8}{row['error_rate']:>9.2%}{row.get('dropped', 0):>9}"
+            f"{row['throughput']:>11.1f}"
+            f"{row['p50_ms']:>10.1f}{row['p90_ms']:>10.1f}{row['p99_ms']:>10.1f}{row['max_ms']:>10.1f}"
+        )
+    return "\n".join(lines)
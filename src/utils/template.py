@@ -0,0 +1,183 @@
+"""用例模板编译工具：加载用例时一次性解析 ${变量} 引用，渲染时只做填值
+- 支持嵌套dict/list，以及 "prefix-${x}" 这类内嵌在字符串中的引用
+- 编译结果不可变，渲染每次生成新的dict/list，不会修改原始用例数据
+- 整值引用（"${x}"）保留变量原本的类型；内嵌引用按字符串拼接
+- 变量不存在时保留原始写法（与原来逐个替换时的行为一致）
+"""
+import re
+from typing import Callable, Dict, FrozenSet, Optional
+from src.utils.json_stream import case_stream_paths
+from src.utils.logger import logger
+from src.utils.read_data import LazyCase
+from src.utils.schema import get_validator
+from src.utils.var_handler import get_var
+
+# 变量引用格式：${变量名}
+VAR_PATTERN = re.compile(r"\$\{(\w+)\}")
+
+
+def global_lookup(name: str):
+    """默认的变量取值方式：读取全局变量 global.<name>"""
+    return get_var(f"global.{name}")
+
+
+class _Const:
+    """不含变量的标量，渲染时原样返回"""
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+    def render(self, lookup):
+        return self.value
+
+
+class _Var:
+    """整值变量引用（如 "${user_id}"），渲染结果保留变量原本的类型"""
+    __slots__ = ("name", "raw")
+
+    def __init__(self, name: str, raw: str):
+        self.name = name
+        self.raw = raw
+
+    def render(self, lookup):
+        value = lookup(self.name)
+        return self.raw if value is None else value
+
+
+class _Concat:
+    """内嵌变量引用的字符串（如 "order-${order_id}"），parts为常量字符串和变量名交替组成"""
+    __slots__ = ("parts",)
+
+    def __init__(self, parts: tuple):
+        self.parts = parts  # ((是否为变量, 文本或变量名), ...)
+
+    def render(self, lookup):
+        out = []
+        for is_var, text in self.parts:
+            if is_var:
+                value = lookup(text)
+                out.append("${" + text + "}" if value is None else str(value))
+            else:
+                out.append(text)
+        return "".join(out)
+
+
+class _Dict:
+    __slots__ = ("items",)
+
+    def __init__(self, items: tuple):
+        self.items = items  # ((键, 子节点), ...)
+
+    def render(self, lookup):
+        return {k: node.render(lookup) for k, node in self.items}
+
+
+class _List:
+    __slots__ = ("nodes",)
+
+    def __init__(self, nodes: tuple):
+        self.nodes = nodes
+
+    def render(self, lookup):
+        return [node.render(lookup) for node in self.nodes]
+
+
+def _compile_str(text: str, variables: set):
+    """编译字符串：无引用返回常量，整值引用返回_Var，内嵌引用返回_Concat"""
+    matches = list(VAR_PATTERN.finditer(text))
+    if not matches:
+        return _Const(text)
+    variables.update(m.group(1) for m in matches)
+    if len(matches) == 1 and matches[0].span() == (0, len(text)):
+        return _Var(matches[0].group(1), text)
+    parts, pos = [], 0
+    for m in matches:
+        if m.start() > pos:
+            parts.append((False, text[pos:m.start()]))
+        parts.append((True, m.group(1)))
+        pos = m.end()
+    if pos < len(text):
+        parts.append((False, text[pos:]))
+    return _Concat(tuple(parts))
+
+
+def _compile(obj, variables: set):
+    """递归编译任意YAML结构"""
+    if isinstance(obj, str):
+        return _compile_str(obj, variables)
+    if isinstance(obj, dict):
+        return _Dict(tuple((k, _compile(v, variables)) for k, v in obj.items()))
+    if isinstance(obj, (list, tuple)):
+        return _List(tuple(_compile(v, variables) for v in obj))
+    return _Const(obj)
+
+
+class Template:
+    """编译后的模板：记录引用到的变量，render时按槽位填值"""
+    __slots__ = ("_root", "variables")
+
+    def __init__(self, obj):
+        variables = set()
+        self._root = _compile(obj, variables)
+        self.variables: FrozenSet[str] = frozenset(variables)  # 模板引用的全部变量名
+
+    def render(self, lookup: Callable = global_lookup):
+        """渲染模板，返回全新的数据结构
+        Args:
+            lookup: 变量取值函数，参数为变量名，返回None表示变量不存在
+        """
+        return self._root.render(lookup)
+
+
+class CompiledCase:
+    """预编译的YAML用例：api和expected各编译一次，执行时只渲染"""
+    __slots__ = ("case", "case_id", "title", "extract", "api_template", "expected_template",
+                 "variables", "schema", "stream_paths", "_validator")
+
+    def __init__(self, case: Dict):
+        self.case = case  # 原始用例数据（只读，渲染不会修改）
+        self.case_id: Optional[str] = case.get("case_id")
+        self.title = case.get("title", "")
+        self.extract: Dict = case.get("extract") or {}
+        self.api_template = Template(case.get("api") or {})
+        self.expected_template = Template(case.get("expected") or {})
+        # 用例引用的全部变量（请求配置和预期结果中的 ${变量}）
+        self.variables = self.api_template.variables | self.expected_template.variables
+        # 响应结构校验：schemas目录下的文件名或内嵌的schema字典（首次使用时编译）
+        self.schema = case.get("schema")
+        # api中配置 stream: true 时流式解析响应，只取extract和expected.json用到的路径（无法流式解析时为None）
+        self.stream_paths = None
+        if (case.get("api") or {}).get("stream") is True:
+            self.stream_paths = case_stream_paths(self.extract, case.get("expected"), self.schema)
+            if self.stream_paths is None:
+                logger.warning(f"用例{self.case_id}配置了schema、复杂JSONPath或根路径$，不支持流式解析，将完整读取响应体")
+        self._validator = None
+
+    @property
+    def validator(self) -> Optional[Callable]:
+        """编译后的响应结构校验函数（用例未配置schema时为None）"""
+        if self._validator is None and self.schema:
+            self._validator = get_validator(self.schema)
+        return self._validator
+
+    def render_api(self, lookup: Callable = global_lookup) -> Dict:
+        """渲染请求配置（method/path/json/params等），stream: true 替换为需要流式解析的路径列表"""
+        api = self.api_template.render(lookup)
+        if "stream" in api:
+            api["stream"] = list(self.stream_paths) if self.stream_paths else False
+        return api
+
+    def render_expected(self, lookup: Callable = global_lookup) -> Dict:
+        """渲染预期结果（code/json等）"""
+        return self.expected_template.render(lookup)
+
+    def __repr__(self):
+        return f"CompiledCase({self.case_id!r})"
+
+
+def compile_case(case) -> CompiledCase:
+    """编译单个用例（已编译的用例原样返回，延迟加载的用例先加载）"""
+    if isinstance(case, LazyCase):
+        case = case.load()
+    return case if isinstance(case, CompiledCase) else CompiledCase(case)
@@ -1,18 +1,16 @@
 # 抽取所有模块用例的公共逻辑，避免冗余
-from src.utils.var_manager import get_var, set_var
-from src.utils.logger import logger
+from src.utils.var_handler import get_var, set_var
+from src.utils.logger import logger, lazy_repr
+from src.utils.assert_utils import AssertUtils
+from src.utils.json_path import find as json_path_find, response_json
+from src.utils.template import Template, compile_case
 
 class TestBase:
     @staticmethod
     def handle_api_config(api_config):
-        """公共逻辑：处理请求配置（变量替换+携带token）"""
+        """公共逻辑：处理请求配置（变量替换+携带token），返回新的配置，不修改传入的字典"""
         # 1. 替换变量（如 ${token}）
-        if "json" in api_config:
-            for k, v in api_config["json"].items():
-                if isinstance(v, str) and v.startswith("${") and v.endswith("}"):
-                    var_name = v[2:-1]
-                    api_config["json"][k] = get_var(f"global.{var_name}")
-                    logger.info(f"替换变量：{k} = ${var_name} → {api_config['json'][k]}")
+        api_config = Template(api_config).render()
         # 2. 携带登录token
         token = get_var("global.token")
         if token:
@@ -27,11 +25,35 @@ class TestBase:
         """公共逻辑：提取变量并保存到全局"""
         if not extract_config:
             return
-        from jsonpath import jsonpath
+        body = response_json(response)
         for var_name, json_path in extract_config.items():
-            value_list = jsonpath(response.json(), json_path)
+            value_list = json_path_find(body, json_path)
             if value_list and len(value_list) > 0:
                 set_var(f"global.{var_name}", value_list[0])
                 logger.info(f"提取变量成功：{var_name} = {value_list[0]}")
             else:
-                logger.warning(f"提取变量失败：{var_name}（JSONPath：{json_path}）")
\ No newline at end of file
+                logger.warning(f"提取变量失败：{var_name}（JSONPath：{json_path}）")
+
+    @staticmethod
+    def run_case(api_runner, case):
+        """执行单个YAML用例：渲染请求 → 发送请求 → 提取变量 → 断言
+        与tests下各模块用例的执行流程一致，供并发调度等非pytest场景复用
+        Args:
+            case: 用例字典或预编译的CompiledCase
+        """
+        case = compile_case(case)
+        logger.info(f"=============== 执行用例: {case.case_id} - {case.title} ===============")
+        # 按预编译的变量槽位渲染，生成新的配置，不修改（或并发修改）共享的用例数据
+        api_config = case.render_api()
+        response = api_runner.run(api_config)
+        logger.info("接口响应: %s", lazy_repr(response_json(response)))
+
+        TestBase.extract_variables(response, case.extract)
+
+        expected = case.render_expected()
+        # 状态码和全部JSON字段一次校验，失败时报告所有不匹配项
+        AssertUtils.assert_all(response, expected)
+        # 用例配置了schema时校验响应结构
+        if case.validator:
+            AssertUtils.assert_schema(response, case.validator)
+        logger.info(f"=============== 用例: {case.case_id} 执行完毕 ===============\n")
@@ -0,0 +1,178 @@
+"""请求耗时分段统计：记录每个请求的连接、首字节、下载、总耗时，以及用例自身的框架开销
+- ApiRunner每次请求后把耗时样本交给注册的钩子（如TimingRecorder.record）
+- 样本按接口路径和case_id汇总，会话结束时输出汇总表并导出JSON，便于对比不同版本的耗时
+"""
+import contextvars
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional
+from src.utils.stats import percentile
+
+# 当前正在执行的用例（并发执行时每个线程/协程各自独立）
+_current_case: contextvars.ContextVar = contextvars.ContextVar("current_case", default=None)
+
+# 汇总的耗时阶段（秒）
+PHASES = ("connect", "tls", "ttfb", "download", "total")
+
+
+def current_case_id() -> Optional[str]:
+    """获取当前正在执行的case_id（不在用例中时返回None）"""
+    state = _current_case.get()
+    return state["case_id"] if state else None
+
+
+def add_request_time(seconds: float):
+    """把一次请求的总耗时计入当前用例（用于计算框架开销）"""
+    state = _current_case.get()
+    if state is not None:
+        state["request_time"] += seconds
+
+
+def add_retry():
+    """把一次请求重试计入当前用例"""
+    state = _current_case.get()
+    if state is not None:
+        state["retries"] += 1
+
+
+@contextmanager
+def case_context(case_id: str, recorder: "TimingRecorder" = None):
+    """标记用例执行范围：期间发出的请求样本都归属该case_id，
+    结束时把 用例总耗时 - 请求耗时 记为框架开销（变量渲染、断言、提取、日志等），同时记录请求重试次数
+    """
+    state = {"case_id": case_id, "request_time": 0.0, "retries": 0}
+    token = _current_case.set(state)
+    start = time.perf_counter()
+    try:
+        yield state
+    finally:
+        wall = time.perf_counter() - start
+        _current_case.reset(token)
+        (recorder or default_recorder).record_case(case_id, wall, state["request_time"], state["retries"])
+
+
+@contextmanager
+def case_label(case_id: str):
+    """只标记当前case_id（请求样本和实时指标按用例归类），不统计框架开销和重试，不加锁；
+    用于压测等每个请求都要标记的场景
+    """
+    token = _current_case.set({"case_id": case_id, "request_time": 0.0, "retries": 0})
+    try:
+        yield
+    finally:
+        _current_case.reset(token)
+
+
+class TimingRecorder:
+    """耗时样本收集器（线程安全），可作为ApiRunner的钩子使用"""
+
+    def __init__(self):
+        self.samples: List[Dict] = []  # 请求样本
+        self.cases: Dict[str, Dict] = {}  # case_id → {"wall": 总耗时, "overhead": 框架开销, "retries": 重试次数}
+        self._lock = threading.Lock()
+
+    def record(self, sample: Dict):
+        """记录一次请求的耗时样本（ApiRunner钩子）"""
+        with self._lock:
+            self.samples.append(sample)
+
+    def record_case(self, case_id: str, wall: float, request_time: float, retries: int = 0):
+        """记录一个用例的总耗时、框架开销和请求重试次数"""
+        with self._lock:
+            self.cases[case_id] = {"wall": wall, "overhead": max(0.0, wall - request_time), "retries": retries}
+
+    def merge(self, data: Dict):
+        """合并export_data()导出的数据（用于汇总多个进程的结果）"""
+        with self._lock:
+            self.samples.extend(data.get("samples", []))
+            self.cases.update(data.get("case_timings", {}))
+
+    def clear(self):
+        with self._lock:
+            self.samples.clear()
+            self.cases.clear()
+
+    @staticmethod
+    def _aggregate(name: str, samples: List[Dict]) -> Dict:
+        """汇总一组样本：各阶段平均值和总耗时分位数（毫秒），以及其中重试请求的个数"""
+        count = len(samples)
+        row = {"name": name, "count": count, "retries": sum(1 for s in samples if s.get("attempt"))}
+        for phase in PHASES:
+            values = [s[phase] for s in samples]
+            row[f"{phase}_mean_ms"] = sum(values) / count * 1000 if count else 0.0
+        totals = sorted(s["total"] for s in samples)
+        for pct in (50, 90, 99):
+            row[f"total_p{pct}_ms"] = percentile(totals, pct) * 1000
+        row["total_max_ms"] = totals[-1] * 1000 if totals else 0.0
+        return row
+
+    def summary(self) -> Dict:
+        """按接口路径和case_id汇总"""
+        with self._lock:
+            samples = list(self.samples)
+            cases = dict(self.cases)
+        by_path, by_case = {}, {}
+        for sample in samples:
+            by_path.setdefault(f"{sample['method']} {sample['path']}", []).append(sample)
+            by_case.setdefault(sample.get("case_id") or "-", []).append(sample)
+        case_rows = []
+        for case_id, group in by_case.items():
+            row = self._aggregate(case_id, group)
+            if case_id in cases:
+                row["case_wall_ms"] = cases[case_id]["wall"] * 1000
+                row["overhead_ms"] = cases[case_id]["overhead"] * 1000
+            case_rows.append(row)
+        return {
+            "by_path": [self._aggregate(path, group) for path, group in by_path.items()],
+            "by_case": case_rows,
+        }
+
+    def overall(self, name: str = "all") -> Dict:
+        """汇总全部样本（不分组）"""
+        with self._lock:
+            samples = list(self.samples)
+        return self._aggregate(name, samples)
+
+    def format_table(self) -> str:
+        """生成汇总文本表格"""
+        summary = self.summary()
+        header = f"{'name':<48}{'count':>6}{'connect':>9}{'tls':>8}{'ttfb':>9}" \
+                 f"{'download':>10}{'total':>9}{'p90':>9}{'p99':>9}{'overhead':>10}{'retries':>9}"
+        lines = []
+        for title, rows in (("按接口路径", summary["by_path"]), ("按用例", summary["by_case"])):
+            lines += [f"【请求耗时统计 - {title}】（单位：ms）", header, "-" * len(header)]
+            for r in rows:
+                overhead = f"{r['overhead_ms']:>10.1f}" if "overhead_ms" in r else f"{'-':>10}"
+                lines.append(
+                    f"{r['name'][:47]:<48}{r['count']:>6}{r['connect_mean_ms']:>9.1f}{r['tls_mean_ms']:>8.1f}"
+                    f"{r['ttfb_mean_ms']:>9.1f}{r['download_mean_ms']:>10.1f}{r['total_mean_ms']:>9.1f}"
+                    f"{r['total_p90_ms']:>9.1f}{r['total_p99_ms']:>9.1f}{overhead}{r['retries']:>9}"
+                )
+        return "\n".join(lines)
+
+    def export_data(self) -> Dict:
+        """导出原始样本和汇总结果（可JSON序列化）"""
+        with self._lock:
+            samples = list(self.samples)
+            cases = dict(self.cases)
+        return {
+            "generated_at": datetime.now().isoformat(timespec="seconds"),
+            "summary": self.summary(),
+            "case_timings": cases,
+            "samples": samples,
+        }
+
+    def export_json(self, file_path: str) -> str:
+        """导出为JSON文件，返回文件绝对路径"""
+        os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+        with open(file_path, "w", encoding="utf-8") as f:
+            json.dump(self.export_data(), f, ensure_ascii=False, indent=2)
+        return os.path.abspath(file_path)
+
+
+# 进程级默认收集器
+default_recorder = TimingRecorder()
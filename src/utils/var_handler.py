@@ -1,8 +1,162 @@
 """全局变量处理工具：读写user_vars.yaml中的用户信息和全局变量
 支持多级路径访问（如"user.username"、"global.token"）
+变量文件在进程内只解析一次，读操作直接命中内存字典；
+写操作只修改内存并标记为脏数据，由定时器或会话结束时批量原子写回文件
 """
-import yaml
+import atexit
+import copy
 import os
+import stat
+import tempfile
+import threading
+import yaml
+
+# 变量文件路径：config/user_vars.yaml
+VAR_FILE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(__file__))),
+    "config", "user_vars.yaml"
+)
+# 脏数据自动写回间隔（秒），<=0 表示只在会话结束或进程退出时写回
+FLUSH_INTERVAL = 5.0
+
+
+class VarStore:
+    """进程级变量仓库：懒加载YAML到内存，写入延迟批量落盘"""
+
+    def __init__(self, file_path: str = VAR_FILE, flush_interval: float = FLUSH_INTERVAL,
+                 seed_file: str = None):
+        """初始化变量仓库
+        Args:
+            file_path: 变量文件路径
+            flush_interval: 脏数据自动写回间隔（秒）
+            seed_file: 变量文件不存在时用于初始化的文件（如各工作进程以user_vars.yaml为初始值）
+        """
+        self.file_path = file_path
+        self.seed_file = seed_file
+        self.flush_interval = flush_interval
+        self._data = None  # 内存中的变量字典（首次访问时加载）
+        self._dirty = False  # 是否有尚未写回文件的修改
+        self._lock = threading.RLock()  # 保护内存数据和脏标记
+        self._write_lock = threading.Lock()  # 保证同一时间只有一个线程写文件
+        self._timer = None  # 定时写回任务
+
+    def _load(self) -> dict:
+        """首次访问时读取YAML文件，之后直接返回内存数据"""
+        data = self._data
+        if data is not None:
+            return data
+        with self._lock:
+            if self._data is None:
+                source = self.file_path
+                if not os.path.exists(source) and self.seed_file:
+                    source = self.seed_file
+                if not os.path.exists(source):
+                    raise FileNotFoundError(f"变量文件不存在：{source}")
+                with open(source, "r", encoding="utf-8") as f:
+                    self._data = yaml.safe_load(f) or {}  # 若文件为空则返回空字典
+            return self._data
+
+    def get(self, key_path: str):
+        """读取变量值（路径不存在返回None）"""
+        # 解析多级路径（如"global.token"拆分为["global", "token"]）
+        value = self._load()
+        for k in key_path.split("."):
+            if isinstance(value, dict) and k in value:
+                value = value[k]
+            else:
+                return None  # 路径不存在时返回None
+        # 返回容器类型的副本，避免调用方直接修改内存数据
+        if isinstance(value, (dict, list)):
+            with self._lock:
+                return copy.deepcopy(value)
+        return value
+
+    def set(self, key_path: str, value):
+        """设置变量值（会覆盖原有值），只修改内存并安排写回"""
+        keys = key_path.split(".")
+        with self._lock:
+            current = self._load()
+            # 处理除最后一个键之外的路径（确保中间层级存在）
+            for k in keys[:-1]:
+                if k not in current or not isinstance(current[k], dict):
+                    current[k] = {}  # 若不存在则创建字典
+                current = current[k]
+            # 设置最终值
+            current[keys[-1]] = value
+            self._dirty = True
+            self._schedule_flush()
+
+    def _schedule_flush(self):
+        """安排一次定时写回（已有待执行的定时任务时不重复创建）"""
+        if self.flush_interval <= 0 or self._timer is not None:
+            return
+        self._timer = threading.Timer(self.flush_interval, self.flush)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def flush(self):
+        """将脏数据原子写回文件（先写临时文件，再重命名覆盖）"""
+        with self._write_lock:
+            with self._lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                if not self._dirty:
+                    return
+                # 在锁内序列化，保证写出的是一致的快照（保留中文，不排序键）
+                content = yaml.safe_dump(self._data, allow_unicode=True, sort_keys=False)
+                self._dirty = False
+            dir_name = os.path.dirname(self.file_path)
+            fd, tmp_path = tempfile.mkstemp(prefix=".user_vars.", suffix=".tmp", dir=dir_name)
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    f.write(content)
+                    f.flush()
+                    os.fsync(f.fileno())
+                # mkstemp创建的文件权限为0600，替换前沿用原文件（首次写入时为初始文件）的权限
+                for source in (self.file_path, self.seed_file):
+                    if source and os.path.exists(source):
+                        os.chmod(tmp_path, stat.S_IMODE(os.stat(source).st_mode))
+                        break
+                os.replace(tmp_path, self.file_path)
+            except BaseException:
+                # 写入失败：清理临时文件，并重新标记为脏数据以便下次重试
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                with self._lock:
+                    self._dirty = True
+                raise
+
+    def reload(self):
+        """丢弃内存数据（先写回未保存的修改），下次访问时重新读取文件"""
+        self.flush()
+        with self._lock:
+            self._data = None
+
+
+# 进程级默认变量仓库
+_store = VarStore()
+# 进程退出时兜底写回（正常情况下会在pytest会话结束时写回）
+atexit.register(lambda: _store.flush())
+
+
+def use_var_file(file_path: str, seed_file: str = VAR_FILE):
+    """切换当前进程使用的变量文件（独立的变量命名空间）
+    用于多进程执行：每个工作进程以user_vars.yaml为初始值，提取的变量只写入自己的文件，互不覆盖
+    Args:
+        file_path: 新的变量文件路径（不存在时从seed_file初始化）
+        seed_file: 初始变量文件
+    """
+    global _store
+    _store.flush()
+    os.makedirs(os.path.dirname(os.path.abspath(file_path)), exist_ok=True)
+    _store = VarStore(file_path, seed_file=seed_file)
+
+
+def current_var_file() -> str:
+    """当前进程使用的变量文件路径"""
+    return _store.file_path
+
 
 def get_var(key_path: str):
     """读取变量值
@@ -11,27 +165,7 @@ def get_var(key_path: str):
     Returns:
         变量值（若不存在返回None）
     """
-    # 变量文件路径：config/user_vars.yaml
-    file_path = os.path.join(
-        os.path.dirname(os.path.dirname(os.path.dirname(__file__))),
-        "config", "user_vars.yaml"
-    )
-    if not os.path.exists(file_path):
-        raise FileNotFoundError(f"变量文件不存在：{file_path}")
-
-    # 读取YAML文件
-    with open(file_path, "r", encoding="utf-8") as f:
-        data = yaml.safe_load(f) or {}  # 若文件为空则返回空字典
-
-    # 解析多级路径（如"global.token"拆分为["global", "token"]）
-    keys = key_path.split(".")
-    value = data
-    for k in keys:
-        if isinstance(value, dict) and k in value:
-            value = value[k]
-        else:
-            return None  # 路径不存在时返回None
-    return value
+    return _store.get(key_path)
 
 
 def set_var(key_path: str, value):
@@ -40,28 +174,14 @@ def set_var(key_path: str, value):
         key_path: 变量路径（如"global.token"）
         value: 要设置的值
     """
-    file_path = os.path.join(
-        os.path.dirname(os.path.dirname(os.path.dirname(__file__))),
-        "config", "user_vars.yaml"
-    )
-    if not os.path.exists(file_path):
-        raise FileNotFoundError(f"变量文件不存在：{file_path}")
-
-    # 读取原有数据
-    with open(file_path, "r", encoding="utf-8") as f:
-        data = yaml.safe_load(f) or {}
-
-    # 解析路径并设置值
-    keys = key_path.split(".")
-    current = data
-    # 处理除最后一个键之外的路径（确保中间层级存在）
-    for k in keys[:-1]:
-        if k not in current or not isinstance(current[k], dict):
-            current[k] = {}  # 若不存在则创建字典
-        current = current[k]
-    # 设置最终值
-    current[keys[-1]] = value
-
-    # 写回文件（保留中文，不排序键）
-    with open(file_path, "w", encoding="utf-8") as f:
-        yaml.safe_dump(data, f, allow_unicode=True, sort_keys=False)
\ No newline at end of file
+    _store.set(key_path, value)
+
+
+def flush_vars():
+    """立即将内存中的变量修改写回user_vars.yaml"""
+    _store.flush()
+
+
+def reload_vars():
+    """重新从user_vars.yaml加载变量（用于外部修改了文件的场景）"""
+    _store.reload()
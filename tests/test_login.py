@@ -1,11 +1,12 @@
 """登录模块用例：负责获取token并保存到全局变量
 所有其他模块的用例依赖此模块生成的token
 """
-import jsonpath
 import pytest
 from src.utils.logger import logger
 from src.utils.var_handler import get_var, set_var
 from src.utils.assert_utils import AssertUtils
+from src.utils.auth import get_auth_manager
+from src.utils.json_path import find as json_path_find, response_json
 
 
 @pytest.mark.api
@@ -41,17 +42,18 @@ def test_login(api_runner):
 
     # 5. 提取token并保存到全局变量
     token_path = "$.data.token"  # token在响应中的JSONPath（根据实际响应调整）
-    token_list = jsonpath.jsonpath(response.json(), token_path)
+    token_list = json_path_find(response_json(response), token_path)
     if token_list and len(token_list) > 0:
         token = token_list[0]
         set_var("global.token", token)  # 保存到global.token
+        get_auth_manager().set_token(token)  # 交给登录态管理器，后续用例直接复用
         logger.info(f"登录成功，已提取并保存token：{token[:10]}...")  # 隐藏部分字符
     else:
         raise AssertionError(f"未从响应中提取到token（JSONPath：{token_path}）")
 
     # 6. 提取user_id并保存（可选，供其他接口使用）
     user_id_path = "$.data.userId"  # user_id的JSONPath（根据实际响应调整）
-    user_id_list = jsonpath.jsonpath(response.json(), user_id_path)
+    user_id_list = json_path_find(response_json(response), user_id_path)
     if user_id_list and len(user_id_list) > 0:
         user_id = user_id_list[0]
         set_var("global.user_id", user_id)  # 保存到global.user_id
@@ -0,0 +1,90 @@
+"""批量断言单元测试：路径树一次遍历取值、各匹配器的判断、一次报告全部不匹配项"""
+import pytest
+from src.utils.assert_utils import collect_mismatches, compile_plan, is_matcher, match_value
+
+BODY = {
+    "code": "0000",
+    "msg": "success",
+    "data": {
+        "orderId": "ORD-20261018-001",
+        "amount": 99.5,
+        "count": 3,
+        "paid": False,
+        "items": [{"sku": "A", "qty": 1}, {"sku": "B", "qty": 2}],
+        "extra": None,
+    },
+}
+
+
+def test_all_fields_match():
+    expected = {
+        "code": "0000",
+        "$.data.count": 3,
+        "data.items[1].sku": "B",
+        "data.extra": None,
+        "$.data.items[?(@.sku == 'A')].qty": 1,
+    }
+    assert collect_mismatches(BODY, expected) == []
+
+
+def test_reports_every_mismatch():
+    mismatches = collect_mismatches(BODY, {
+        "code": "9999",
+        "data.count": 4,
+        "data.missing": 1,
+        "data.items[5].sku": "C",
+        "msg": "success",
+    })
+    assert len(mismatches) == 4
+    assert mismatches[0].startswith("$.code：预期'9999'")
+    assert "$.data.missing：路径不存在" in mismatches[2]
+
+
+def test_compile_plan_shares_prefixes():
+    paths = ("$.data.count", "$.data.items[0].sku", "$.data.items[0].qty", "$..sku")
+    root, fallback = compile_plan(paths)
+    assert fallback == [3]
+    data_node = root[0]["data"]
+    assert set(data_node[0]) == {"count", "items"}
+    item_node = data_node[0]["items"][0][0]
+    assert item_node[0]["sku"][1] == [1] and item_node[0]["qty"][1] == [2]
+    assert compile_plan(paths) is compile_plan(paths)
+
+
+@pytest.mark.parametrize("actual, matcher, ok", [
+    ("a", {"$type": "str"}, True),
+    (1, {"$type": "number"}, True),
+    (True, {"$type": "int"}, False),
+    (True, {"$type": ["int", "bool"]}, True),
+    (None, {"$type": ["str", "null"]}, True),
+    ("ORD-1", {"$regex": r"^ORD-\d+$"}, True),
+    (123, {"$regex": r"\d+"}, False),
+    (5, {"$range": [1, 10]}, True),
+    (50, {"$range": [None, 10]}, False),
+    (False, {"$range": [0, 1]}, False),
+    ([1, 2], {"$len": 2}, True),
+    ("abc", {"$len": [1, 2]}, False),
+    (5, {"$len": 1}, False),
+    ({"a": 1, "b": [1, 2]}, {"$subset": {"b": [2]}}, True),
+    ([{"id": 1, "x": 0}], {"$subset": [{"id": 2}]}, False),
+    (3, {"$type": "int", "$range": [1, 5]}, True),
+    (7, {"$type": "int", "$range": [1, 5]}, False),
+])
+def test_matchers(actual, matcher, ok):
+    assert is_matcher(matcher)
+    assert (match_value(actual, matcher) is None) == ok
+
+
+def test_plain_dict_is_compared_by_value():
+    assert not is_matcher({"$type": "str", "other": 1})
+    assert match_value({"$type": "str", "other": 1}, {"$type": "str", "other": 1}) is None
+
+
+def test_matchers_in_batch():
+    mismatches = collect_mismatches(BODY, {
+        "data.orderId": {"$regex": r"^ORD-\d{8}-\d{3}$"},
+        "data.amount": {"$type": "number", "$range": [0, 100]},
+        "data.paid": {"$type": "int"},
+        "data.items": {"$len": 2, "$subset": [{"sku": "B"}]},
+    })
+    assert len(mismatches) == 1 and mismatches[0].startswith("$.data.paid：预期类型int")
@@ -0,0 +1,130 @@
+"""异步执行器单元测试：请求与响应包装、token请求头、401刷新重试、并发上限、run_many按完成返回（使用本地mock服务）"""
+import asyncio
+import pytest
+from src.utils.api_runner import ApiResponse
+from src.utils.mock_server import MockServer
+
+pytest.importorskip("httpx")
+from src.utils.async_api_runner import AsyncApiRunner  # noqa: E402
+
+CASES = [
+    {"case_id": "user", "api": {"method": "get", "path": "/api/user"},
+     "expected": {"code": 200, "json": {"$.data.name": "张三"}}},
+    {"case_id": "expired", "api": {"method": "get", "path": "/api/expired"}, "expected": {"code": 401}},
+]
+
+
+class FakeAuth:
+    """登录态管理器：refresh返回新token并记录调用"""
+
+    def __init__(self):
+        self.token = "t1"
+        self.refreshed = []
+
+    def get_token(self):
+        return self.token
+
+    def refresh(self, stale_token=None):
+        self.refreshed.append(stale_token)
+        self.token = "t2"
+        return self.token
+
+
+@pytest.fixture(scope="module")
+def mock():
+    server = MockServer(CASES)
+    server.start()
+    yield server
+    server.stop()
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_run_wraps_response(mock):
+    async def main():
+        async with AsyncApiRunner(mock.base_url, http2=False, auth=FakeAuth()) as runner:
+            return await runner.run({"method": "get", "path": "/api/user"})
+
+    response = run(main())
+    assert isinstance(response, ApiResponse)
+    assert response.status_code == 200
+    assert response.json()["data"]["name"] == "张三"
+
+
+def test_missing_path_raises(mock):
+    async def main():
+        async with AsyncApiRunner(mock.base_url, http2=False, auth=FakeAuth()) as runner:
+            await runner.run({"method": "get"})
+
+    with pytest.raises(ValueError):
+        run(main())
+
+
+def test_token_header_and_refresh_on_401(mock):
+    auth = FakeAuth()
+    sent = []
+
+    async def main():
+        async with AsyncApiRunner(mock.base_url, http2=False, auth=auth) as runner:
+            request = runner.client.request
+
+            async def recording_request(**kwargs):
+                sent.append(dict(kwargs["headers"]))
+                return await request(**kwargs)
+
+            runner._client.request = recording_request
+            return await runner.run({"method": "get", "path": "/api/expired"})
+
+    response = run(main())
+    assert response.status_code == 401  # mock接口始终返回401，只重试一次
+    assert auth.refreshed == ["t1"]
+    assert [h["x-oiltax-token"] for h in sent] == ["t1", "t2"]
+
+
+def test_concurrency_is_bounded(mock):
+    in_flight, peak = 0, 0
+
+    async def main():
+        async with AsyncApiRunner(mock.base_url, http2=False, max_concurrency=3, auth=FakeAuth()) as runner:
+            request = runner.client.request
+
+            async def slow_request(**kwargs):
+                nonlocal in_flight, peak
+                in_flight += 1
+                peak = max(peak, in_flight)
+                await asyncio.sleep(0.01)
+                in_flight -= 1
+                return await request(**kwargs)
+
+            runner._client.request = slow_request
+            return [r async for r in runner.run_many([{"method": "get", "path": "/api/user"}] * 10)]
+
+    results = run(main())
+    assert len(results) == 10
+    assert peak == 3
+
+
+def test_run_many_returns_errors_per_request(mock):
+    configs = [{"method": "get", "path": "/api/user"}, {"method": "get"}, {"method": "get", "path": "/api/user"}]
+
+    async def main():
+        async with AsyncApiRunner(mock.base_url, http2=False, auth=FakeAuth()) as runner:
+            return dict([r async for r in runner.run_many(configs)])
+
+    results = run(main())
+    assert sorted(results) == [0, 1, 2]
+    assert isinstance(results[1], ValueError)
+    assert results[0].status_code == results[2].status_code == 200
+
+
+def test_aclose_releases_client(mock):
+    async def main():
+        runner = AsyncApiRunner(mock.base_url, http2=False, auth=FakeAuth())
+        await runner.run({"method": "get", "path": "/api/user"})
+        assert runner._client is not None
+        await runner.aclose()
+        return runner
+
+    assert run(main())._client is None
@@ -0,0 +1,115 @@
+"""登录态管理单元测试：启动时只沿用同一环境（base_url）签发的global.token；
+登录接口的请求不触发登录，登录请求与用例请求一起录制回放（使用本地mock服务）
+"""
+import pytest
+from src.utils import auth
+from src.utils.api_runner import ApiRunner
+from src.utils.auth import AuthManager
+from src.utils.cassette import Cassette
+from src.utils.config import DEFAULT_ENV, load_config
+from src.utils.mock_server import MOCK_TOKEN, MockServer
+
+DEFAULT_BASE_URL = load_config()["env"][DEFAULT_ENV]["base_url"]
+OTHER_BASE_URL = "https://other.example.com"
+
+
+@pytest.fixture
+def user_vars(monkeypatch):
+    """替换变量读写，避免读写config/user_vars.yaml"""
+    data = {}
+    monkeypatch.setattr(auth, "get_var", data.get)
+    monkeypatch.setattr(auth, "set_var", data.__setitem__)
+    return data
+
+
+def make_manager(base_url, tmp_path):
+    return AuthManager(base_url, cache_file=str(tmp_path / ".token_cache.json"))
+
+
+def test_token_reused_for_same_base_url(user_vars, tmp_path):
+    user_vars.update({"global.token": "t1", "global.token_base_url": OTHER_BASE_URL})
+    assert make_manager(OTHER_BASE_URL, tmp_path).token == "t1"
+
+
+def test_token_of_other_env_not_reused(user_vars, tmp_path):
+    user_vars.update({"global.token": "t1", "global.token_base_url": DEFAULT_BASE_URL})
+    assert make_manager(OTHER_BASE_URL, tmp_path).token is None
+
+
+def test_legacy_token_belongs_to_default_env(user_vars, tmp_path):
+    user_vars["global.token"] = "legacy"
+    assert make_manager(DEFAULT_BASE_URL, tmp_path).token == "legacy"
+    assert make_manager(OTHER_BASE_URL, tmp_path).token is None
+
+
+def test_set_token_records_base_url(user_vars, tmp_path):
+    manager = make_manager(OTHER_BASE_URL, tmp_path)
+    manager.set_token("t2")
+    assert user_vars == {"global.token": "t2", "global.token_base_url": OTHER_BASE_URL}
+    # 共享缓存按base_url区分，其他环境不会读到
+    assert make_manager(OTHER_BASE_URL, tmp_path).token == "t2"
+    assert make_manager(DEFAULT_BASE_URL, tmp_path).token is None
+
+
+def test_offline_token_not_recorded(user_vars, tmp_path):
+    manager = make_manager(OTHER_BASE_URL, tmp_path)
+    manager.offline = True
+    manager.set_token("mock")
+    assert user_vars == {}
+
+
+LOGIN_PATH = "/api/login"
+CASES = [{"case_id": "query", "api": {"method": "get", "path": "/api/query"}, "expected": {"code": 200}}]
+
+
+@pytest.fixture
+def mock():
+    server = MockServer(CASES, login_path=LOGIN_PATH)
+    server.start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def login_user(user_vars):
+    user_vars.update({"user.username": "13800000000", "user.smsCode": "123456"})
+    return user_vars
+
+
+def login_manager(base_url, tmp_path):
+    return AuthManager(base_url, auth_config={"login_path": LOGIN_PATH},
+                       cache_file=str(tmp_path / ".token_cache.json"))
+
+
+def test_login_request_does_not_log_in(login_user, mock, tmp_path, monkeypatch):
+    """执行登录接口本身时不通过登录态管理器获取token（不会先登录一次）"""
+    manager = login_manager(mock.base_url, tmp_path)
+    logins = []
+    monkeypatch.setattr(manager, "login", lambda: logins.append(1) or ("t1", float("inf")))
+    runner = ApiRunner(mock.base_url, auth=manager)
+    response = runner.run({"method": "post", "path": LOGIN_PATH, "json": {"mobile": "13800000000"}})
+    assert response.json()["data"]["token"] == MOCK_TOKEN
+    assert logins == [] and mock.request_count == 1
+    runner.run({"method": "get", "path": "/api/query"})  # 其他接口仍由登录态管理器提供token
+    assert logins == [1]
+    runner.session.close()
+
+
+def test_login_goes_through_cassette(login_user, mock, tmp_path):
+    cassette_dir = str(tmp_path / "cassettes")
+    recording = Cassette("auth", mode="record", cassette_dir=cassette_dir)
+    manager = login_manager(mock.base_url, tmp_path)
+    runner = ApiRunner(mock.base_url, auth=manager, cassette=recording)
+    assert manager.cassette is recording
+    runner.run({"method": "get", "path": "/api/query"})  # 没有token，先登录
+    recording.close()
+    runner.session.close()
+    assert manager.token == MOCK_TOKEN
+    recorded = (tmp_path / "cassettes" / "auth.jsonl").read_text(encoding="utf-8")
+    assert f'"path":"{LOGIN_PATH}"' in recorded
+
+    # 回放：登录响应同样来自录制，不访问网络
+    offline = login_manager("http://127.0.0.1:9", tmp_path)
+    offline.cassette = Cassette("auth", mode="replay", cassette_dir=cassette_dir)
+    token, _ = offline.login()
+    assert token == MOCK_TOKEN
@@ -0,0 +1,94 @@
+"""请求录制回放单元测试：record写入、replay离线返回（含重试的5xx）、verify对比差异（使用本地mock服务）"""
+import json
+import pytest
+from src.utils.api_runner import ApiRunner
+from src.utils.cassette import Cassette, CassetteError, diff_json
+from src.utils.mock_server import MockServer
+from src.utils.resilience import RetryPolicy
+
+CASES = [
+    {"case_id": "user", "api": {"method": "get", "path": "/api/user", "params": {"id": 1}},
+     "expected": {"code": 200, "json": {"$.data.name": "张三", "$.data.age": 18}}},
+    {"case_id": "gateway", "api": {"method": "get", "path": "/api/gateway"}, "expected": {"code": 503}},
+]
+# 回放时不会访问该地址
+OFFLINE_URL = "http://127.0.0.1:9"
+
+
+@pytest.fixture(scope="module")
+def mock():
+    server = MockServer(CASES)
+    server.start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def recorded(mock, tmp_path):
+    """录制一份包含正常响应和503响应的cassette，返回cassette目录"""
+    cassette = Cassette("demo", mode="record", cassette_dir=str(tmp_path))
+    runner = ApiRunner(mock.base_url, cassette=cassette)
+    runner.run({"method": "get", "path": "/api/user", "params": {"id": 1}})
+    runner.run({"method": "get", "path": "/api/gateway"})
+    cassette.close()
+    runner.session.close()
+    return str(tmp_path)
+
+
+def test_record_writes_entries(recorded, tmp_path):
+    lines = (tmp_path / "demo.jsonl").read_text(encoding="utf-8").splitlines()
+    entries = [json.loads(line) for line in lines]
+    assert [(e["method"], e["path"], e["status"]) for e in entries] == [
+        ("GET", "/api/user", 200), ("GET", "/api/gateway", 503)]
+    assert json.loads(entries[0]["body"])["data"] == {"name": "张三", "age": 18}
+
+
+def test_replay_returns_recorded_response(recorded, mock):
+    count = mock.request_count
+    runner = ApiRunner(OFFLINE_URL, cassette=Cassette("demo", mode="replay", cassette_dir=recorded))
+    response = runner.run({"method": "get", "path": "/api/user", "params": {"id": 1}})
+    assert response.status_code == 200
+    assert response.json()["data"]["name"] == "张三"
+    assert mock.request_count == count  # 没有访问网络
+    with pytest.raises(CassetteError):
+        runner.run({"method": "get", "path": "/api/user", "params": {"id": 2}})
+
+
+def test_replay_retried_5xx(recorded, monkeypatch):
+    """回放录制的503：可重试的请求会先关闭响应再重试，用完录制后重复返回最后一条"""
+    cassette = Cassette("demo", mode="replay", cassette_dir=recorded)
+    replayed = []
+    original = cassette.send
+    monkeypatch.setattr(cassette, "send", lambda *args, **kwargs: replayed.append(1) or original(*args, **kwargs))
+    runner = ApiRunner(OFFLINE_URL, cassette=cassette, retry=RetryPolicy(max_retries=2, backoff=0))
+    response = runner.run({"method": "get", "path": "/api/gateway"})
+    assert response.status_code == 503
+    assert len(replayed) == 3
+    # 回放的响应没有底层连接，未读取响应体时也可以直接关闭
+    request = {"method": "get", "url": OFFLINE_URL + "/api/gateway", "params": {}, "json": {}, "data": {}}
+    original(None, "/api/gateway", request).close()
+
+
+def test_verify_records_mismatches(recorded, mock, tmp_path):
+    path = tmp_path / "demo.jsonl"
+    entries = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+    entries[0]["body"] = json.dumps({"data": {"name": "李四", "age": 18}}, ensure_ascii=False)
+    path.write_text("".join(json.dumps(e, ensure_ascii=False) + "\n" for e in entries), encoding="utf-8")
+
+    cassette = Cassette("demo", mode="verify", cassette_dir=recorded)
+    runner = ApiRunner(mock.base_url, cassette=cassette)
+    runner.run({"method": "get", "path": "/api/user", "params": {"id": 1}})
+    runner.run({"method": "get", "path": "/api/gateway"})
+    assert len(cassette.mismatches) == 1
+    assert cassette.mismatches[0]["diffs"] == ["$.data.name：'李四' → '张三'"]
+
+    ignoring = Cassette("demo", mode="verify", cassette_dir=recorded, ignore_paths=["$.data.name"])
+    ApiRunner(mock.base_url, cassette=ignoring).run({"method": "get", "path": "/api/user", "params": {"id": 1}})
+    assert ignoring.mismatches == []
+
+
+def test_diff_json():
+    assert diff_json({"a": 1, "b": [1, 2]}, {"a": 1, "b": [1, 2]}) == []
+    assert sorted(diff_json({"a": 1, "b": 2}, {"a": 2, "c": 3})) == [
+        "$.a：1 → 2", "$.b：字段缺失", "$.c：新增字段"]
+    assert diff_json([1], [1, 2]) == ["$：数组长度 1 → 2"]
@@ -0,0 +1,97 @@
+"""常驻执行进程单元测试：只执行部分用例时带上传递依赖的上游用例、用例文件修改后重新加载（含mock路由）"""
+import os
+import pytest
+import requests
+from src.utils import auth, read_data
+from src.utils.daemon import RunDaemon
+
+CASES_YAML = """\
+- case_id: login
+  api: {method: post, path: /api/sms, json: {phone: "138"}}
+  extract: {user_id: $.data.userId}
+  expected: {code: 200, json: {code: "0000"}}
+- case_id: query
+  api: {method: get, path: /api/user, params: {id: "${user_id}"}}
+  extract: {car_id: $.data.carId}
+  expected: {code: 200, json: {code: "0000"}}
+- case_id: detail
+  api: {method: get, path: /api/car, params: {id: "${car_id}"}}
+  expected: {code: 200, json: {code: "0000"}}
+- case_id: other
+  api: {method: get, path: /api/other}
+  expected: {code: 200}
+"""
+NEW_CASE_YAML = """\
+- case_id: added
+  api: {method: get, path: /api/added}
+  expected: {code: 200, json: {msg: ok}}
+"""
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(read_data, "CACHE_DIR", str(tmp_path / ".case_cache"))
+    monkeypatch.setattr(auth, "_managers", {})  # 使用独立的登录态管理器（mock模式会改为离线token）
+    monkeypatch.chdir(tmp_path)  # 上次通过的用例指纹文件写入临时目录
+    path = tmp_path / "data"
+    path.mkdir()
+    (path / "cases.yaml").write_text(CASES_YAML, encoding="utf-8")
+    return path
+
+
+@pytest.fixture
+def daemon(data_dir, tmp_path):
+    run_daemon = RunDaemon(mock=True, workers=2, socket_path=str(tmp_path / "d.sock"), data_dir=str(data_dir))
+    yield run_daemon
+    run_daemon.mock_server.stop()
+
+
+def touch(path):
+    """修改文件后推后修改时间，确保与上次记录的不同"""
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+
+
+def test_with_dependencies(daemon):
+    ids = [case.case_id for case in daemon.cases]
+    assert [ids[i] for i in daemon._with_dependencies({"detail"})] == ["login", "query", "detail"]
+    assert [ids[i] for i in daemon._with_dependencies({"other", "query"})] == ["login", "query", "other"]
+    assert daemon._with_dependencies(set()) == []
+
+
+def test_run_includes_dependencies(daemon):
+    messages = []
+    daemon.handle({"cmd": "run", "cases": ["detail"]}, messages.append)
+    start, done = messages[0], messages[-1]
+    assert start["type"] == "start" and start["cases"] == 3
+    assert start["dependencies"] == ["login", "query"]
+    assert [m["case_id"] for m in messages if m["type"] == "result"] == ["login", "query", "detail"]
+    assert done["type"] == "done" and done["counts"] == {"passed": 3}
+
+
+def test_run_unknown_case(daemon):
+    messages = []
+    daemon.handle({"cmd": "run", "cases": ["missing"]}, messages.append)
+    assert messages == [{"type": "error", "error": "用例不存在：missing"}]
+
+
+def test_reload_only_when_changed(daemon, data_dir):
+    assert daemon._reload() == []
+    assert daemon._reload(force=True) == ["config", "vars", "cases"]
+
+
+def test_reload_rebuilds_mock_routes(daemon, data_dir):
+    url = daemon.mock_server.base_url + "/api/added"
+    assert requests.get(url).status_code == 404
+    path = data_dir / "cases.yaml"
+    path.write_text(CASES_YAML + NEW_CASE_YAML, encoding="utf-8")
+    touch(path)
+    assert daemon._reload() == ["cases"]
+    assert [case.case_id for case in daemon.cases][-1] == "added"
+    response = requests.get(url)
+    assert response.status_code == 200 and response.json() == {"msg": "ok"}
+
+    messages = []
+    daemon.handle({"cmd": "run", "cases": ["added"]}, messages.append)
+    assert messages[0]["reloaded"] == []
+    assert messages[-1]["counts"] == {"passed": 1}
@@ -0,0 +1,91 @@
+"""分布式执行单元测试：按变量依赖分片（连通分量不拆分、分片均衡且结果稳定）、合并分片结果和日志"""
+import json
+import pytest
+from src.utils.distributed import merge_results, parse_shard, shard_cases
+
+
+def case(case_id, reads=(), writes=()):
+    """构造用例：reads为请求中引用的变量，writes为提取的变量"""
+    return {
+        "case_id": case_id,
+        "api": {"method": "get", "path": "/api/" + case_id, "params": {v: "${" + v + "}" for v in reads}},
+        "extract": {v: f"$.data.{v}" for v in writes},
+    }
+
+
+def sample(case_id, total):
+    return {"case_id": case_id, "method": "GET", "path": "/api/" + case_id, "status": 200, "connect": 0.0,
+            "tls": 0.0, "ttfb": total, "download": 0.0, "total": total, "error": None, "attempt": 0}
+
+
+def write_worker(output_dir, worker, shard, results, log_file=""):
+    data = {
+        "worker": worker, "run_id": "r1", "shard": shard, "host": "h", "env": "test", "base_url": "",
+        "duration": 1.0, "log_file": log_file, "results": results,
+        "timing": {"samples": [sample(r["case_id"], 0.01) for r in results], "case_timings": {}},
+    }
+    (output_dir / f"worker-{worker}.json").write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+
+
+def test_dependent_cases_share_a_shard():
+    cases = [
+        case("login", writes=["token"]),
+        case("a"),
+        case("query", reads=["token"]),
+        case("b"),
+        case("create", writes=["order_id"]),
+        case("detail", reads=["order_id"]),
+    ]
+    shards = shard_cases(cases, 2)
+    assert sorted(i for shard in shards for i in shard) == list(range(len(cases)))
+    owner = {i: n for n, shard in enumerate(shards) for i in shard}
+    assert owner[0] == owner[2]
+    assert owner[4] == owner[5]
+    assert [len(shard) for shard in shards] == [3, 3]
+    assert all(shard == sorted(shard) for shard in shards)  # 分片内保持原有顺序
+
+
+def test_shards_are_balanced_and_stable():
+    cases = [case(f"c{i}") for i in range(10)]
+    shards = shard_cases(cases, 3)
+    assert sorted(map(len, shards)) == [3, 3, 4]
+    assert shard_cases(cases, 3) == shards  # 每台机器计算的分片一致
+
+
+def test_shard_edge_cases():
+    assert shard_cases([case("a"), case("b")], 0) == [[0, 1]]
+    assert shard_cases([case("a")], 3) == [[0], [], []]
+
+
+def test_parse_shard():
+    assert parse_shard("1/3") == (0, 3)
+    for value in ("0/3", "4/3", "x"):
+        with pytest.raises(ValueError):
+            parse_shard(value)
+
+
+def test_merge_results(tmp_path):
+    output_dir = tmp_path / "workers"
+    output_dir.mkdir()
+    log1, log2 = tmp_path / "w1.log", tmp_path / "w2.log"
+    log1.write_text("2026-01-01 10:00:00,000 - INFO - w1第一条\n2026-01-01 10:00:02,000 - INFO - w1第二条\n"
+                    "Traceback: 堆栈\n", encoding="utf-8")
+    log2.write_text("2026-01-01 10:00:01,000 - INFO - w2第一条\n", encoding="utf-8")
+    write_worker(output_dir, "w1", [1, 2], [{"case_id": "a", "status": "passed", "index": 0},
+                                            {"case_id": "c", "status": "failed", "index": 2}], str(log1))
+    write_worker(output_dir, "w2", [2, 2], [{"case_id": "b", "status": "passed", "index": 1}], str(log2))
+
+    report_path = tmp_path / "report" / "distributed_report.json"
+    report = merge_results(str(output_dir), str(report_path))
+    assert [r["case_id"] for r in report["results"]] == ["a", "b", "c"]  # 恢复原有顺序
+    assert [w["counts"] for w in report["workers"]] == [{"passed": 1, "failed": 1}, {"passed": 1}]
+    assert report["recorder"].overall()["count"] == 3
+    assert json.loads(report_path.read_text(encoding="utf-8"))["results"] == report["results"]
+    merged = open(report["log_file"], encoding="utf-8").read()
+    assert merged.index("w1第一条") < merged.index("w2第一条") < merged.index("w1第二条")
+    assert merged.endswith("w1第二条\nTraceback: 堆栈\n")  # 堆栈行跟随所属的日志记录
+
+
+def test_merge_results_without_files(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        merge_results(str(tmp_path), str(tmp_path / "report.json"))
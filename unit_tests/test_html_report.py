@@ -0,0 +1,63 @@
+"""分页报告单元测试：只链接已生成的页、增量续写、新一次执行时删除旧分页"""
+import os
+from src.utils.html_report import render_report
+from src.utils.results_sink import ResultsSink
+
+
+def write_results(path, count, append=False):
+    sink = ResultsSink(str(path), append=append)
+    for i in range(count):
+        sink.add_result(f"case_{i}", "passed", 0.01)
+    sink.close()
+    return sink
+
+
+def page_files(output_dir):
+    return sorted(name for name in os.listdir(output_dir) if name.startswith("page-"))
+
+
+def read_page(output_dir, page):
+    with open(os.path.join(output_dir, f"page-{page:04d}.html"), encoding="utf-8") as f:
+        return f.read()
+
+
+def test_exact_multiple_has_no_dangling_next_link(tmp_path):
+    results, output_dir = tmp_path / "results.jsonl", str(tmp_path / "html")
+    write_results(results, 4)
+    render_report(str(results), output_dir, page_size=2)
+    assert page_files(output_dir) == ["page-0001.html", "page-0002.html"]
+    assert "page-0002.html'>下一页" in read_page(output_dir, 1)
+    assert "下一页" not in read_page(output_dir, 2)
+
+
+def test_incremental_render_links_new_page(tmp_path):
+    results, output_dir = tmp_path / "results.jsonl", str(tmp_path / "html")
+    sink = ResultsSink(str(results))
+    for i in range(2):
+        sink.add_result(f"case_{i}", "passed", 0.01)
+    render_report(str(results), output_dir, page_size=2)
+    assert "下一页" not in read_page(output_dir, 1)
+    sink.add_result("case_2", "failed", 0.01, message="不匹配")
+    sink.close()
+    render_report(str(results), output_dir, page_size=2)
+    assert page_files(output_dir) == ["page-0001.html", "page-0002.html"]
+    assert "page-0002.html'>下一页" in read_page(output_dir, 1)
+    assert "case_2" in read_page(output_dir, 2)
+
+
+def test_new_run_removes_stale_pages(tmp_path):
+    results, output_dir = tmp_path / "results.jsonl", str(tmp_path / "html")
+    write_results(results, 5)
+    render_report(str(results), output_dir, page_size=2)
+    assert len(page_files(output_dir)) == 3
+    write_results(results, 1)  # 新一次执行覆盖结果文件
+    render_report(str(results), output_dir, page_size=2)
+    assert page_files(output_dir) == ["page-0001.html"]
+
+
+def test_samples_outside_case_are_not_kept(tmp_path):
+    sink = ResultsSink(str(tmp_path / "results.jsonl"))
+    sink.record_sample({"case_id": None, "path": "/login"})
+    sink.record_sample({"case_id": "case_0", "path": "/api/query"})
+    assert list(sink._samples) == ["case_0"]
+    sink.close()
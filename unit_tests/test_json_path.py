@@ -0,0 +1,61 @@
+"""JSONPath单元测试：简单路径的快速取值与jsonpath库结果一致，复杂表达式回退到jsonpath库"""
+import jsonpath
+import pytest
+from src.utils.json_path import compile_path, find
+
+DATA = {
+    "code": "0000",
+    "data": {
+        "list": [{"id": 1, "name": "a", "tags": []}, {"id": 2, "name": "b", "tags": ["x"]}],
+        "total": 2,
+        "empty": None,
+        "zero": 0,
+        "a.b": {"c": True},
+    },
+}
+
+SIMPLE_PATHS = [
+    "$.code",
+    "$.data",
+    "$.data.total",
+    "$.data.list[0].id",
+    "$.data.list[1].tags[0]",
+    "$.data.list[1].tags",
+    "$['data']['total']",
+    "$.data.empty",
+    "$.data.zero",
+    "$.data.list[5].id",
+    "$.data.missing",
+    "$.code.inner",
+    "$.data.list.id",
+]
+
+
+@pytest.mark.parametrize("expr", SIMPLE_PATHS)
+def test_fast_path_matches_jsonpath(expr):
+    assert compile_path(expr).steps is not None
+    assert find(DATA, expr) == jsonpath.jsonpath(DATA, expr)
+
+
+@pytest.mark.parametrize("expr", [
+    "$.data.list[*].id",
+    "$..id",
+    "$.data.list[?(@.id > 1)].name",
+    "$.data.list[-1:]",
+])
+def test_complex_expressions_fall_back(expr):
+    assert compile_path(expr).steps is None
+    assert find(DATA, expr) == jsonpath.jsonpath(DATA, expr)
+
+
+def test_quoted_key_with_dot():
+    assert find(DATA, "$.data['a.b'].c") == [True]
+
+
+def test_first_and_cache():
+    path = compile_path("$.data.list[1].name")
+    assert compile_path("$.data.list[1].name") is path
+    assert path.first(DATA) == "b"
+    assert compile_path("$.nothing").first(DATA, default="-") == "-"
+    # 值为假值（0、None）时也视为匹配
+    assert compile_path("$.data.zero").first(DATA, default="-") == 0
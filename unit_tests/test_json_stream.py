@@ -0,0 +1,137 @@
+"""流式解析单元测试：只构建目标路径的值、提前结束、未安装ijson时的退化路径"""
+import json
+import os
+import pytest
+import requests
+from src.utils import json_stream
+from src.utils.json_path import assign_path
+from src.utils.json_stream import case_stream_paths, stream_json
+from src.utils.read_data import DataReader
+from src.utils.template import compile_case
+
+USER_CASES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "user_cases.yaml")
+needs_ijson = pytest.mark.skipif(json_stream.ijson is None, reason="未安装ijson")
+
+
+class FakeResponse:
+    """按固定大小分块返回响应体的响应对象"""
+
+    def __init__(self, body, chunk=7, error=None):
+        self.content = body if isinstance(body, bytes) else json.dumps(body).encode("utf-8")
+        self.chunk = chunk
+        self.error = error  # 读取到一半时抛出的异常
+        self.sent = 0
+        self.closed = False
+
+    def iter_content(self, chunk_size):
+        for i in range(0, len(self.content), self.chunk):
+            if self.error is not None and i >= len(self.content) // 2:
+                raise self.error
+            self.sent += len(self.content[i:i + self.chunk])
+            yield self.content[i:i + self.chunk]
+
+    def json(self):
+        return json.loads(self.content)
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture(params=["ijson", "fallback"])
+def parser(request, monkeypatch):
+    """同一组用例分别用ijson和退化路径执行，结果应一致"""
+    if request.param == "ijson":
+        if json_stream.ijson is None:
+            pytest.skip("未安装ijson")
+    else:
+        monkeypatch.setattr(json_stream, "ijson", None)
+    return request.param
+
+
+def test_nested_arrays(parser):
+    body = stream_json(FakeResponse({"data": [[1, 2], [3, 4]], "x": 1}), ["$.data[1][0]"])
+    assert body == {"data": [None, [3]]}
+
+
+def test_null_intermediate(parser):
+    body = stream_json(FakeResponse({"data": None, "msg": "ok"}), ["$.data.id", "$.msg"])
+    assert body == {"msg": "ok"}
+
+
+def test_root_array(parser):
+    body = stream_json(FakeResponse([{"a": 1}, {"a": 2, "b": [5]}]), ["$[1].a", "$[1].b"])
+    assert body == [None, {"a": 2, "b": [5]}]
+
+
+def test_subtree_and_missing_path(parser):
+    payload = {"code": "0000", "data": {"list": [{"id": 1}, {"id": 2}], "total": 2}}
+    body = stream_json(FakeResponse(payload), ["$.data.list", "$.code", "$.nothing"])
+    assert body == {"code": "0000", "data": {"list": [{"id": 1}, {"id": 2}]}}
+
+
+def test_keys_with_special_characters(parser):
+    body = stream_json(FakeResponse({"a.b": {"c": 1}, "d": 2}), ["$['a.b'].c"])
+    assert body == {"a.b": {"c": 1}}
+
+
+@needs_ijson
+def test_early_stop_reads_only_prefix():
+    payload = {"code": "0000", "data": [{"id": i, "pad": "x" * 50} for i in range(2000)]}
+    response = FakeResponse(payload, chunk=1024)
+    body = stream_json(response, ["$.code", "$.data[0].id"])
+    assert body == {"code": "0000", "data": [{"id": 0}]}
+    assert response.closed
+    assert response.sent < len(response.content) // 10
+
+
+@needs_ijson
+def test_stream_case_stops_early():
+    """data目录中 stream: true 的用例（create_user_003）读取到所需字段后即停止下载"""
+    cases = DataReader.read_yaml(USER_CASES)
+    case = compile_case(next(c for c in cases if c["case_id"] == "create_user_003"))
+    paths = case.render_api(lambda name: None)["stream"]
+    assert sorted(paths) == ["$.code", "$.data[0].licenseNumber", "$.msg"]
+    payload = {"code": "0000", "msg": "操作成功",
+               "data": [{"licenseNumber": f"津A{i:05d}", "pad": "x" * 50} for i in range(2000)]}
+    response = FakeResponse(payload, chunk=1024)
+    body = stream_json(response, paths)
+    assert body == {"code": "0000", "msg": "操作成功", "data": [{"licenseNumber": "津A00000"}]}
+    assert response.closed
+    assert response.sent < len(response.content) // 10
+
+
+@needs_ijson
+def test_invalid_json_raises_value_error():
+    response = FakeResponse(b'{"code": "0000", "data": [1, 2,, 3]}')
+    with pytest.raises(ValueError):
+        stream_json(response, ["$.data[5]"])
+    assert response.closed
+
+
+@needs_ijson
+def test_transport_error_propagates():
+    response = FakeResponse({"data": list(range(100))}, error=requests.exceptions.ChunkedEncodingError("断开"))
+    with pytest.raises(requests.RequestException):
+        stream_json(response, ["$.data[99]"])
+    assert response.closed
+
+
+def test_case_stream_paths():
+    extract = {"first": "$.data[0].id", "list": "$.data"}
+    expected = {"json": {"msg": "ok", "data[0].name": "a"}}
+    # 已被$.data包含的子路径去掉
+    assert case_stream_paths(extract, expected) == ("$.data", "$.msg")
+    # 配置了schema、复杂路径或根路径时不流式解析
+    assert case_stream_paths(extract, expected, schema="pay_cars.yaml") is None
+    assert case_stream_paths({"ids": "$.data[*].id"}, None) is None
+    assert case_stream_paths({"all": "$"}, None) is None
+    assert case_stream_paths(None, None) is None
+
+
+def test_assign_path_creates_matching_containers():
+    assert assign_path({}, ("a", 1, 0), "v") == {"a": [None, ["v"]]}
+    assert assign_path([], (2, "k"), 1) == [None, None, {"k": 1}]
+    # 类型不符的中间值被替换
+    assert assign_path({"a": "x"}, ("a", "b"), 1) == {"a": {"b": 1}}
+    # 已有的同类型容器保留原有内容
+    assert assign_path({"a": [1]}, ("a", 2), 3) == {"a": [1, None, 3]}
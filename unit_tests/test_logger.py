@@ -0,0 +1,88 @@
+"""日志单元测试：异步模式下在后台线程格式化、保留异常堆栈、队列满时定期输出丢弃统计"""
+import json
+import threading
+import pytest
+from src.utils import logger as logger_module
+from src.utils.config import load_config
+from src.utils.logger import lazy_repr, logger, setup_logging, shutdown_logging
+
+
+@pytest.fixture
+def async_log(tmp_path, monkeypatch):
+    monkeypatch.setattr(logger_module, "log_dir", str(tmp_path))
+    state = {}
+
+    def setup(**kwargs):
+        state["path"] = setup_logging(async_mode=True, json_lines=True, console=False, **kwargs)
+        return state["path"]
+
+    def read():
+        shutdown_logging()
+        with open(state["path"], encoding="utf-8") as f:
+            return [json.loads(line) for line in f]
+
+    yield setup, read
+    monkeypatch.undo()
+    setup_logging(**(load_config().get("log") or {}))  # 恢复会话的日志配置
+
+
+class Payload:
+    """记录在哪个线程中被格式化"""
+
+    def __init__(self):
+        self.thread = None
+
+    def __repr__(self):
+        self.thread = threading.current_thread().name
+        return "payload"
+
+
+def test_lazy_payload_formatted_in_listener_thread(async_log):
+    setup, read = async_log
+    setup()
+    payload = Payload()
+    logger.info("响应: %s", lazy_repr(payload))
+    entries = read()
+    assert entries[-1]["message"] == "响应: payload"
+    assert payload.thread is not None and payload.thread != threading.current_thread().name
+
+
+def test_exception_kept_in_json(async_log):
+    setup, read = async_log
+    setup()
+    try:
+        raise ValueError("解析失败")
+    except ValueError:
+        logger.exception("请求出错")
+    entry = read()[-1]
+    assert entry["message"] == "请求出错"
+    assert "ValueError: 解析失败" in entry["exc"]
+
+
+def test_dropped_records_reported_periodically(async_log, monkeypatch):
+    setup, read = async_log
+    monkeypatch.setattr(logger_module, "DROP_WARNING_INTERVAL", 0.0)
+    setup(queue_size=1)
+    listener = logger_module._listener
+    listener.stop()  # 暂停后台线程，使队列保持已满
+    for i in range(5):
+        logger.info("记录%d", i)
+    assert logger_module._queue_handler.dropped == 4
+    listener.start()
+    entries = read()
+    warnings = [e["message"] for e in entries if e["level"] == "WARNING"]
+    assert any("最近" in w and "丢弃4条" in w for w in warnings)
+    assert warnings[-1] == "日志队列已满，共丢弃4条日志"
+
+
+def test_logging_after_shutdown_goes_to_console(async_log, capsys):
+    setup, read = async_log
+    setup()
+    read()  # 停止后台线程
+    logger.warning("会话结束后的日志")
+    assert "会话结束后的日志" in capsys.readouterr().err
+    setup()  # 重新配置时移除临时的控制台输出
+    handlers = logger_module.logging.getLogger().handlers
+    assert logger_module._queue_handler in handlers
+    assert not any(type(handler) is logger_module.logging.StreamHandler for handler in handlers)
+    read()
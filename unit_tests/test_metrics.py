@@ -0,0 +1,115 @@
+"""实时指标单元测试：按接口+用例计数（失败只含异常和5xx）、多线程分片合并、Prometheus文本格式和HTTP端点"""
+import re
+import threading
+import requests
+from src.utils.metrics import PREFIX, Metrics, MetricsExporter, format_summary
+from src.utils.stats import BUCKET_BOUNDS
+
+
+def sample(total=0.01, status=200, error=None, attempt=0, case_id="c1", path="/api/a"):
+    return {"method": "GET", "path": path, "case_id": case_id, "status": status, "error": error,
+            "attempt": attempt, "total": total}
+
+
+def value(text, name, **labels):
+    """从Prometheus文本中取出一个样本值"""
+    pattern = re.escape(f"{PREFIX}_{name}") + r"\{([^}]*)\} (\S+)"
+    for match in re.finditer(pattern, text):
+        pairs = dict(re.findall(r'(\w+)="((?:[^"\\]|\\.)*)"', match.group(1)))
+        if all(pairs.get(k) == v for k, v in labels.items()):
+            return float(match.group(2))
+    raise KeyError(f"{name} {labels}")
+
+
+def test_counts_by_path_and_case():
+    metrics = Metrics()
+    metrics.record(sample())
+    metrics.record(sample(status=404))  # 4xx可能是预期结果，不计为失败
+    metrics.record(sample(status=503, attempt=1))
+    metrics.record(sample(status=None, error="超时"))
+    metrics.record(sample(case_id=None, path="/api/b"))
+    merged = metrics.collect()
+    totals = merged[("GET", "/api/a", "c1")]
+    assert (totals.requests, totals.failures, totals.retries) == (4, 2, 1)
+    assert merged[("GET", "/api/b", "-")].requests == 1
+    assert metrics.overall().requests == 5
+
+
+def test_in_flight():
+    metrics = Metrics()
+    metrics.on_start("get", "/api/a")
+    metrics.on_start("get", "/api/a")
+    assert metrics.overall().in_flight == 2
+    metrics.record(sample(case_id=None))
+    assert metrics.overall().in_flight == 1
+
+
+def test_thread_shards_are_merged():
+    metrics = Metrics()
+
+    def worker():
+        for _ in range(1000):
+            metrics.record(sample())
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(metrics._shards) == 4
+    assert metrics.overall().requests == 4000
+
+
+def test_quantiles_from_histogram():
+    metrics = Metrics()
+    for i in range(1, 101):
+        metrics.record(sample(total=i / 1000))
+    totals = metrics.overall()
+    assert 0.045 <= totals.quantile(0.5) <= 0.06
+    assert 0.09 <= totals.quantile(0.99) <= 0.12
+    delta = totals.minus(Metrics().overall())
+    assert delta.requests == 100
+
+
+def test_prometheus_text():
+    metrics = Metrics()
+    metrics.record(sample(total=0.02))
+    metrics.record(sample(total=0.5, status=500))
+    metrics.record(sample(case_id='a"b', path="/api/x"))
+    text = metrics.prometheus_text()
+    assert text.endswith("\n")
+    labels = {"method": "GET", "path": "/api/a", "case": "c1"}
+    assert value(text, "requests_total", **labels) == 2
+    assert value(text, "request_failures_total", **labels) == 1
+    assert value(text, "request_duration_seconds_count", **labels) == 2
+    assert value(text, "request_duration_seconds_sum", **labels) == 0.52
+    assert value(text, "request_duration_seconds_bucket", le="+Inf", **labels) == 2
+    assert value(text, "requests_total", case='a\\"b') == 1  # 标签值转义
+    # 直方图桶累计计数单调不减
+    buckets = [value(text, "request_duration_seconds_bucket", le=f"{bound:.6g}", **labels)
+               for bound in BUCKET_BOUNDS]
+    assert buckets == sorted(buckets) and buckets[-1] == 2
+    for name in ("requests_total", "requests_in_flight", "request_duration_seconds"):
+        assert f"# TYPE {PREFIX}_{name} " in text
+
+
+def test_format_summary():
+    metrics = Metrics()
+    metrics.record(sample(status=500))
+    totals = metrics.overall()
+    line = format_summary(totals, 10, totals)
+    assert "请求1（0.1/s），失败1" in line and "累计：请求1，失败1" in line
+
+
+def test_exporter_endpoint():
+    metrics = Metrics()
+    metrics.record(sample())
+    exporter = MetricsExporter(metrics, port=0, summary_interval=0)
+    try:
+        response = requests.get(exporter.url)
+        assert response.status_code == 200
+        assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+        assert f"{PREFIX}_requests_total" in response.text
+        assert requests.get(exporter.url.replace("/metrics", "/other")).status_code == 404
+    finally:
+        exporter.stop()
@@ -0,0 +1,92 @@
+"""mock服务单元测试：按用例生成路由（断言值、匹配器、提取变量、登录接口）、请求匹配、错误注入、临时变量文件的清理"""
+import os
+import pytest
+import requests
+from src.utils.mock_server import MOCK_TOKEN, MockServer, build_routes, start_mock_server
+from src.utils.var_handler import current_var_file, get_var, set_var, use_var_file
+
+CASES = [
+    {"case_id": "login", "api": {"method": "post", "path": "/api/sms", "json": {"phone": "138"}},
+     "extract": {"user_id": "$.data.userId"}, "expected": {"code": 200, "json": {"code": "0000"}}},
+    {"case_id": "query", "api": {"method": "get", "path": "/api/user", "params": {"id": "${user_id}"}},
+     "expected": {"code": 200, "json": {"$.data.name": {"$type": "str"}, "$.data.cars": {"$len": 2},
+                                        "$.data.age": {"$range": [18, 60]}}}},
+    {"case_id": "query_other", "api": {"method": "get", "path": "/api/user", "params": {"id": 2}},
+     "expected": {"code": 404, "json": {"code": "4004"}}},
+]
+
+
+@pytest.fixture
+def mock():
+    server = MockServer(CASES, login_path="/api/login")
+    server.start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def var_file(tmp_path):
+    """当前进程切换到临时变量文件，结束后恢复"""
+    previous = current_var_file()
+    path = tmp_path / "user_vars.yaml"
+    path.write_text("global:\n  token: real\n", encoding="utf-8")
+    use_var_file(str(path))
+    yield str(path)
+    use_var_file(previous)
+
+
+def test_build_routes_satisfies_expected():
+    exact, by_path = build_routes(CASES, login_path="/api/login")
+    status, body = by_path[("POST", "/api/sms")]
+    assert status == 200 and body["code"] == "0000"
+    assert body["data"]["userId"] == "mock_user_id"  # 提取的字段填入mock值
+    status, body = by_path[("GET", "/api/user")]
+    assert body["data"]["name"] == "mock"
+    assert body["data"]["cars"] == [{}, {}]
+    assert body["data"]["age"] == 18
+    assert by_path[("POST", "/api/login")][1]["data"]["token"] == MOCK_TOKEN
+    assert len(exact) == 3
+
+
+def test_exact_route_takes_precedence(mock):
+    # 后续用例引用的变量按mock值渲染，请求参数一致时命中精确路由
+    response = requests.get(mock.base_url + "/api/user", params={"id": "mock_user_id"})
+    assert response.status_code == 200 and response.json()["data"]["age"] == 18
+    response = requests.get(mock.base_url + "/api/user", params={"id": 2})
+    assert response.status_code == 404 and response.json()["code"] == "4004"
+    response = requests.post(mock.base_url + "/api/sms", json={"phone": "139"})  # 参数不同时按路径匹配
+    assert response.status_code == 200 and response.json()["code"] == "0000"
+
+
+def test_unknown_route_and_login(mock):
+    assert requests.get(mock.base_url + "/api/none").status_code == 404
+    response = requests.post(mock.base_url + "/api/login", json={})
+    assert response.json()["data"]["token"] == MOCK_TOKEN
+    assert mock.request_count == 2
+
+
+def test_error_injection():
+    with MockServer(CASES, error_rate=1.0) as server:
+        response = requests.post(server.base_url + "/api/sms", json={"phone": "138"})
+        assert response.status_code == 500
+        assert server.error_count == 1
+
+
+def test_isolated_vars_are_removed_on_stop(var_file):
+    server = start_mock_server(CASES, {"port": 0})
+    try:
+        mock_var_file = current_var_file()
+        assert mock_var_file != var_file
+        set_var("global.token", MOCK_TOKEN)
+    finally:
+        server.stop()
+    assert current_var_file() == var_file
+    assert not os.path.exists(os.path.dirname(mock_var_file))
+    assert get_var("global.token") == "real"
+    assert "real" in open(var_file, encoding="utf-8").read()
+
+
+def test_shared_vars_are_kept(var_file):
+    server = start_mock_server(CASES, isolate_vars=False)
+    server.stop()
+    assert current_var_file() == var_file
@@ -0,0 +1,57 @@
+"""用例读取单元测试：索引缓存读取、延迟加载的用例只在访问时反序列化"""
+import pytest
+from src.utils import read_data
+from src.utils.read_data import DataReader, LazyCase
+from src.utils.template import CompiledCase, compile_case
+
+CASES_YAML = """\
+- case_id: a
+  title: 用例a
+  api: {method: get, path: /api/a}
+- case_id: b
+  title: 用例b
+  api: {method: get, path: /api/b}
+"""
+
+
+@pytest.fixture
+def data_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(read_data, "CACHE_DIR", str(tmp_path / ".case_cache"))
+    path = tmp_path / "cases.yaml"
+    path.write_text(CASES_YAML, encoding="utf-8")
+    return str(path)
+
+
+def test_read_cases(data_file):
+    cases = DataReader.read_cases(data_file)
+    assert [case["case_id"] for case in cases] == ["a", "b"]
+    assert DataReader.read_cases(data_file) == cases  # 第二次从缓存读取
+
+
+def test_lazy_cases_load_on_access(data_file, monkeypatch):
+    loaded = []
+    original = read_data.pickle.loads
+    monkeypatch.setattr(read_data.pickle, "loads", lambda data: loaded.append(1) or original(data))
+    cases = DataReader.read_lazy_cases(data_file, factory=compile_case)
+    assert [case.case_id for case in cases] == ["a", "b"]
+    assert not loaded  # 只读取了索引中的case_id
+    assert cases[1].title == "用例b"
+    assert len(loaded) == 1
+    assert isinstance(compile_case(cases[1]), CompiledCase)
+    assert len(loaded) == 1  # 已加载的用例不会重复反序列化
+
+
+def test_lazy_case_without_factory(data_file):
+    case = DataReader.read_lazy_cases(data_file)[0]
+    assert isinstance(case, LazyCase)
+    assert case["api"]["path"] == "/api/a"
+
+
+def test_iter_cases_opens_cache_once(data_file, monkeypatch):
+    DataReader.read_cases(data_file)  # 先建立缓存
+    opened = []
+    monkeypatch.setattr(read_data, "open", lambda path, *args, **kwargs: opened.append(path) or open(path, *args, **kwargs),
+                        raising=False)
+    cases = DataReader.read_cases(data_file)
+    assert [case["case_id"] for case in cases] == ["a", "b"]
+    assert len([path for path in opened if str(path).endswith(".bin")]) == 1
@@ -0,0 +1,139 @@
+"""重试和熔断单元测试：熔断器状态机，以及ApiRunner向熔断器报告结果（使用本地mock服务）"""
+import time
+import pytest
+from src.utils.api_runner import ApiRunner
+from src.utils.mock_server import MockServer
+from src.utils.resilience import CircuitBreaker, CircuitOpenError, RetryPolicy
+
+RESET = 0.05
+
+
+def trip(breaker: CircuitBreaker):
+    for _ in range(breaker.failure_threshold):
+        breaker.allow()
+        breaker.record_failure()
+
+
+def test_opens_after_threshold():
+    breaker = CircuitBreaker("h", failure_threshold=3, reset_timeout=RESET)
+    for _ in range(2):
+        breaker.allow()
+        breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "open" and breaker.is_open
+    with pytest.raises(CircuitOpenError):
+        breaker.allow()
+
+
+def test_success_resets_consecutive_failures():
+    breaker = CircuitBreaker("h", failure_threshold=2, reset_timeout=RESET)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+
+
+def test_half_open_allows_single_probe():
+    breaker = CircuitBreaker("h", failure_threshold=1, reset_timeout=RESET)
+    trip(breaker)
+    time.sleep(RESET * 1.5)
+    assert not breaker.is_open
+    breaker.allow()  # 探测请求
+    assert breaker.state == "half_open"
+    with pytest.raises(CircuitOpenError):
+        breaker.allow()  # 探测未结束时其他请求仍被拒绝
+    breaker.record_success()
+    assert breaker.state == "closed"
+    breaker.allow()
+
+
+def test_failed_probe_reopens():
+    breaker = CircuitBreaker("h", failure_threshold=1, reset_timeout=RESET)
+    trip(breaker)
+    time.sleep(RESET * 1.5)
+    breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open" and breaker.is_open
+
+
+def test_released_probe_allows_next_probe():
+    breaker = CircuitBreaker("h", failure_threshold=1, reset_timeout=RESET)
+    trip(breaker)
+    time.sleep(RESET * 1.5)
+    breaker.allow()
+    breaker.release()
+    breaker.allow()  # 释放后可以再次探测
+
+
+def test_disabled_breaker_never_opens():
+    breaker = CircuitBreaker("h", failure_threshold=0)
+    for _ in range(10):
+        breaker.allow()
+        breaker.record_failure()
+    assert breaker.state == "closed"
+
+
+def test_retry_policy_override():
+    policy = RetryPolicy(max_retries=2)
+    assert policy.allows("GET") and not policy.allows("post")
+    assert not policy.override(0).allows("get")
+    assert policy.override({"methods": ["post"]}).allows("post")
+    assert policy.override(None) is policy
+    assert all(0 <= policy.delay(i) <= policy.max_backoff for i in range(10))
+
+
+CASES = [
+    {"case_id": "business_error", "api": {"method": "get", "path": "/api/error"}, "expected": {"code": 500}},
+    {"case_id": "gateway_error", "api": {"method": "get", "path": "/api/gateway"}, "expected": {"code": 503}},
+    {"case_id": "ok", "api": {"method": "get", "path": "/api/ok"}, "expected": {"code": 200}},
+]
+
+
+@pytest.fixture(scope="module")
+def mock():
+    server = MockServer(CASES)
+    server.start()
+    yield server
+    server.stop()
+
+
+def make_runner(mock, breaker):
+    return ApiRunner(mock.base_url, breaker=breaker)
+
+
+def test_business_500_does_not_trip(mock):
+    breaker = CircuitBreaker("mock", failure_threshold=2, reset_timeout=RESET)
+    runner = make_runner(mock, breaker)
+    for _ in range(3):
+        assert runner.run({"method": "get", "path": "/api/error"}).status_code == 500
+    assert breaker.state == "closed"
+
+
+def test_gateway_status_trips(mock):
+    breaker = CircuitBreaker("mock", failure_threshold=2, reset_timeout=RESET)
+    runner = make_runner(mock, breaker)
+    for _ in range(2):
+        runner.run({"method": "get", "path": "/api/gateway"})
+    assert breaker.is_open
+    with pytest.raises(CircuitOpenError):
+        runner.run({"method": "get", "path": "/api/ok"})
+
+
+def test_probe_exception_releases_breaker(mock, monkeypatch):
+    """探测请求抛出非连接类异常（如响应体解析失败）后，熔断器不会一直拒绝请求"""
+    breaker = CircuitBreaker("mock", failure_threshold=1, reset_timeout=RESET)
+    runner = make_runner(mock, breaker)
+    runner.run({"method": "get", "path": "/api/gateway"})
+    assert breaker.is_open
+    time.sleep(RESET * 1.5)
+
+    def broken_send(*args, **kwargs):
+        raise ValueError("响应体解析失败")
+
+    monkeypatch.setattr(runner, "_send", broken_send)
+    with pytest.raises(ValueError):
+        runner.run({"method": "get", "path": "/api/ok"})
+    monkeypatch.undo()
+    assert runner.run({"method": "get", "path": "/api/ok"}).status_code == 200
+    assert breaker.state == "closed"
@@ -0,0 +1,87 @@
+"""结果缓存单元测试：响应复用只作用于只读请求的2xx响应（使用本地mock服务，不访问真实接口）"""
+import os
+import pytest
+from src.utils import read_data
+from src.utils.api_runner import ApiRunner
+from src.utils.mock_server import MockServer
+from src.utils.result_cache import ResponseCache, load_result_cache
+from src.utils.scheduler import load_all_cases
+from src.utils.template import compile_case
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+
+CASES = [
+    {"case_id": "query", "api": {"method": "get", "path": "/api/query", "params": {"id": "1"}},
+     "expected": {"code": 200, "json": {"code": "0000"}}},
+    {"case_id": "create", "api": {"method": "post", "path": "/api/create", "json": {"name": "a"}},
+     "expected": {"code": 200, "json": {"code": "0000"}}},
+]
+
+
+@pytest.fixture
+def mock():
+    server = MockServer(CASES)
+    server.start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def runner(mock):
+    runner = ApiRunner(mock.base_url, response_cache=ResponseCache())
+    yield runner
+    runner.session.close()
+
+
+def test_identical_posts_are_both_sent(mock, runner):
+    """相同的POST请求每次都真实发送"""
+    for _ in range(2):
+        assert runner.run({"method": "post", "path": "/api/create", "json": {"name": "a"}}).status_code == 200
+    assert mock.request_count == 2
+    assert runner.response_cache.hits == 0
+
+
+def test_identical_gets_are_deduped(mock, runner):
+    """相同的GET请求只发送一次"""
+    for _ in range(3):
+        assert runner.run({"method": "get", "path": "/api/query", "params": {"id": "1"}}).status_code == 200
+    assert mock.request_count == 1
+    assert runner.response_cache.hits == 2
+
+
+def test_post_opt_in_and_get_opt_out(mock, runner):
+    """dedupe: true 时POST也复用；dedupe: false 时GET也每次发送"""
+    for _ in range(2):
+        runner.run({"method": "post", "path": "/api/create", "json": {"name": "a"}, "dedupe": True})
+    assert mock.request_count == 1
+    for _ in range(2):
+        runner.run({"method": "get", "path": "/api/query", "params": {"id": "1"}, "dedupe": False})
+    assert mock.request_count == 3
+
+
+def test_non_2xx_not_cached(mock, runner):
+    """非2xx响应（如404）不缓存，相同请求会重新发送"""
+    for _ in range(2):
+        assert runner.run({"method": "get", "path": "/api/missing"}).status_code == 404
+    assert mock.request_count == 2
+
+
+def test_dedupe_off_by_default():
+    """未配置dedupe时不创建响应复用缓存"""
+    response_cache, _ = load_result_cache({"file": "/nonexistent/.result_cache.json"})
+    assert response_cache is None
+
+
+def test_duplicate_data_cases_are_deduped(tmp_path, monkeypatch):
+    """data中配置了 dedupe: true 的4个相同查询用例只发送一次，其他用例照常发送"""
+    monkeypatch.setattr(read_data, "CACHE_DIR", str(tmp_path / ".case_cache"))
+    cases = [compile_case(case) for case in load_all_cases(DATA_DIR)]
+    duplicates = {"create_order_001", "create_order_002", "create_user_001", "create_user_002"}
+    assert duplicates <= {case.case_id for case in cases}
+    with MockServer(cases) as server:
+        runner = ApiRunner(server.base_url, response_cache=ResponseCache())
+        for case in cases:
+            assert runner.run(case.render_api(lambda name: None)).status_code == 200
+        runner.session.close()
+        assert server.request_count == len(cases) - len(duplicates) + 1
+    assert runner.response_cache.hits == len(duplicates) - 1
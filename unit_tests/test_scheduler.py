@@ -0,0 +1,111 @@
+"""并发调度单元测试：变量依赖DAG（读后写、写后读、写后写）和依赖失败时跳过下游用例"""
+import threading
+from src.utils.result_cache import CaseCached
+from src.utils.scheduler import CaseScheduler, build_dependencies
+
+
+def case(case_id, reads=(), writes=()):
+    """构造用例：reads为请求中引用的变量，writes为提取的变量"""
+    return {
+        "case_id": case_id,
+        "api": {"method": "get", "path": "/api/" + case_id, "params": {v: "${" + v + "}" for v in reads}},
+        "extract": {v: f"$.data.{v}" for v in writes},
+    }
+
+
+def test_read_after_write():
+    deps = build_dependencies([case("login", writes=["token"]), case("query", reads=["token"])])
+    assert deps == [set(), {0}]
+
+
+def test_write_after_read():
+    deps = build_dependencies([
+        case("create", writes=["order_id"]),
+        case("query", reads=["order_id"]),
+        case("recreate", writes=["order_id"]),
+    ])
+    assert deps == [set(), {0}, {1}]
+
+
+def test_write_after_write_without_reader_is_parallel():
+    deps = build_dependencies([case(f"c{i}", writes=["licenseNumber"]) for i in range(3)])
+    assert deps == [set(), set(), set()]
+
+
+def test_write_after_write_with_reader_is_serialized():
+    deps = build_dependencies([
+        case("a", writes=["token"]),
+        case("b", writes=["token"]),
+        case("use", reads=["token"]),
+    ])
+    # 引用方取到的必须是最后一个产出者的值：产出者按用例顺序串行，引用方依赖最后一个
+    assert deps == [set(), {0}, {1}]
+
+
+def test_self_reference_is_not_a_dependency():
+    deps = build_dependencies([case("refresh", reads=["token"], writes=["token"]), case("use", reads=["token"])])
+    assert deps == [set(), {0}]
+
+
+class FakeRunner:
+    class session:
+        @staticmethod
+        def close():
+            pass
+
+
+def run(cases, executor, workers=4):
+    return CaseScheduler(cases, FakeRunner, workers=workers, executor=executor).run()
+
+
+def test_failed_dependency_skips_downstream():
+    executed = []
+    lock = threading.Lock()
+
+    def executor(runner, compiled):
+        with lock:
+            executed.append(compiled.case_id)
+        if compiled.case_id == "login":
+            raise AssertionError("登录失败")
+
+    results = run([
+        case("login", writes=["token"]),
+        case("query", reads=["token"], writes=["order_id"]),
+        case("detail", reads=["order_id"]),
+        case("independent"),
+    ], executor)
+    assert [r["status"] for r in results] == ["failed", "skipped", "skipped", "passed"]
+    assert "login" in results[1]["error"] and "query" in results[2]["error"]
+    assert sorted(executed) == ["independent", "login"]
+
+
+def test_error_and_cached_statuses():
+    def executor(runner, compiled):
+        if compiled.case_id == "cached":
+            raise CaseCached("未变化")
+        if compiled.case_id == "broken":
+            raise ValueError("响应不是JSON")
+
+    results = run([
+        case("cached", writes=["token"]),
+        case("use", reads=["token"]),
+        case("broken", writes=["order_id"]),
+        case("after_broken", reads=["order_id"]),
+    ], executor)
+    # cached视为通过，下游照常执行；出错时下游被跳过
+    assert [r["status"] for r in results] == ["cached", "passed", "error", "skipped"]
+    assert results[2]["error"] == "ValueError: 响应不是JSON"
+
+
+def test_dependency_order_under_concurrency():
+    order = []
+    lock = threading.Lock()
+
+    def executor(runner, compiled):
+        with lock:
+            order.append(compiled.case_id)
+
+    cases = [case("login", writes=["token"])] + [case(f"q{i}", reads=["token"]) for i in range(20)]
+    results = run(cases, executor, workers=8)
+    assert all(r["status"] == "passed" for r in results)
+    assert order[0] == "login" and len(order) == 21
@@ -0,0 +1,86 @@
+"""响应结构校验单元测试：支持的JSON Schema子集（类型、取值、对象、数组、$ref）"""
+import pytest
+from src.utils.schema import SchemaError, get_validator, load_validator, validate
+
+ORDER_SCHEMA = {
+    "type": "object",
+    "required": ["code", "data"],
+    "additionalProperties": False,
+    "properties": {
+        "code": {"type": "string", "enum": ["0000", "1001"]},
+        "msg": {"type": "string", "maxLength": 10},
+        "data": {
+            "type": "object",
+            "properties": {
+                "orderId": {"type": "string", "pattern": r"^ORD-\d+$"},
+                "amount": {"type": "number", "minimum": 0},
+                "count": {"type": "integer", "maximum": 10},
+                "items": {"type": "array", "minItems": 1, "items": {"$ref": "#/definitions/item"}},
+                "extra": {"additionalProperties": {"type": "integer"}},
+            },
+        },
+    },
+    "definitions": {
+        "item": {"type": "object", "required": ["sku"], "properties": {"sku": {"type": "string", "minLength": 1}}},
+    },
+}
+
+VALID = {"code": "0000", "msg": "ok",
+         "data": {"orderId": "ORD-1", "amount": 9.9, "count": 2, "items": [{"sku": "A"}], "extra": {"a": 1}}}
+
+
+def test_valid_document():
+    assert validate(VALID, ORDER_SCHEMA) == []
+
+
+@pytest.mark.parametrize("body, error", [
+    ({"code": "0000"}, "$.data：缺少必填字段"),
+    ({**VALID, "other": 1}, "$.other：不允许的字段"),
+    ({**VALID, "code": "9999"}, "$.code：值'9999'不在"),
+    ({**VALID, "code": 0}, "$.code：期望类型string，实际int"),
+    ({**VALID, "msg": "x" * 11}, "$.msg：字符串长度11超出范围"),
+    ({**VALID, "data": {"orderId": "X-1"}}, "$.data.orderId：'X-1'不匹配"),
+    ({**VALID, "data": {"amount": -1}}, "$.data.amount：值-1超出范围"),
+    ({**VALID, "data": {"count": True}}, "$.data.count：期望类型integer，实际bool"),
+    ({**VALID, "data": {"items": []}}, "$.data.items：数组长度0超出范围"),
+    ({**VALID, "data": {"items": [{"sku": ""}, {}]}}, "$.data.items[1].sku：缺少必填字段"),
+    ({**VALID, "data": {"extra": {"a": "1"}}}, "$.data.extra.a：期望类型integer"),
+])
+def test_reports_violation(body, error):
+    errors = validate(body, ORDER_SCHEMA)
+    assert any(e.startswith(error) for e in errors), errors
+
+
+def test_type_mismatch_stops_nested_checks():
+    assert validate({"code": "0000", "data": []}, ORDER_SCHEMA) == ["$.data：期望类型object，实际list"]
+
+
+def test_recursive_ref():
+    schema = {
+        "$ref": "#/$defs/node",
+        "$defs": {"node": {"type": "object", "properties": {
+            "value": {"type": "integer"},
+            "children": {"type": "array", "items": {"$ref": "#/$defs/node"}},
+        }}},
+    }
+    tree = {"value": 1, "children": [{"value": 2, "children": [{"value": "3"}]}]}
+    assert validate(tree, schema) == ["$.children[0].children[0].value：期望类型integer，实际str"]
+
+
+def test_nullable_and_const():
+    schema = {"type": ["string", "null"], "const": None}
+    assert validate(None, schema) == []
+    assert validate("a", schema) == ["$：期望None，实际'a'"]
+
+
+def test_invalid_schema():
+    with pytest.raises(SchemaError):
+        get_validator({"type": "date"})
+    with pytest.raises(SchemaError):
+        get_validator({"$ref": "other.yaml#/a"})
+
+
+def test_schema_file_compiled_once():
+    assert load_validator("pay_cars.yaml") is get_validator("pay_cars.yaml")
+    assert validate({"code": "0000", "msg": "ok", "data": [{"licenseNumber": None}]}, "pay_cars.yaml") == []
+    assert validate({"code": "0000", "msg": "ok", "data": [{"licenseNumber": 1}]}, "pay_cars.yaml")
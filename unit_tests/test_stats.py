@@ -0,0 +1,93 @@
+"""压测统计单元测试：直方图分位数估算、合并、积压时丢弃请求不超出压测时长、请求按case_id标记"""
+import random
+import time
+from src.utils.load_runner import LoadRunner
+from src.utils.stats import LatencyStats, format_summary_table, percentile
+from src.utils.timing import current_case_id
+
+
+def test_histogram_quantiles_close_to_exact():
+    rng = random.Random(1)
+    samples = [rng.lognormvariate(-3, 0.8) for _ in range(20000)]
+    stats = LatencyStats("case")
+    for latency in samples:
+        stats.record(latency)
+    summary = stats.summary(duration=10)
+    exact = sorted(samples)
+    for pct in (50, 90, 99):
+        assert abs(summary[f"p{pct}_ms"] / (percentile(exact, pct) * 1000) - 1) < 0.1
+    assert summary["max_ms"] == exact[-1] * 1000
+    assert abs(summary["mean_ms"] - sum(samples) / len(samples) * 1000) < 1e-6
+    assert summary["count"] == 20000 and summary["throughput"] == 2000
+
+
+def test_memory_does_not_grow_with_requests():
+    stats = LatencyStats("case")
+    size = len(stats.buckets)
+    for _ in range(10000):
+        stats.record(0.01)
+    assert len(stats.buckets) == size
+    assert not hasattr(stats, "samples")
+
+
+def test_merge_and_error_rate():
+    a, b = LatencyStats("a"), LatencyStats("b")
+    a.record(0.01)
+    a.record(0.02, ok=False)
+    b.record(0.5)
+    b.record_dropped()
+    total = LatencyStats("TOTAL")
+    total.merge(a)
+    total.merge(b)
+    summary = total.summary()
+    assert (summary["count"], summary["errors"], summary["dropped"]) == (3, 1, 1)
+    assert summary["error_rate"] == 1 / 3
+    assert summary["max_ms"] == 500
+    table = format_summary_table([summary])
+    assert "err%" in table.splitlines()[0] and "33.33%" in table
+
+
+def test_empty_stats():
+    summary = LatencyStats("none").summary(duration=1)
+    assert summary["count"] == 0 and summary["p99_ms"] == 0.0 and summary["max_ms"] == 0.0
+
+
+class SlowRunner:
+    """每个请求固定耗时的ApiRunner"""
+
+    class session:
+        @staticmethod
+        def close():
+            pass
+
+    class Response:
+        status_code = 200
+
+    def run(self, api):
+        time.sleep(0.1)
+        return self.Response()
+
+
+def test_rps_backlog_is_bounded():
+    cases = [{"case_id": "slow", "api": {"method": "get", "path": "/api/slow"}, "expected": {"code": 200}}]
+    start = time.perf_counter()
+    rows = LoadRunner(cases, SlowRunner, duration=0.5, rps=200, max_workers=2).run()
+    elapsed = time.perf_counter() - start
+    assert elapsed < 0.8  # 积压的请求不会在结束时间之后继续发送
+    slow = rows[0]
+    assert slow["dropped"] > 0
+    assert abs(slow["count"] + slow["dropped"] - 100) <= 1  # 每个计划的请求要么发送要么计为丢弃
+
+
+def test_load_requests_labelled_with_case_id():
+    seen = []
+
+    class LabelRunner(SlowRunner):
+        def run(self, api):
+            seen.append(current_case_id())
+            return self.Response()
+
+    cases = [{"case_id": f"case_{i}", "api": {"method": "get", "path": "/api/x"}, "expected": {"code": 200}}
+             for i in range(2)]
+    LoadRunner(cases, LabelRunner, duration=0.2, vus=2).run()
+    assert set(seen) == {"case_0", "case_1"}
@@ -0,0 +1,66 @@
+"""模板编译单元测试：整值引用保留类型、内嵌引用拼接、变量不存在时保留原写法、渲染不修改原始数据"""
+import copy
+from src.utils.template import Template, compile_case
+
+VARS = {"user_id": 1001, "token": "abc", "ids": [1, 2], "empty": ""}
+
+
+def lookup(name):
+    return VARS.get(name)
+
+
+def test_whole_value_keeps_type():
+    assert Template("${user_id}").render(lookup) == 1001
+    assert Template({"ids": "${ids}"}).render(lookup) == {"ids": [1, 2]}
+    assert Template("${empty}").render(lookup) == ""
+
+
+def test_embedded_reference_concatenates():
+    assert Template("Bearer ${token}").render(lookup) == "Bearer abc"
+    assert Template("${token}-${user_id}/x").render(lookup) == "abc-1001/x"
+
+
+def test_missing_variable_keeps_raw_text():
+    assert Template("${missing}").render(lookup) == "${missing}"
+    assert Template("id=${missing}&u=${user_id}").render(lookup) == "id=${missing}&u=1001"
+
+
+def test_nested_structures_and_variables():
+    data = {"path": "/api/user/${user_id}", "json": {"list": ["${token}", 3, None], "flag": True}}
+    template = Template(data)
+    assert template.variables == {"user_id", "token"}
+    assert template.render(lookup) == {"path": "/api/user/1001", "json": {"list": ["abc", 3, None], "flag": True}}
+
+
+def test_render_returns_new_objects():
+    data = {"json": {"list": [1, {"a": "${token}"}]}}
+    original = copy.deepcopy(data)
+    template = Template(data)
+    first = template.render(lookup)
+    first["json"]["list"][1]["a"] = "changed"
+    assert template.render(lookup) == {"json": {"list": [1, {"a": "abc"}]}}
+    assert data == original
+
+
+def test_compiled_case():
+    case = compile_case({
+        "case_id": "query_user",
+        "api": {"method": "get", "path": "/api/user/${user_id}"},
+        "expected": {"code": 200, "json": {"data.token": "${token}"}},
+        "extract": {"name": "$.data.name"},
+    })
+    assert compile_case(case) is case
+    assert case.variables == {"user_id", "token"}
+    assert case.render_api(lookup) == {"method": "get", "path": "/api/user/1001"}
+    assert case.render_expected(lookup) == {"code": 200, "json": {"data.token": "abc"}}
+    assert case.validator is None
+
+
+def test_stream_flag_rendered_as_paths():
+    case = compile_case({
+        "case_id": "big_list",
+        "api": {"method": "get", "path": "/api/list", "stream": True},
+        "expected": {"json": {"code": "0000"}},
+        "extract": {"first_id": "$.data[0].id"},
+    })
+    assert case.render_api(lookup)["stream"] == ["$.code", "$.data[0].id"]
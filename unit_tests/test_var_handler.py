@@ -0,0 +1,93 @@
+"""变量仓库单元测试：写入只改内存（延迟落盘）、flush原子替换并保留文件权限、从初始文件初始化"""
+import os
+import stat
+import pytest
+import yaml
+from src.utils.var_handler import VarStore
+
+
+def write_vars(path, data):
+    path.write_text(yaml.safe_dump(data, allow_unicode=True), encoding="utf-8")
+
+
+def read_vars(path):
+    return yaml.safe_load(path.read_text(encoding="utf-8"))
+
+
+def test_set_is_write_behind(tmp_path):
+    path = tmp_path / "user_vars.yaml"
+    write_vars(path, {"global": {"token": "old"}})
+    store = VarStore(str(path), flush_interval=0)
+    store.set("global.token", "new")
+    store.set("order.id", 1)
+    assert store.get("global.token") == "new"
+    assert read_vars(path) == {"global": {"token": "old"}}  # 写入只修改内存
+    store.flush()
+    assert read_vars(path) == {"global": {"token": "new"}, "order": {"id": 1}}
+
+
+def test_get_returns_copy(tmp_path):
+    path = tmp_path / "user_vars.yaml"
+    write_vars(path, {"user": {"name": "张三"}})
+    store = VarStore(str(path), flush_interval=0)
+    store.get("user")["name"] = "李四"
+    assert store.get("user.name") == "张三"
+    assert store.get("user.missing") is None
+
+
+def test_flush_replaces_atomically(tmp_path, monkeypatch):
+    path = tmp_path / "user_vars.yaml"
+    write_vars(path, {"a": 1})
+    store = VarStore(str(path), flush_interval=0)
+    store.set("a", 2)
+
+    def broken_replace(src, dst):
+        raise OSError("磁盘已满")
+
+    monkeypatch.setattr(os, "replace", broken_replace)
+    with pytest.raises(OSError):
+        store.flush()
+    monkeypatch.undo()
+    # 写入失败：原文件不变，临时文件已清理，修改仍为脏数据，下次flush重试
+    assert read_vars(path) == {"a": 1}
+    assert os.listdir(tmp_path) == ["user_vars.yaml"]
+    store.flush()
+    assert read_vars(path) == {"a": 2}
+    assert os.listdir(tmp_path) == ["user_vars.yaml"]
+
+
+def test_flush_keeps_file_mode(tmp_path):
+    path = tmp_path / "user_vars.yaml"
+    write_vars(path, {"a": 1})
+    os.chmod(path, 0o644)
+    store = VarStore(str(path), flush_interval=0)
+    store.set("a", 2)
+    store.flush()
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o644
+
+
+def test_seed_file(tmp_path):
+    seed = tmp_path / "seed.yaml"
+    write_vars(seed, {"user": {"name": "张三"}})
+    os.chmod(seed, 0o640)
+    path = tmp_path / "worker" / "user_vars.yaml"
+    path.parent.mkdir()
+    store = VarStore(str(path), flush_interval=0, seed_file=str(seed))
+    assert store.get("user.name") == "张三"
+    store.set("user.name", "李四")
+    store.flush()
+    assert read_vars(path) == {"user": {"name": "李四"}}
+    assert read_vars(seed) == {"user": {"name": "张三"}}  # 初始文件不被修改
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o640
+
+
+def test_timer_flush(tmp_path):
+    path = tmp_path / "user_vars.yaml"
+    write_vars(path, {"a": 1})
+    store = VarStore(str(path), flush_interval=0.05)
+    store.set("a", 2)
+    timer = store._timer
+    assert timer is not None
+    timer.join(1)
+    assert read_vars(path) == {"a": 2}
+    assert store._timer is None